@@ -0,0 +1,60 @@
+"""
+Work deferred until the current transaction commits, such as dropping cached
+data another request could otherwise re-cache from the not yet committed
+state.
+
+Within a managed transaction, ``on_commit`` queues the work (per thread);
+``AfterCommitMiddleware`` (see ``mlt.core.middleware``) runs it once a
+request's transaction has committed, and code committing its own
+transactions outside a request runs it with ``run_pending``. Outside a
+managed transaction, writes are already committed, so the work is done at
+once.
+
+"""
+import threading
+
+from django.db import transaction
+
+
+
+_local = threading.local()
+
+
+
+def _pending():
+    if not hasattr(_local, "pending"):
+        _local.pending = []
+    return _local.pending
+
+
+
+def on_commit(func):
+    """
+    Call ``func`` (with no arguments) once the current transaction commits,
+    or now if there is no managed transaction.
+
+    """
+    if transaction.is_managed():
+        _pending().append(func)
+    else:
+        func()
+
+
+
+def run_pending():
+    """
+    Call the functions queued by ``on_commit``, after a commit.
+
+    """
+    pending = _pending()
+    while pending:
+        pending.pop(0)()
+
+
+
+def discard_pending():
+    """
+    Forget the functions queued by ``on_commit``, after a rollback.
+
+    """
+    del _pending()[:]
@@ -19,4 +19,40 @@ class Configuration(object):
 
 conf = Configuration(
     MLT_DEFAULT_STATE=None,
+    # zoom levels at which rendered parcel tiles are served and cached
+    MLT_PARCEL_TILE_ZOOMS=[17, 18],
+    MLT_PARCEL_TILE_CACHE_TIMEOUT=60 * 60 * 24,
+    # max decimal places of parcel coordinates sent to the map (~1cm)
+    MLT_GEOJSON_PRECISION=7,
+    # grid size coordinates are quantized to in compact (TopoJSON) responses
+    MLT_TOPOJSON_QUANTIZATION=100000,
+    # below this zoom level parcels are aggregated into clusters, not drawn
+    MLT_PARCEL_POLYGON_ZOOM=15,
+    # clusters per map tile width (i.e. cluster grid is 256/8 = 32px)
+    MLT_PARCEL_CLUSTER_CELLS=8,
+    # max distance (in degrees) and number of parcels found by nearest lookup
+    MLT_PARCEL_LOOKUP_RADIUS=0.005,
+    MLT_PARCEL_LOOKUP_NUM=5,
+    # most nearest parcels a lookup may ask for (with "num")
+    MLT_PARCEL_LOOKUP_MAX_NUM=25,
+    # streamed responses are spooled in memory up to this size, then to disk
+    MLT_SPOOL_MAX_SIZE=1024 * 1024,
+    MLT_STREAM_CHUNK_SIZE=8192,
+    # list counts are cached for at most this long (they're also dropped on
+    # any address write), and unfiltered lists estimated at least this long
+    # are counted by planner estimate
+    MLT_COUNT_CACHE_TIMEOUT=60 * 5,
+    MLT_COUNT_ESTIMATE_THRESHOLD=100000,
+    # filter autocomplete candidates are cached (by prefix) this long
+    MLT_AUTOCOMPLETE_CACHE_TIMEOUT=60,
+    # cached autocomplete indexes are rebuilt when this old (when used), and
+    # dropped if unused this long
+    MLT_AUTOCOMPLETE_INDEX_REBUILD_AGE=60 * 5,
+    MLT_AUTOCOMPLETE_INDEX_CACHE_TIMEOUT=60 * 60 * 24,
+    # bulk actions on more addresses than this run as background jobs, this
+    # many addresses (one transaction) at a time
+    MLT_BULK_ACTION_JOB_THRESHOLD=5000,
+    MLT_BULK_ACTION_CHUNK_SIZE=1000,
+    # bulk action jobs can be polled for their status for this long
+    MLT_BULK_ACTION_STATUS_TIMEOUT=60 * 60 * 24,
     )
@@ -0,0 +1,71 @@
+import gzip
+from tempfile import SpooledTemporaryFile
+
+from django.core.servers.basehttp import FileWrapper
+from django.http import HttpResponse
+from django.middleware.gzip import re_accepts_gzip
+from django.utils.cache import patch_vary_headers
+
+from .conf import conf
+
+
+
+class StreamingHttpResponse(HttpResponse):
+    """
+    An HttpResponse whose content is an iterator, streamed to the client
+    without ever being joined into a single string.
+
+    The middleware in ``mlt.core.middleware`` leaves the content of streaming
+    responses unread.
+
+    """
+    streaming = True
+
+
+
+def spooled_response(request, write, content_type):
+    """
+    Return a ``StreamingHttpResponse`` of the content written by ``write``,
+    which is called with a file-like object to write to.
+
+    Content is spooled to a temporary file once it exceeds
+    ``MLT_SPOOL_MAX_SIZE`` bytes, and then streamed in chunks, so it is never
+    held in memory all at once. Since GZipMiddleware can't compress streaming
+    responses, content is gzipped as it is written if the client accepts it.
+
+    """
+    spool = SpooledTemporaryFile(max_size=conf.MLT_SPOOL_MAX_SIZE)
+
+    compress = _accepts_gzip(request, content_type)
+    if compress:
+        out = gzip.GzipFile(mode="wb", fileobj=spool)
+        write(out)
+        # closes only the GzipFile, not the spool
+        out.close()
+    else:
+        write(spool)
+
+    length = spool.tell()
+    spool.seek(0)
+
+    response = StreamingHttpResponse(
+        FileWrapper(spool, conf.MLT_STREAM_CHUNK_SIZE),
+        content_type=content_type)
+    response["Content-Length"] = str(length)
+    patch_vary_headers(response, ("Accept-Encoding",))
+    if compress:
+        response["Content-Encoding"] = "gzip"
+
+    return response
+
+
+
+def _accepts_gzip(request, content_type):
+    # same rules as django.middleware.gzip.GZipMiddleware
+    if "msie" in request.META.get("HTTP_USER_AGENT", "").lower():
+        if (not content_type.startswith("text/") or
+                "javascript" in content_type):
+            return False
+
+    return bool(
+        re_accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
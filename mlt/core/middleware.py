@@ -0,0 +1,51 @@
+"""
+Versions of middleware that read the content of every response, modified to
+leave the content of streaming responses (see ``mlt.core.http``) unread; and
+middleware running work deferred until commit (see ``mlt.core.aftercommit``).
+
+"""
+from django.middleware import gzip
+
+from messages_ui import middleware as messages_ui
+
+from . import aftercommit
+
+
+
+class StreamingExemptMixin(object):
+    def process_response(self, request, response):
+        if getattr(response, "streaming", False):
+            return response
+        return super(StreamingExemptMixin, self).process_response(
+            request, response)
+
+
+
+class GZipMiddleware(StreamingExemptMixin, gzip.GZipMiddleware):
+    pass
+
+
+
+class AjaxMessagesMiddleware(StreamingExemptMixin,
+                             messages_ui.AjaxMessagesMiddleware):
+    pass
+
+
+
+class AfterCommitMiddleware(object):
+    """
+    Runs the work queued by ``aftercommit.on_commit`` during a request once
+    its transaction has committed; must come before TransactionMiddleware.
+
+    """
+    def process_request(self, request):
+        aftercommit.discard_pending()
+
+
+    def process_response(self, request, response):
+        aftercommit.run_pending()
+        return response
+
+
+    def process_exception(self, request, exception):
+        aftercommit.discard_pending()
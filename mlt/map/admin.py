@@ -55,6 +55,14 @@ class AddressAdmin(admin.ModelAdmin):
         ]
 
 
+    def save_formset(self, request, form, formset, change):
+        super(AddressAdmin, self).save_formset(request, form, formset, change)
+        # inline batch associations are saved without m2m_changed signals
+        if formset.model is models.Address.batches.through:
+            models.Address.objects.refresh_batch_timestamps(
+                [form.instance.pk])
+
+
 
 class ParcelAdmin(admin.OSMGeoAdmin):
     list_display = [
@@ -1,4 +1,16 @@
-from .. import filters
+from django.db.models import Q
+
+from .. import filters, models
+
+
+
+def match_key(value):
+    """
+    Return the match key of a "street, city, state" ``value``.
+
+    """
+    bits = [bit.strip() for bit in value.rsplit(",", 2)]
+    return models.address_match_key(*(bits + [""] * (3 - len(bits))))
 
 
 
@@ -7,6 +19,14 @@ class ApiAddressFilter(filters.AddressFilter):
         "batches__tag", "mapped_by__username"]
 
 
+    # "match" finds duplicates of "street, city, state" on the indexed keys
+    special_fields = dict(
+        filters.AddressFilter.special_fields,
+        match=lambda vals: (
+            Q(match_key__in=[match_key(v) for v in vals]) |
+            Q(street_key__in=[match_key(v) for v in vals])))
+
+
 
 class ApiBatchFilter(filters.Filter):
     fields = [
@@ -17,3 +37,9 @@ class ApiBatchFilter(filters.Filter):
 
 
     date_fields = set(["timestamp"])
+
+
+
+class ApiAddressChangeFilter(filters.AddressChangeFilter):
+    fields = filters.AddressChangeFilter.fields + [
+        "address__batches__tag", "changed_by__username"]
@@ -7,4 +7,5 @@ urlpatterns = patterns(
     url("^$", "home", name="api_home"),
     url("^addresses/$", "addresses", name="api_addresses"),
     url("^batches/$", "batches", name="api_batches"),
+    url("^history/$", "history", name="api_history"),
 )
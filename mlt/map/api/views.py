@@ -1,7 +1,9 @@
 from django.core.urlresolvers import reverse
 from django.utils.functional import wraps
 
-from .. import models, paging, sort
+from .. import counts, models, paging, sort
+from ..filters import parse_as_of
+from ..serializers import AddressChangeSerializer
 from ..views import json_response
 from . import filters, serializers
 
@@ -39,6 +41,7 @@ def home(request):
                 {
                 "addresses": reverse("api_addresses"),
                 "batches": reverse("api_batches"),
+                "history": reverse("api_history"),
                 },
             "success": True,
             })
@@ -51,15 +54,19 @@ def addresses(request):
     API addresses list.
 
     """
-    qs = filters.ApiAddressFilter().apply(
-        models.Address.objects.prefetch("batches"),
+    address_filter = filters.ApiAddressFilter()
+    qs = address_filter.apply(
+        models.Address.objects.prefetch("batches").rows(),
         request.GET)
 
-    total = qs.count()
+    total, total_exact = counts.count(
+        qs,
+        filtered=address_filter.active(request.GET),
+        exact=request.GET.get("exact", "false").lower() not in ["false", "0"])
 
+    sort_fields = request.GET.getlist("sort") or ["-latest_batch_timestamp"]
     try:
-        qs = sort.apply(
-            qs, request.GET.getlist("sort") or ["-latest_batch_timestamp"])
+        qs = sort.apply(qs, sort_fields)
     except sort.BadSort as e:
         return json_response(
             {
@@ -68,12 +75,17 @@ def addresses(request):
                 }
             )
 
-    qs = paging.apply(qs, request.GET)
+    try:
+        qs, next_cursor = paging.keyset(qs, request.GET, sort_fields)
+    except paging.BadCursor as e:
+        return json_response({"success": False, "error": str(e)})
 
     return json_response(
         {
             "success": True,
             "total": total,
+            "total_exact": total_exact,
+            "next_cursor": next_cursor,
             "addresses": serializers.ApiAddressSerializer(
                 exclude=["latitude", "longitude"]).many(qs),
             }
@@ -93,9 +105,9 @@ def batches(request):
 
     total = qs.count()
 
+    sort_fields = request.GET.getlist("sort") or ["-timestamp"]
     try:
-        qs = sort.apply(
-            qs, request.GET.getlist("sort") or ["-timestamp"])
+        qs = sort.apply(qs, sort_fields)
     except sort.BadSort as e:
         return json_response(
             {
@@ -104,12 +116,71 @@ def batches(request):
                 }
             )
 
-    qs = paging.apply(qs, request.GET)
+    try:
+        qs, next_cursor = paging.keyset(qs, request.GET, sort_fields)
+    except paging.BadCursor as e:
+        return json_response({"success": False, "error": str(e)})
 
     return json_response(
         {
             "success": True,
             "total": total,
+            "next_cursor": next_cursor,
             "batches": serializers.ApiBatchSerializer().many(qs),
             }
         )
+
+
+
+@api_key_required
+def history(request):
+    """
+    API address history list. Given an "as_of" date, lists the latest change
+    to each address at or before that date, whose post snapshot is the
+    address as it was then.
+
+    """
+    qs = models.AddressChange.objects.select_related(
+        "pre", "post", "changed_by").prefetch_linked("parcels")
+
+    as_of = request.GET.get("as_of")
+    if as_of is not None:
+        timestamp = parse_as_of(as_of)
+        if timestamp is None:
+            return json_response(
+                {"success": False, "error": "Bad as_of date: %s" % as_of})
+        qs = qs.as_of(timestamp)
+
+    change_filter = filters.ApiAddressChangeFilter()
+    qs = change_filter.apply(qs, request.GET)
+
+    total, total_exact = counts.count(
+        qs,
+        filtered=as_of is not None or change_filter.active(request.GET),
+        exact=request.GET.get("exact", "false").lower() not in ["false", "0"])
+
+    sort_fields = request.GET.getlist("sort") or ["-changed_timestamp"]
+    try:
+        qs = sort.apply(qs, sort_fields)
+    except sort.BadSort as e:
+        return json_response(
+            {
+                "success": False,
+                "error": "Bad sort fields: %s" % (", ".join(e.bad_fields)),
+                }
+            )
+
+    try:
+        qs, next_cursor = paging.keyset(qs, request.GET, sort_fields)
+    except paging.BadCursor as e:
+        return json_response({"success": False, "error": str(e)})
+
+    return json_response(
+        {
+            "success": True,
+            "total": total,
+            "total_exact": total_exact,
+            "next_cursor": next_cursor,
+            "changes": AddressChangeSerializer().many(qs),
+            }
+        )
@@ -0,0 +1,470 @@
+"""
+Autocomplete candidate lookup for filters.
+
+Candidates are answered, where possible, from a cached index of the distinct
+values of every autocompleted field, sorted for prefix search (each process
+keeps a copy of the cached indexes it uses, until they change). An index is
+built by a task, off the request path, when first needed, and kept current as
+addresses are saved and their changes recorded (see ``record``). Any other
+write (in bulk, or racing another) makes it stale: until it is old enough to
+be rebuilt, candidates come from the stale index plus those of the rows
+written since it was built, found through their recorded history. Indexes
+are rebuilt once that old even if current, as one built while a write was
+not yet committed may be missing that write's values.
+
+From the database, the candidates for every field are fetched in a single
+query (a UNION ALL of one limited query per field), and cached briefly by
+prefix: while the user keeps typing, the candidates already fetched for a
+shorter prefix are narrowed down rather than fetched again, for every field
+that had no more than the maximum number of candidates.
+
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Model
+from django.db.models.fields import FieldDoesNotExist
+from django.db.models.sql.constants import LOOKUP_SEP
+
+from ..core.conf import conf
+from . import counts
+
+
+
+GENERATION_KEY = "autocomplete:generation"
+
+# per-process copies of the cached indexes (see FieldIndexes) last used, by
+# _index_key
+_indexes = {}
+
+
+
+def candidates(qs, fields, q, limit):
+    """
+    Return a dictionary mapping each field in ``fields`` (a dictionary of
+    value lookup to display-value lookup, on the model of ``qs``) to the list
+    of (display value, value) tuples of ``qs`` whose display value starts
+    (case-insensitively) with ``q``, or to ``None`` if there are more than
+    ``limit`` of them.
+
+    """
+    prefix = q.lower()
+
+    indexes = _current_indexes(qs, fields)
+    if indexes is not None:
+        if indexes.version == counts.version():
+            return indexes.search(prefix, limit)
+        written = _written_since(qs, indexes.started)
+        if written is not None:
+            return merge(
+                indexes.search(prefix, limit),
+                query(written, fields, q, limit),
+                limit)
+
+    key_base = _key_base(qs, fields, limit)
+
+    found = {}
+    for end in range(len(prefix), 0, -1):
+        cached = cache.get(_key(key_base, prefix[:end]))
+        if cached is None:
+            continue
+        for field, options in cached.items():
+            if field not in found and options is not None:
+                found[field] = [
+                    (display, value) for display, value in options
+                    if display.lower().startswith(prefix)
+                    ]
+        if len(found) == len(fields):
+            break
+
+    missing = dict(
+        (field, full_field) for field, full_field in fields.items()
+        if field not in found)
+    if missing:
+        found.update(query(qs, missing, q, limit))
+
+    cache.set(
+        _key(key_base, prefix), found, conf.MLT_AUTOCOMPLETE_CACHE_TIMEOUT)
+
+    return found
+
+
+
+def query(qs, fields, q=None, limit=None):
+    """
+    Return candidates (as for ``candidates``) from the database, in one query.
+    If ``q`` is None, returns all distinct values of each field; if ``limit``
+    is None, returns them however many there are.
+
+    """
+    if not fields:
+        return {}
+
+    names = sorted(fields)
+    selects = []
+    params = []
+    for i, field in enumerate(names):
+        full_field = fields[field]
+        # in one filter() call, so multi-valued relations are joined once
+        lookups = {"%s__isnull" % full_field: False}
+        if q is not None:
+            lookups["%s__istartswith" % full_field] = q
+        field_qs = qs.filter(**lookups).values_list(
+            full_field, field).order_by(full_field).distinct()
+        if limit is not None:
+            field_qs = field_qs[:limit + 1]
+        sql, field_params = field_qs.query.get_compiler(qs.db).as_sql()
+        # values are cast to text so that the selects are union-compatible
+        selects.append(
+            "SELECT %(i)s, CAST(s%(i)s.d AS text), CAST(s%(i)s.v AS text) "
+            "FROM (%(sql)s) AS s%(i)s (d, v)" % {"i": i, "sql": sql})
+        params.extend(field_params)
+
+    cursor = connections[qs.db].cursor()
+    cursor.execute(" UNION ALL ".join(selects), params)
+
+    options = defaultdict(list)
+    for i, display, value in cursor.fetchall():
+        options[names[i]].append((display, value))
+
+    found = {}
+    for field in names:
+        if limit is not None and len(options[field]) > limit:
+            found[field] = None
+        else:
+            to_python = value_converter(qs.model, field)
+            found[field] = sorted(
+                [
+                    (display, to_python(value))
+                    for display, value in options[field]
+                    ],
+                key=lambda option: (option[0].lower(), option[0]))
+    return found
+
+
+
+def merge(found, more, limit):
+    """
+    Return the union of two sets of candidates (as returned by
+    ``candidates``) for the same fields, or ``None`` for each field with more
+    than ``limit`` of them.
+
+    """
+    merged = {}
+    for field, options in found.items():
+        more_options = more[field]
+        if options is None or more_options is None:
+            merged[field] = None
+            continue
+        options = sorted(
+            set(options).union(more_options),
+            key=lambda option: (option[0].lower(), option[0]))
+        merged[field] = options if len(options) <= limit else None
+    return merged
+
+
+
+def record(instance, versions):
+    """
+    Add the field values of ``instance`` (an Address or AddressChange) to the
+    cached indexes used by this process that were current until the write of
+    ``instance`` moved the data version on, keeping them current.
+    ``versions`` is the tuple of the version moved on from and the new one,
+    as returned by ``counts.invalidate``; if the former isn't known, the
+    indexes are left stale.
+
+    Values no longer in use after the write aren't removed from the indexes;
+    they just go until the next rebuild.
+
+    """
+    previous, version = versions
+    if previous is None:
+        return
+    for key in list(_indexes):
+        indexes = _cached_indexes(key)
+        if indexes is None or indexes.version != previous:
+            continue
+        if indexes.model is instance.__class__:
+            indexes.add_instance(instance)
+        indexes.version = version
+        _store(key, indexes)
+
+
+
+def build(qs, fields):
+    """
+    Build and cache the indexes for ``fields`` of ``qs`` (see
+    ``tasks.build_autocomplete_indexes``).
+
+    """
+    key = _index_key(qs, fields)
+    try:
+        _store(key, FieldIndexes(qs, fields))
+    finally:
+        cache.delete(_cache_key("building", key))
+
+
+
+def clear_indexes():
+    """
+    Drop all indexes (e.g. when their data is rolled back).
+
+    """
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, int(time.time()))
+    _indexes.clear()
+
+
+
+class PrefixIndex(object):
+    """
+    The distinct (display value, value) options of an autocomplete field,
+    sorted case-insensitively for prefix search.
+
+    """
+    def __init__(self, options=()):
+        self._entries = sorted(
+            set((display.lower(), display, value)
+                for display, value in options))
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def add(self, display, value):
+        entry = (display.lower(), display, value)
+        i = bisect_left(self._entries, entry)
+        if i == len(self._entries) or self._entries[i] != entry:
+            self._entries.insert(i, entry)
+
+
+    def search(self, prefix, limit):
+        """
+        Return the list of options whose display value starts with
+        ``prefix`` (lower case), or ``None`` if there are more than ``limit``.
+
+        """
+        options = []
+        for i in xrange(bisect_left(self._entries, (prefix,)),
+                        len(self._entries)):
+            key, display, value = self._entries[i]
+            if not key.startswith(prefix):
+                break
+            if len(options) == limit:
+                return None
+            options.append((display, value))
+        return options
+
+
+
+class FieldIndexes(object):
+    """
+    Prefix indexes for each of the autocomplete ``fields`` of ``qs``, as of
+    the data version at which they were built.
+
+    """
+    def __init__(self, qs, fields):
+        self.model = qs.model
+        self.fields = fields
+        self.version = counts.version()
+        self.built = time.time()
+        # rows written from here on may be missing from the indexes
+        self.started = datetime.now()
+
+        options = query(qs, fields)
+        self.indexes = dict(
+            (field, PrefixIndex(options[field])) for field in fields)
+
+
+    @property
+    def stamp(self):
+        """
+        What tells this from other builds or versions of the same indexes.
+
+        """
+        return (self.version, self.built)
+
+
+    def search(self, prefix, limit):
+        return dict(
+            (field, index.search(prefix, limit))
+            for field, index in self.indexes.items()
+            )
+
+
+    def add_instance(self, instance):
+        for field, full_field in self.fields.items():
+            # multi-valued relations aren't changed by saving the instance
+            display = _lookup(instance, full_field)
+            if isinstance(display, basestring) and display:
+                self.indexes[field].add(display, _lookup(instance, field))
+
+
+
+def _current_indexes(qs, fields):
+    """
+    Return the indexes for ``fields`` of ``qs``, current or stale; or
+    ``None`` if there are none yet. Starts building them if there are none or
+    they are due a rebuild.
+
+    """
+    key = _index_key(qs, fields)
+    indexes = _cached_indexes(key)
+    if (indexes is None or time.time() - indexes.built >=
+            conf.MLT_AUTOCOMPLETE_INDEX_REBUILD_AGE):
+        _start_build(key, qs, fields)
+        # already built if tasks run eagerly
+        indexes = _cached_indexes(key)
+    return indexes
+
+
+
+def _start_build(key, qs, fields):
+    """
+    Start building indexes for ``fields`` of ``qs`` with a task, unless
+    they are being built already.
+
+    """
+    from .tasks import build_autocomplete_indexes
+    if cache.add(
+            _cache_key("building", key), True,
+            conf.MLT_AUTOCOMPLETE_INDEX_REBUILD_AGE):
+        build_autocomplete_indexes.delay(qs, fields)
+
+
+
+def _cached_indexes(key):
+    """
+    Return the cached indexes under ``key``, or ``None``; from this process'
+    copy if that is still the one cached.
+
+    """
+    stamp = cache.get(_cache_key("stamp", key))
+    indexes = _indexes.get(key)
+    if stamp is None or indexes is None or indexes.stamp != stamp:
+        indexes = cache.get(_cache_key("index", key))
+        if indexes is None or indexes.stamp != stamp:
+            _indexes.pop(key, None)
+            return None
+        _indexes[key] = indexes
+    return indexes
+
+
+
+def _store(key, indexes):
+    _indexes[key] = indexes
+    timeout = conf.MLT_AUTOCOMPLETE_INDEX_CACHE_TIMEOUT
+    cache.set(_cache_key("index", key), indexes, timeout)
+    # last, so the indexes are never older than their stamp
+    cache.set(_cache_key("stamp", key), indexes.stamp, timeout)
+
+
+
+def _written_since(qs, timestamp):
+    """
+    Return the rows of ``qs`` (of addresses or of their changes) written at
+    or after ``timestamp``, as told by their recorded history; or ``None`` if
+    that can't be told for the model of ``qs``. Changes to batch membership
+    aren't recorded, so new batch tags wait for the next rebuild.
+
+    """
+    from .models import Address, AddressChange
+    if qs.model is AddressChange:
+        return qs.filter(changed_timestamp__gte=timestamp)
+    if qs.model is Address:
+        return qs.filter(
+            pk__in=AddressChange._base_manager.filter(
+                changed_timestamp__gte=timestamp).values("address"))
+    return None
+
+
+
+# returned by _lookup for lookups across multi-valued relations
+_MULTIVALUED = object()
+
+
+
+def _lookup(instance, lookup):
+    """
+    Return the value of ``lookup`` (e.g. "mapped_by__username") on
+    ``instance``; the primary key if that's a related object.
+
+    """
+    obj = instance
+    names = lookup.split(LOOKUP_SEP)
+    for i, name in enumerate(names):
+        if obj is None:
+            return None
+        field, field_model, direct, m2m = obj._meta.get_field_by_name(name)
+        if m2m or not direct:
+            return _MULTIVALUED
+        if field.rel and i == len(names) - 1:
+            # no need to fetch the related object for its key
+            return getattr(obj, field.attname)
+        obj = getattr(obj, name)
+    if isinstance(obj, Model):
+        obj = obj.pk
+    return obj
+
+
+
+def value_converter(model, lookup):
+    """
+    Return a function converting the text form of a value of the field
+    reached by ``lookup`` on ``model`` (or of its target, for relations) back
+    to a Python value.
+
+    """
+    field = None
+    opts = model._meta
+    for name in lookup.split(LOOKUP_SEP):
+        try:
+            field, field_model, direct, m2m = opts.get_field_by_name(name)
+        except FieldDoesNotExist:
+            return lambda value: value
+        if not direct:
+            return lambda value: value
+        if field.rel:
+            opts = field.rel.to._meta
+            field = field.rel.get_related_field()
+    return field.to_python
+
+
+
+def _index_key(qs, fields):
+    sql, params = qs.order_by().query.get_compiler(qs.db).as_sql()
+    return repr((sql, tuple(params), sorted(fields.items())))
+
+
+
+def _key_base(qs, fields, limit):
+    return repr((counts.version(), _index_key(qs, fields), limit))
+
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, int(time.time()))
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+
+def _cache_key(kind, key):
+    return "autocomplete:%s:%s:%s" % (
+        kind, _generation(), hashlib.md5(key.encode("utf-8")).hexdigest())
+
+
+
+def _key(key_base, prefix):
+    return "autocomplete:%s" % hashlib.md5(
+        (key_base + repr(prefix)).encode("utf-8")).hexdigest()
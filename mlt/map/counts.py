@@ -0,0 +1,113 @@
+"""
+Cached (and, for very large unfiltered lists, estimated) counts of list
+querysets.
+
+Exact counts are cached per normalized query (its SQL and parameters, so
+requests filtering the same way in different words share a count) under a
+data version, which is bumped by ``invalidate`` on every write to addresses,
+their batches or their history. Cached counts thus never outlive a write,
+except one racing a count from another, not yet committed, transaction; the
+cache timeout bounds that.
+
+"""
+import hashlib
+import re
+import time
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models.sql.datastructures import EmptyResultSet
+
+from ..core.conf import conf
+
+
+
+VERSION_KEY = "counts:version"
+
+ROWS_RE = re.compile(r"\brows=(\d+)")
+
+
+
+def count(qs, filtered=True, exact=False):
+    """
+    Return a tuple (count, is_exact) for the given queryset.
+
+    The count of an unfiltered queryset (``filtered`` False) the planner
+    estimates at ``MLT_COUNT_ESTIMATE_THRESHOLD`` rows or more is that
+    estimate, unless an exact count is cached or required (``exact`` True).
+
+    """
+    qs = qs.order_by()
+    try:
+        key = _key(qs)
+    except EmptyResultSet:
+        return 0, True
+
+    value = cache.get(key)
+    if value is not None:
+        return value, True
+
+    if not (filtered or exact):
+        estimate = _estimate(qs)
+        if estimate >= conf.MLT_COUNT_ESTIMATE_THRESHOLD:
+            return estimate, False
+
+    value = qs.count()
+    cache.set(key, value, conf.MLT_COUNT_CACHE_TIMEOUT)
+    return value, True
+
+
+
+def invalidate():
+    """
+    Drop all cached counts (by moving on to a new data version). Returns a
+    tuple of the version moved on from and the new version; the former is
+    ``None`` if it isn't known (the version having been dropped from the
+    cache, and started over).
+
+    """
+    try:
+        current = cache.incr(VERSION_KEY)
+    except ValueError:
+        current = int(time.time())
+        cache.set(VERSION_KEY, current)
+        return None, current
+    return current - 1, current
+
+
+
+def version():
+    """
+    Return the current data version, which changes on every ``invalidate``.
+
+    """
+    current = cache.get(VERSION_KEY)
+    if current is None:
+        cache.add(VERSION_KEY, int(time.time()))
+        current = cache.get(VERSION_KEY)
+    return current
+
+
+
+def _sql(qs):
+    return qs.query.get_compiler(qs.db).as_sql()
+
+
+
+def _key(qs):
+    sql, params = _sql(qs)
+    digest = hashlib.md5(repr((sql, tuple(params)))).hexdigest()
+    return "counts:%s:%s" % (version(), digest)
+
+
+
+def _estimate(qs):
+    """
+    Return the query planner's estimate of the number of rows in ``qs``.
+
+    """
+    sql, params = _sql(qs)
+    cursor = connections[qs.db].cursor()
+    cursor.execute("EXPLAIN " + sql, params)
+    match = ROWS_RE.search(cursor.fetchone()[0])
+    return int(match.group(1)) if match else 0
@@ -2,11 +2,15 @@ import datetime
 from itertools import chain, repeat
 import operator
 
-from django.db.models import Q, Max
+from django.db.models import Q
+from django.db.models.fields import FieldDoesNotExist
+from django.db.models.sql.constants import LOOKUP_SEP
 from django.utils.dateformat import format
 
 from dateutil.parser import parse
 
+from . import autocomplete
+
 
 MAX_AUTOCOMPLETE = 12
 
@@ -60,6 +64,28 @@ def parse_date_range(q):
     return fromto
 
 
+def parse_as_of(q):
+    """
+    Given a string query, attempt to parse it as the point in time of an
+    as-of history query. On failure return None, on success return the
+    datetime.
+
+    A date with no time of day means the end of that day.
+
+    """
+    if not q.strip():
+        return None
+
+    try:
+        as_of = parse_date(q)
+    except (ValueError, TypeError):
+        return None
+
+    if as_of.time() == datetime.time():
+        as_of = as_of + datetime.timedelta(days=1)
+    return as_of
+
+
 
 class Filter(object):
     """
@@ -111,7 +137,18 @@ class Filter(object):
         options = []
         too_many = []
         date_range = parse_date_range(q)
-        for field, (display_field, full_field) in self.autocomplete_fields.items():
+        autocomplete_fields = self.autocomplete_fields
+        candidates = autocomplete.candidates(
+            qs,
+            dict(
+                (field, full_field)
+                for field, (display_field, full_field)
+                in autocomplete_fields.items()
+                if field not in self.date_fields
+                ),
+            q,
+            MAX_AUTOCOMPLETE)
+        for field, (display_field, full_field) in autocomplete_fields.items():
             if field in self.date_fields:
                 if date_range:
                     value = " to ".join([
@@ -126,14 +163,11 @@ class Filter(object):
                             "replace": True,
                             })
             else:
-                field_options = (qs.filter(
-                        **{"%s__istartswith" % full_field: q}).values_list(
-                        full_field, field).distinct())
-                if field_options.count() > MAX_AUTOCOMPLETE:
+                field_options = candidates[field]
+                if field_options is None:
                     too_many.append(display_field)
                     continue
-                for option in field_options:
-                    display_value, value = option
+                for display_value, value in field_options:
                     options.append({
                             "q": q,
                             "display_value": display_value,
@@ -150,21 +184,39 @@ class Filter(object):
             }
 
 
+    def active(self, filter_data):
+        """
+        Return True if ``filter_data`` filters by any of this filter's fields.
+
+        """
+        return bool(
+            set(filter_data).intersection(
+                chain(self.fields, self.special_fields, self.override_fields)))
+
+
     def apply(self, qs, filter_data):
+        """
+        Filter ``qs`` by ``filter_data``.
+
+        Filters across multi-valued relations (e.g. address batches) are
+        compiled to ``pk__in`` subqueries rather than joins, so they can't
+        duplicate rows and the result needs no ``distinct()``.
+
+        """
         filters = Q()
         for field in self.fields:
             if field in filter_data:
+                q = Q()
                 if field in self.raw_fields:
-                    filters = filters & Q(
-                        **{"%s__in" % field: filter_data.getlist(field)})
+                    q = Q(**{"%s__in" % field: filter_data.getlist(field)})
                 elif field in self.date_fields:
-                    for q in filter_data.getlist(field):
+                    for val in filter_data.getlist(field):
                         try:
-                            from_date, to_date = parse_date_range(q)
+                            from_date, to_date = parse_date_range(val)
                         except (ValueError, TypeError):
                             pass
                         else:
-                            filters = filters & Q(
+                            q = q & Q(
                                 **{
                                     "%s__gte" % field: from_date,
                                     "%s__lte" % field:
@@ -172,10 +224,9 @@ class Filter(object):
                                     }
                                   )
                 else:
-                    q = Q()
                     for val in filter_data.getlist(field):
                         q = q | Q(**{field: val})
-                    filters = filters & q
+                filters = filters & unjoined(qs.model, q)
 
         for op, (field, data) in chain(
             zip(repeat(operator.and_), self.special_fields.items()),
@@ -184,15 +235,67 @@ class Filter(object):
 
             if field in filter_data:
                 if callable(data):
-                    filters = op(filters, data(filter_data.getlist(field)))
+                    filters = op(
+                        filters,
+                        unjoined(qs.model, data(filter_data.getlist(field))))
                 else:
                     value = filter_data.get(field, None)
                     if value in data:
-                        filters = op(filters, data[value])
+                        filters = op(
+                            filters, unjoined(qs.model, data[value]))
 
-        qs = qs.filter(filters)
+        return qs.filter(filters)
 
-        return qs.distinct()
+
+
+def unjoined(model, q):
+    """
+    Return ``q`` (a filter on ``model``) as a ``pk__in`` subquery if it filters
+    across any multi-valued relation, so that applying it can't duplicate rows.
+
+    """
+    if not [l for l in lookups(q) if multivalued(model, l)]:
+        return q
+    return Q(pk__in=model._base_manager.filter(q).values("pk"))
+
+
+
+def lookups(q):
+    """
+    Yield the field lookups (e.g. "batches__tag__in") in the given Q object.
+
+    """
+    for child in q.children:
+        if isinstance(child, Q):
+            for lookup in lookups(child):
+                yield lookup
+        else:
+            yield child[0]
+
+
+
+def multivalued(model, lookup):
+    """
+    Return True if the given field lookup on ``model`` traverses a
+    many-to-many or reverse foreign key relation.
+
+    """
+    opts = model._meta
+    for name in lookup.split(LOOKUP_SEP):
+        try:
+            field, field_model, direct, m2m = opts.get_field_by_name(name)
+        except FieldDoesNotExist:
+            # "pk", or a lookup type such as "in"
+            return False
+        if m2m or (not direct and not field.field.unique):
+            return True
+        if direct and field.rel:
+            opts = field.rel.to._meta
+        elif not direct:
+            opts = field.model._meta
+        else:
+            return False
+    return False
 
 
 
@@ -210,12 +313,6 @@ class AddressFilter(Filter):
         ]
 
 
-    def apply(self, qs, filter_data):
-        if "latest_batch_timestamp" in filter_data:
-            qs = qs.annotate(latest_batch_timestamp=Max("batches__timestamp"))
-        return super(AddressFilter, self).apply(qs, filter_data)
-
-
     def get_autocomplete_fields(self):
         ret = super(AddressFilter, self).get_autocomplete_fields()
         ret["mapped_by"] = ("mapped by", "mapped_by__username")
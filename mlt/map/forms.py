@@ -36,6 +36,20 @@ class AddressForm(forms.ModelForm):
             ):
             raise forms.ValidationError("Please enter a street address.")
 
+        if self.instance.pk is None and not self._errors:
+            data = self.cleaned_data
+            # the input_street save() will give the new address
+            street = " ".join(
+                [
+                    data[f] for f in [
+                        "street_number", "street_prefix", "street_name",
+                        "street_type", "street_suffix"]
+                    if data[f]
+                    ]) or data["edited_street"]
+            if models.Address.objects.matching(
+                    street, data["city"], data["state"]).exists():
+                raise forms.ValidationError("This address already exists.")
+
         return self.cleaned_data
 
 
@@ -1,10 +1,15 @@
+from cStringIO import StringIO
 import csv
 import datetime
 
+from django.contrib.gis.geos import GEOSGeometry
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import connection, transaction
 
-from .models import Address, AddressBatch
+from ..core import aftercommit
+from .models import (
+    Address, AddressBatch, BulkChangeRecorder, ParcelMapping, temp_table_name)
+from . import counts
 
 
 
@@ -27,40 +32,54 @@ class AddressImporter(object):
 
     @transaction.commit_manually
     def process(self, rows):
-        if self.batch is not None:
-            self.batch.save()
+        """
+        Import the given rows (dictionaries of address data), skipping those
+        duplicating an existing address (or an earlier row), and adding all
+        to the batch, if any. Returns a tuple of the number of addresses
+        saved and the number of duplicates.
+
+        Raises ImporterError, importing nothing, if any row is bad.
+
+        """
+        try:
+            if self.batch is not None:
+                self.batch.save()
+
+            addresses = self.prepare(rows)
+            saved, dupes = StagedImport(
+                addresses, self.extra_data["user"], self.batch).run()
+        except:
+            transaction.rollback()
+            raise
+
+        transaction.commit()
+        aftercommit.run_pending()
+        return saved, dupes
+
 
+    def prepare(self, rows):
+        """
+        Return the list of new (unsaved) addresses for the given rows; or
+        raise ImporterError with the errors of all bad rows.
+
+        """
         errors = []
-        saved = 0
-        dupes = 0
+        addresses = []
         for i, r in enumerate(rows, 1):
             data = self.extra_data.copy()
             data.update(r)
             try:
-                created, addresses = Address.objects.create_from_input(**data)
-                if created:
-                    saved += 1
-                else:
-                    dupes += 1
+                addresses.append(Address.objects.prepare_from_input(**data))
             except ValidationError as e:
                 errors.append((i, e.message_dict))
             except TypeError:
-                transaction.rollback()
                 raise ImporterError(
                     [(i, {"?": [u"Extra or unknown columns in input."]})])
-            except:
-                transaction.rollback()
-                raise
-            else:
-                if self.batch is not None:
-                    self.batch.addresses.add(*addresses)
 
         if errors:
-            transaction.rollback()
             raise ImporterError(errors)
 
-        transaction.commit()
-        return saved, dupes
+        return addresses
 
 
 
@@ -83,3 +102,236 @@ class CSVAddressImporter(AddressImporter):
         if self.header:
             reader.next()
         return self.process(reader)
+
+
+
+class StagedImport(object):
+    """
+    Saves new addresses in bulk: COPYs them into a staging table, finds
+    duplicates (as ``AddressManager.create_from_input`` does, of existing
+    addresses or of earlier new ones) with a join, and inserts the rest, their
+    batch memberships and their history set-wise.
+
+    The staging tables are temporary tables of its own, dropped by ``run``
+    or else at the end of the transaction.
+
+    """
+    def __init__(self, addresses, user, batch=None):
+        self.addresses = addresses
+        self.user = user
+        self.batch = batch
+
+        self.name = temp_table_name("address_import")
+        self.table = "pg_temp.%s" % self.name
+        self.matches = "pg_temp.%s" % temp_table_name("address_import_match")
+
+        self.cursor = connection.cursor()
+        qn = connection.ops.quote_name
+        self.address_table = qn(Address._meta.db_table)
+        self.fields = [f for f in Address._meta.fields if not f.primary_key]
+        self.columns = [f.column for f in self.fields]
+
+
+    def run(self):
+        """
+        Save the addresses; return a tuple of the number saved and the number
+        of duplicates.
+
+        """
+        if not self.addresses:
+            return 0, 0
+
+        self._stage()
+        self._match()
+        saved = self._insert()
+        if self.batch is not None:
+            self._add_to_batch()
+        self._record()
+
+        counts.invalidate()
+        self.cursor.execute(
+            "SELECT DISTINCT pl FROM %s WHERE created AND pl <> ''"
+            % self.table)
+        ParcelMapping.objects.refresh([pl for (pl,) in self.cursor.fetchall()])
+
+        self.cursor.execute("DROP TABLE %s" % self.matches)
+        self.cursor.execute("DROP TABLE %s" % self.table)
+
+        return saved, len(self.addresses) - saved
+
+
+    def _stage(self):
+        # same column types (e.g. case-insensitive citext) as addresses
+        self.cursor.execute(
+            "CREATE TEMPORARY TABLE %s ON COMMIT DROP AS "
+            "SELECT * FROM %s WHERE false" % (self.table, self.address_table))
+        self.cursor.execute(
+            "ALTER TABLE %s ADD COLUMN line integer, "
+            "ADD COLUMN created boolean NOT NULL DEFAULT false" % self.table)
+
+        data = StringIO()
+        for line, address in enumerate(self.addresses, 1):
+            # street, match_key and street_key, as saving would set them
+            address.denormalize()
+            data.write("\t".join(
+                    [str(line)] +
+                    [_copy_value(getattr(address, f.attname))
+                     for f in self.fields]
+                    ) + "\n")
+        data.seek(0)
+        # copy_expert, as copy_from may quote the schema-qualified name
+        self.cursor.copy_expert(
+            "COPY %s (%s) FROM STDIN" % (
+                self.table, ", ".join(["line"] + self.columns)),
+            data)
+
+        for column in ["match_key", "street_key"]:
+            self.cursor.execute(
+                "CREATE INDEX %(name)s_%(c)s ON %(t)s (%(c)s)"
+                % {"name": self.name, "c": column, "t": self.table})
+        self.cursor.execute("ANALYZE %s" % self.table)
+
+
+    def _match(self):
+        """
+        Record the existing addresses each staged address duplicates, and
+        mark those duplicating neither an existing address nor an earlier
+        staged address as to be created.
+
+        """
+        # a union rather than an OR, so each join can use its key's index
+        self.cursor.execute(
+            "CREATE TEMPORARY TABLE %(m)s ON COMMIT DROP AS "
+            "SELECT s.line, a.id AS address_id FROM %(t)s s "
+            "JOIN %(addresses)s a ON a.match_key = s.match_key "
+            "WHERE NOT a.deleted "
+            "UNION SELECT s.line, a.id FROM %(t)s s "
+            "JOIN %(addresses)s a ON a.street_key = s.match_key "
+            "WHERE NOT a.deleted" % {
+                "m": self.matches,
+                "t": self.table,
+                "addresses": self.address_table,
+                })
+
+        self.cursor.execute(
+            "UPDATE %(t)s s SET created = true "
+            "WHERE s.line NOT IN (SELECT line FROM %(m)s) "
+            "AND NOT EXISTS (SELECT 1 FROM %(t)s e WHERE e.line < s.line "
+            "AND %(same)s AND e.line NOT IN (SELECT line FROM %(m)s))" % {
+                "t": self.table,
+                "m": self.matches,
+                "same": _same_address("e", "s"),
+                })
+
+
+    def _insert(self):
+        """
+        Insert the addresses to be created; return how many there were.
+
+        """
+        self.cursor.execute(
+            "SELECT pg_get_serial_sequence(%s, %s)",
+            [Address._meta.db_table, Address._meta.pk.column])
+        self.cursor.execute(
+            "UPDATE %s SET id = nextval(%%s) WHERE created" % self.table,
+            [self.cursor.fetchone()[0]])
+
+        # duplicates of earlier staged addresses match those created
+        self.cursor.execute(
+            "INSERT INTO %(m)s (line, address_id) "
+            "SELECT s.line, e.id FROM %(t)s s JOIN %(t)s e "
+            "ON e.created AND e.line < s.line AND %(same)s "
+            "WHERE NOT s.created AND s.line NOT IN (SELECT line FROM %(m)s)"
+            % {
+                "m": self.matches,
+                "t": self.table,
+                "same": _same_address("e", "s"),
+                })
+
+        columns = ", ".join(["id"] + self.columns)
+        self.cursor.execute(
+            "INSERT INTO %s (%s) SELECT %s FROM %s WHERE created" % (
+                self.address_table, columns, columns, self.table))
+        return self.cursor.rowcount
+
+
+    def _add_to_batch(self):
+        """
+        Add the created addresses, and those the others duplicate, to the
+        batch.
+
+        """
+        qn = connection.ops.quote_name
+        field = Address._meta.get_field("batches")
+        self.cursor.execute(
+            "INSERT INTO %(through)s (%(address_id)s, %(batch_id)s) "
+            "SELECT id, %%s FROM %(t)s WHERE created "
+            "UNION SELECT address_id, %%s FROM %(m)s" % {
+                "through": qn(field.m2m_db_table()),
+                "address_id": qn(field.m2m_column_name()),
+                "batch_id": qn(field.m2m_reverse_name()),
+                "t": self.table,
+                "m": self.matches,
+                },
+            [self.batch.id, self.batch.id])
+
+        # what AddressManager.refresh_batch_timestamps would compute, given
+        # the one new batch
+        self.cursor.execute(
+            "UPDATE %(addresses)s SET latest_batch_timestamp = %%s "
+            "WHERE id IN (SELECT id FROM %(t)s WHERE created "
+            "UNION SELECT address_id FROM %(m)s) "
+            "AND (latest_batch_timestamp IS NULL "
+            "OR latest_batch_timestamp < %%s)" % {
+                "addresses": self.address_table,
+                "t": self.table,
+                "m": self.matches,
+                },
+            [self.batch.timestamp, self.batch.timestamp])
+
+
+    def _record(self):
+        """
+        Record the creation of the created addresses.
+
+        """
+        created = Address.objects.extra(
+            where=["%s.id IN (SELECT id FROM %s WHERE created)" % (
+                    self.address_table, self.table)])
+        recorder = BulkChangeRecorder(created, datetime.datetime.now())
+        recorder.record(self.user, created=True)
+
+
+
+def _same_address(a, b):
+    """
+    Return SQL matching address ``b`` as a duplicate of ``a``: ``b``'s input
+    street is ``a``'s input street or street (see
+    ``AddressManager.matching``).
+
+    """
+    return (
+        "(%(a)s.match_key = %(b)s.match_key "
+        "OR %(a)s.street_key = %(b)s.match_key)" % {"a": a, "b": b})
+
+
+
+def _copy_value(value):
+    """
+    Return ``value`` in COPY's text format.
+
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, GEOSGeometry):
+        value = value.ewkt
+    elif isinstance(value, (datetime.date, datetime.datetime)):
+        value = value.isoformat()
+    if isinstance(value, unicode):
+        value = value.encode("utf-8")
+    else:
+        value = str(value)
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace(
+        "\n", "\\n").replace("\r", "\\r")
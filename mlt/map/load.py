@@ -1,11 +1,12 @@
 import datetime
 import sys
 
-from django.db import transaction
+from django.db import connection, transaction
 
 from django.contrib.gis.utils import LayerMapping
 
-from .models import Parcel
+from .models import Parcel, SIMPLIFIED_GEOMETRIES
+from . import tiles
 
 
 
@@ -37,8 +38,10 @@ def load_parcels(shapefile_path,
     # first delete existing parcels
     Parcel.objects.all().delete()
 
+    timestamp = datetime.datetime.now()
+
     lm = LayerMapping(
-        get_parcel_proxy(datetime.datetime.now()),
+        get_parcel_proxy(timestamp),
         shapefile_path, parcel_mapping, transform=True,
         transaction_mode='none')
 
@@ -49,10 +52,37 @@ def load_parcels(shapefile_path,
         silent=silent,
         stream=stream or sys.stdout)
 
+    simplify_parcels(timestamp)
+
+    tiles.invalidate_all()
+
     return Parcel.objects.count()
 
 
 
+def simplify_parcels(import_timestamp):
+    """
+    Precompute the simplified geometries (see ``SIMPLIFIED_GEOMETRIES``) for
+    all parcels loaded at the given import timestamp.
+
+    """
+    opts = Parcel._meta
+    qn = connection.ops.quote_name
+    cursor = connection.cursor()
+    for max_zoom, field_name, tolerance in SIMPLIFIED_GEOMETRIES:
+        cursor.execute(
+            "UPDATE %(table)s "
+            "SET %(simple)s = ST_Multi(ST_SimplifyPreserveTopology(%(geom)s, %%s)) "
+            "WHERE %(timestamp)s = %%s" % {
+                "table": qn(opts.db_table),
+                "simple": qn(opts.get_field(field_name).column),
+                "geom": qn(opts.get_field("geom").column),
+                "timestamp": qn(opts.get_field("import_timestamp").column),
+                },
+            [tolerance, import_timestamp])
+
+
+
 def get_parcel_proxy(timestamp):
     """
     Return a dynamic proxy subclass of Parcel that automatically sets its own
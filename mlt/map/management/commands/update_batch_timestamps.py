@@ -0,0 +1,16 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from mlt.map.models import Address
+
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every address' latest_batch_timestamp from its batches.")
+
+
+    @transaction.commit_on_success
+    def handle(self, *args, **options):
+        updated, timestamps = Address.objects.refresh_batch_timestamps()
+        self.stdout.write("Updated %s addresses.\n" % updated)
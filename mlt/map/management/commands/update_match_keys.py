@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from mlt.map.models import Address
+
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every address' duplicate-detection match_key and "
+        "street_key from its input street or street, city and state.")
+
+
+    @transaction.commit_on_success
+    def handle(self, *args, **options):
+        updated = Address.objects.refresh_match_keys()
+        self.stdout.write("Updated %s addresses.\n" % updated)
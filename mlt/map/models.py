@@ -1,8 +1,14 @@
 from collections import defaultdict
 from datetime import datetime
+import itertools
+import json
 import re
 
+from django.conf import settings
 from django.core.urlresolvers import reverse
+from django.db import connection, transaction
+from django.db.models import signals
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE
 
 from django.contrib.auth.models import User
 from django.contrib.gis.db import models
@@ -10,8 +16,13 @@ from django.contrib.gis.db.models.query import GeoQuerySet
 from django.contrib.localflavor.us.models import USStateField
 
 from .fields import CICharField
-from .tasks import (
-    record_address_change, record_bulk_changes, record_bulk_delete)
+from . import autocomplete, counts, tiles
+from .tasks import record_address_change
+
+
+
+# names of server-side cursors opened by ParcelQuerySet.stream_values()
+_stream_cursor_ids = itertools.count()
 
 
 
@@ -50,6 +61,173 @@ class ParcelQuerySet(GeoQuerySet):
         return super(ParcelQuerySet, self).__iter__()
 
 
+    def stream_values(self, *fields, **kwargs):
+        """
+        Like ``values(*fields)``, but read rows through a server-side cursor,
+        ``chunk_size`` at a time, so the full result set is never held in
+        memory (neither by psycopg2 nor here). Values are not converted from
+        their database representation (geometries are hex EWKB strings).
+
+        """
+        chunk_size = kwargs.pop("chunk_size", GET_ITERATOR_CHUNK_SIZE)
+
+        qs = self.values(*fields)
+        names = (
+            qs.query.extra_select.keys() +
+            qs.field_names +
+            qs.query.aggregate_select.keys()
+            )
+        sql, params = qs.query.get_compiler(using=qs.db).as_sql()
+
+        # ensure the connection is open
+        connection.cursor()
+        cursor = connection.connection.cursor(
+            "stream_values_%s" % _stream_cursor_ids.next())
+        if connection.use_debug_cursor or (
+                connection.use_debug_cursor is None and settings.DEBUG):
+            cursor = connection.make_debug_cursor(cursor)
+
+        try:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(names, row))
+        finally:
+            cursor.close()
+
+
+    def with_geojson(self, zoom=None, precision=None):
+        """
+        Defer all geometry fields, and instead select a ``geojson`` attribute:
+        the geometry to display at ``zoom``, rendered to GeoJSON by PostGIS
+        (with at most ``precision`` decimal places, if given).
+
+        """
+        opts = self.model._meta
+        qn = connection.ops.quote_name
+        column = lambda name: "%s.%s" % (
+            qn(opts.db_table), qn(opts.get_field(name).column))
+
+        field_name = geometry_field_for_zoom(zoom)
+        geom = column("geom")
+        if field_name != "geom":
+            geom = "COALESCE(%s, %s)" % (column(field_name), geom)
+
+        if precision is None:
+            select, params = "ST_AsGeoJSON(%s)" % geom, []
+        else:
+            select, params = "ST_AsGeoJSON(%s, %%s)" % geom, [precision]
+
+        return self.defer(*GEOMETRY_FIELDS).extra(
+            select={"geojson": select}, select_params=params)
+
+
+    def nearest(self, point, radius):
+        """
+        Limit to parcels within ``radius`` degrees of the GEOS ``point``
+        (using the spatial index), ordered by distance from it, and select
+        that ``distance`` (in meters; zero for parcels containing the point).
+
+        """
+        qn = connection.ops.quote_name
+        return self.filter(geom__dwithin=(point, radius)).extra(
+            select={
+                "distance": (
+                    "ST_Distance(%s.%s::geography, "
+                    "ST_GeomFromEWKT(%%s)::geography)" % (
+                        qn(self.model._meta.db_table), qn("geom"))
+                    )
+                },
+            select_params=[point.ewkt],
+            order_by=["distance"])
+
+
+    def with_mapping_summary(self):
+        """
+        Select the JSON summary of addresses mapped to each parcel (see
+        ``ParcelMapping``) along with the parcels, for ``Parcel.mapped_summary``.
+
+        """
+        qn = connection.ops.quote_name
+        return self.extra(
+            select={
+                "mapped_summary_json": (
+                    "SELECT %(addresses)s FROM %(summary)s "
+                    "WHERE %(summary)s.%(pl)s = %(parcel)s.%(pl)s" % {
+                        "addresses": qn("addresses"),
+                        "summary": qn(ParcelMapping._meta.db_table),
+                        "parcel": qn(self.model._meta.db_table),
+                        "pl": qn("pl"),
+                        }
+                    )
+                }
+            )
+
+
+    def clusters(self, cells, precision=None):
+        """
+        Group these parcels by centroid into a grid of ``cells`` by ``cells``
+        cells covering the web map, which are equal in longitude and in
+        (Mercator) map y, so that map tiles at a zoom level with ``cells`` a
+        multiple of its tiles across are each made of whole cells, and no
+        cell is split between tiles. Return a list with a dictionary for each
+        non-empty
+        cell, giving the "count" of parcels in it, how many of them are
+        "mapped", "unmapped" and "flagged" (see ``ParcelMapping``), and the
+        "geojson" point at the mean of their centroids (with at most
+        ``precision`` decimal places, if given).
+
+        """
+        qn = connection.ops.quote_name
+        parcel_ids, parcel_params = self.values("pk").query.get_compiler(
+            using=self.db).as_sql()
+
+        point = "ST_Centroid(ST_Collect(p.%s))" % qn("centroid")
+        if precision is None:
+            point, point_params = "ST_AsGeoJSON(%s)" % point, []
+        else:
+            point, point_params = "ST_AsGeoJSON(%s, %%s)" % point, [precision]
+
+        sql = (
+            "SELECT %(point)s, COUNT(*), COUNT(m.%(id)s), "
+            "SUM(CASE WHEN m.%(flagged)s > 0 THEN 1 ELSE 0 END) "
+            "FROM %(parcel)s p LEFT OUTER JOIN %(summary)s m "
+            "ON m.%(pl)s = p.%(pl)s "
+            "WHERE p.%(centroid)s IS NOT NULL AND p.%(id)s IN (" % {
+                "point": point,
+                "id": qn("id"),
+                "flagged": qn("flagged_count"),
+                "parcel": qn(self.model._meta.db_table),
+                "summary": qn(ParcelMapping._meta.db_table),
+                "pl": qn("pl"),
+                "centroid": qn("centroid"),
+                }
+            + parcel_ids
+            + ") GROUP BY floor((ST_X(%(c)s) + 180.0) / 360.0 * %%s), "
+            "floor((1.0 - ln(tan(radians(ST_Y(%(c)s))) + "
+            "1.0 / cos(radians(ST_Y(%(c)s)))) / pi()) / 2.0 * %%s)" % {
+                "c": "p.%s" % qn("centroid")}
+            )
+
+        cursor = connection.cursor()
+        cursor.execute(
+            sql, point_params + list(parcel_params) + [cells, cells])
+
+        return [
+            {
+                "geojson": geojson,
+                "count": count,
+                "mapped": mapped,
+                "unmapped": count - mapped,
+                "flagged": flagged or 0,
+                }
+            for geojson, count, mapped, flagged in cursor.fetchall()
+            ]
+
+
     def _fetch_mapped(self):
         # ensures result cache is fully populated
         len(self)
@@ -76,6 +254,32 @@ class ParcelManager(models.GeoManager):
 
 
 
+# Simplified parcel geometries for display at lower zoom levels, as tuples of
+# (maximum zoom, field name, simplification tolerance in degrees). Above the
+# highest listed zoom the full-resolution ``geom`` is used.
+SIMPLIFIED_GEOMETRIES = [
+    (14, "geom_low", 0.0001),
+    (16, "geom_medium", 0.00002),
+    ]
+
+
+# All Parcel geometry fields, for deferring when only the centroid is needed.
+GEOMETRY_FIELDS = ["geom"] + [f for (z, f, t) in SIMPLIFIED_GEOMETRIES]
+
+
+def geometry_field_for_zoom(zoom):
+    """
+    Return the name of the Parcel geometry field to display at ``zoom``.
+
+    """
+    if zoom is not None:
+        for max_zoom, field_name, tolerance in SIMPLIFIED_GEOMETRIES:
+            if zoom <= max_zoom:
+                return field_name
+    return "geom"
+
+
+
 class Parcel(models.Model):
     pl = models.CharField(max_length=8)
     address = models.CharField(max_length=27)
@@ -83,6 +287,13 @@ class Parcel(models.Model):
     classcode = models.CharField(max_length=55)
     geom = models.MultiPolygonField()
 
+    # precomputed by load_parcels(); see SIMPLIFIED_GEOMETRIES
+    geom_low = models.MultiPolygonField(blank=True, null=True)
+    geom_medium = models.MultiPolygonField(blank=True, null=True)
+
+    # denormalized centroid of geom, set on save
+    centroid = models.PointField(blank=True, null=True)
+
     import_timestamp = models.DateTimeField()
     deleted = models.BooleanField(default=False, db_index=True)
 
@@ -104,6 +315,12 @@ class Parcel(models.Model):
         return self.pl
 
 
+    def save(self, *args, **kwargs):
+        if self.geom is not None:
+            self.centroid = self.geom.centroid
+        return super(Parcel, self).save(*args, **kwargs)
+
+
     def delete(self):
         self.deleted = True
         self.save(force_update=True)
@@ -111,12 +328,29 @@ class Parcel(models.Model):
 
     @property
     def latitude(self):
-        return self.geom.centroid.y
+        return self._get_centroid().y
 
 
     @property
     def longitude(self):
-        return self.geom.centroid.x
+        return self._get_centroid().x
+
+
+    def _get_centroid(self):
+        if self.centroid is None:
+            return self.geom.centroid
+        return self.centroid
+
+
+    def geometry_for_zoom(self, zoom):
+        """
+        Return the (possibly simplified) geometry to display at ``zoom``.
+
+        Falls back to the full geometry if the simplified one hasn't been
+        computed.
+
+        """
+        return getattr(self, geometry_field_for_zoom(zoom)) or self.geom
 
 
     def _set_mapped_to(self, addresses):
@@ -148,89 +382,132 @@ class Parcel(models.Model):
         return bool(self.mapped_to)
 
 
+    @property
+    def mapped_summary(self):
+        """
+        List of {"id", "street", "needs_review"} dictionaries for the addresses
+        mapped to this parcel, read from the ParcelMapping summary rather than
+        the addresses themselves.
 
-class AddressBatch(models.Model):
-    """
-    Metadata for a batch of addresses loaded at a given time by a given user.
+        """
+        try:
+            data = self.mapped_summary_json
+        except AttributeError:
+            data = ParcelMapping.objects.filter(pl=self.pl).values_list(
+                "addresses", flat=True)
+            data = self.mapped_summary_json = data[0] if data else None
 
-    """
-    user = models.ForeignKey(
-        User, on_delete=models.PROTECT, related_name="address_batches")
-    timestamp = models.DateTimeField()
-    tag = models.CharField(max_length=100, unique=True)
+        return json.loads(data) if data else []
 
 
-    def __unicode__(self):
-        return self.tag
 
+# first key of the advisory locks taken on PLs by ParcelMappingManager.refresh
+PARCEL_MAPPING_LOCK = 1
 
-    class Meta:
-        verbose_name_plural = "address batches"
 
 
+class ParcelMappingManager(models.Manager):
+    def refresh(self, pls):
+        """
+        Recompute the mapping summaries for the given PLs from the addresses
+        currently mapped to them, and drop any cached map tiles showing them.
 
-class AddressBase(models.Model):
-    """
-    Abstract base class for both Address and AddressState.
+        """
+        pls = set(pls) - set([""])
+        if not pls:
+            return
+
+        cursor = connection.cursor()
+        # serialize concurrent refreshes of the same PLs until commit, so
+        # neither inserts a summary the other has just inserted, and each
+        # reads addresses as committed by the other (locks are taken in PL
+        # order, so refreshes of overlapping PLs can't deadlock)
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(%s, hashtext(s.pl)) "
+            "FROM (SELECT unnest(%s::text[]) AS pl ORDER BY 1) s",
+            [PARCEL_MAPPING_LOCK, sorted(pls)])
+
+        by_pl = defaultdict(list)
+        for aid, pl, street, needs_review in Address.objects.filter(
+                pl__in=pls).order_by("id").values_list(
+                "id", "pl", "street", "needs_review"):
+            by_pl[pl].append(
+                {"id": aid, "street": street, "needs_review": needs_review})
+
+        qn = connection.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        cursor.execute(
+            "DELETE FROM %s WHERE %s IN %%s" % (table, qn("pl")),
+            [tuple(pls)])
+        if by_pl:
+            cursor.executemany(
+                "INSERT INTO %s (%s) VALUES (%%s, %%s, %%s, %%s)" % (
+                    table,
+                    ", ".join([qn("pl"), qn("mapped_count"),
+                               qn("flagged_count"), qn("addresses")])),
+                [
+                    (
+                        pl,
+                        len(addresses),
+                        len([a for a in addresses if a["needs_review"]]),
+                        json.dumps(addresses),
+                        )
+                    for pl, addresses in by_pl.items()
+                    ]
+                )
 
-    """
-    # unmodified input data
-    input_street = CICharField(max_length=200, db_index=True)
+        tiles.invalidate_pls(pls)
 
-    # edited full street, only used if unparsed addresses are edited
-    edited_street = CICharField(max_length=200, blank=True)
 
-    # core address info
-    street_prefix = CICharField(max_length=20, blank=True)
-    street_number = CICharField(max_length=50, blank=True)
-    street_name = CICharField(max_length=100, blank=True)
-    street_type = CICharField(max_length=20, blank=True)
-    street_suffix = CICharField(max_length=20, blank=True)
-    multi_units = models.BooleanField(default=False)
-    city = CICharField(max_length=200, db_index=True)
-    state = USStateField(db_index=True)
-    complex_name = CICharField(max_length=250, blank=True)
-    notes = models.TextField(blank=True)
 
-    # denormalized street address for sorting and matching with incoming
-    street = CICharField(
-        max_length=200, blank=True, db_index=True)
+class ParcelMapping(models.Model):
+    """
+    Denormalized summary of the addresses mapped to a PL, so the parcel map
+    doesn't have to load every mapped address. Kept up to date by Address
+    saves, deletes and bulk updates.
 
-    # lat/lon data from geocoding
-    geocoded = models.PointField(blank=True, null=True)
+    """
+    pl = models.CharField(max_length=8, unique=True)
+    mapped_count = models.IntegerField(default=0)
+    flagged_count = models.IntegerField(default=0)
+    # JSON list of {"id", "street", "needs_review"} of mapped addresses
+    addresses = models.TextField(default="[]")
 
-    # mapping
-    pl = models.CharField(max_length=8, blank=True, db_index=True)
 
-    mapped_by = models.ForeignKey(
-        User, blank=True, null=True, on_delete=models.PROTECT,
-        related_name="%(class)s_mapped")
-    mapped_timestamp = models.DateTimeField(blank=True, null=True)
-    needs_review = models.BooleanField(default=False, db_index=True)
+    objects = ParcelMappingManager()
 
 
-    class Meta:
-        abstract = True
+    def __unicode__(self):
+        return self.pl
 
 
-    def __init__(self, *args, **kwargs):
-        super(AddressBase, self).__init__(*args, **kwargs)
 
-        self._parcel = None
-        self._parcel_fetched = False
+class AddressBatch(models.Model):
+    """
+    Metadata for a batch of addresses loaded at a given time by a given user.
+
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.PROTECT, related_name="address_batches")
+    timestamp = models.DateTimeField()
+    tag = models.CharField(max_length=100, unique=True)
 
 
     def __unicode__(self):
-        return "%s, %s %s" % (
-            self.street, self.city, self.state)
+        return self.tag
 
 
-    def save(self, *args, **kwargs):
-        self.street = (
-            self.parsed_street or self.edited_street or self.input_street)
-        return super(AddressBase, self).save(*args, **kwargs)
+    class Meta:
+        verbose_name_plural = "address batches"
+
 
 
+class AddressPropertiesMixin(object):
+    """
+    Properties derived from address data, shared by model instances (see
+    ``AddressBase``) and read-only rows (see ``AddressRow``).
+
+    """
     @property
     def latitude(self):
         if self.parcel:
@@ -269,6 +546,32 @@ class AddressBase(models.Model):
         return bool(self.parsed_street)
 
 
+    @property
+    def batch_tags(self):
+        if self._all_batches is None:
+            self._all_batches = self._fetch_batches()
+        return self._all_batches
+
+
+    def _fetch_batches(self):
+        """
+        Return the list of this address' batches, by timestamp, when they
+        weren't prefetched.
+
+        """
+        raise NotImplementedError
+
+
+    @property
+    def edit_url(self):
+        return reverse("map_edit_address", kwargs={"address_id": self.id})
+
+
+    @property
+    def add_tag_url(self):
+        return reverse("map_add_tag", kwargs={"address_id": self.id})
+
+
     @property
     def parcel(self):
         if not self._parcel_fetched:
@@ -289,6 +592,77 @@ class AddressBase(models.Model):
         return bool(self.parcel)
 
 
+
+class AddressBase(AddressPropertiesMixin, models.Model):
+    """
+    Abstract base class for both Address and AddressState.
+
+    """
+    # unmodified input data
+    input_street = CICharField(max_length=200, db_index=True)
+
+    # edited full street, only used if unparsed addresses are edited
+    edited_street = CICharField(max_length=200, blank=True)
+
+    # core address info
+    street_prefix = CICharField(max_length=20, blank=True)
+    street_number = CICharField(max_length=50, blank=True)
+    street_name = CICharField(max_length=100, blank=True)
+    street_type = CICharField(max_length=20, blank=True)
+    street_suffix = CICharField(max_length=20, blank=True)
+    multi_units = models.BooleanField(default=False)
+    city = CICharField(max_length=200, db_index=True)
+    state = USStateField(db_index=True)
+    complex_name = CICharField(max_length=250, blank=True)
+    notes = models.TextField(blank=True)
+
+    # denormalized street address for sorting and matching with incoming
+    street = CICharField(
+        max_length=200, blank=True, db_index=True)
+
+    # lat/lon data from geocoding
+    geocoded = models.PointField(blank=True, null=True)
+
+    # mapping
+    pl = models.CharField(max_length=8, blank=True, db_index=True)
+
+    mapped_by = models.ForeignKey(
+        User, blank=True, null=True, on_delete=models.PROTECT,
+        related_name="%(class)s_mapped")
+    mapped_timestamp = models.DateTimeField(blank=True, null=True)
+    needs_review = models.BooleanField(default=False, db_index=True)
+
+
+    class Meta:
+        abstract = True
+
+
+    def __init__(self, *args, **kwargs):
+        super(AddressBase, self).__init__(*args, **kwargs)
+
+        self._parcel = None
+        self._parcel_fetched = False
+
+
+    def __unicode__(self):
+        return "%s, %s %s" % (
+            self.street, self.city, self.state)
+
+
+    def save(self, *args, **kwargs):
+        self.denormalize()
+        return super(AddressBase, self).save(*args, **kwargs)
+
+
+    def denormalize(self):
+        """
+        Set the fields derived from others, as done on save.
+
+        """
+        self.street = (
+            self.parsed_street or self.edited_street or self.input_street)
+
+
     def data(self, internal=False):
         """
         Return a dictionary of the full data of this address (all fields which
@@ -354,7 +728,55 @@ class PrefetchQuerySet(GeoQuerySet):
 
 
 class AddressQuerySet(PrefetchQuerySet):
+    def __init__(self, *args, **kwargs):
+        super(AddressQuerySet, self).__init__(*args, **kwargs)
+
+        self._rows = False
+
+
+    def _clone(self, *args, **kwargs):
+        clone = super(AddressQuerySet, self)._clone(*args, **kwargs)
+
+        clone._rows = self._rows
+
+        return clone
+
+
+    def rows(self):
+        """
+        Return read-only ``AddressRow``s, built straight from ``values()``
+        rows, instead of Address instances (which snapshot all their data when
+        constructed). For paths that only read and serialize addresses; linked
+        objects are prefetched onto rows just as onto instances.
+
+        """
+        clone = self._clone()
+
+        clone._rows = True
+
+        return clone
+
+
+    def iterator(self):
+        if not self._rows:
+            return super(AddressQuerySet, self).iterator()
+        return self._row_iterator()
+
+
+    def _row_iterator(self):
+        row_batches = RowBatches()
+        for values in self.values(*AddressRow.value_fields()).iterator():
+            yield AddressRow(values, row_batches)
+
+
     def prefetch(self, *args):
+        """
+        Prefetch the given types of linked objects: "parcels" (full parcels),
+        "parcel_centroids" (parcels without their geometries, sufficient for
+        parcel data and latitude/longitude), and/or "batches". Defaults to
+        "parcels" and "batches".
+
+        """
         prefetch_types = args or ["parcels", "batches"]
         return self.select_related(
             "mapped_by").prefetch_linked(*prefetch_types)
@@ -362,17 +784,19 @@ class AddressQuerySet(PrefetchQuerySet):
 
     def _prefetch_linked_objects(self):
         if "parcels" in self._prefetch_linked:
-            self._prefetch_parcels()
+            self._prefetch_parcels(Parcel.objects.all())
+        elif "parcel_centroids" in self._prefetch_linked:
+            self._prefetch_parcels(Parcel.objects.defer(*GEOMETRY_FIELDS))
         if "batches" in self._prefetch_linked:
             self._prefetch_batches()
 
 
-    def _prefetch_parcels(self):
+    def _prefetch_parcels(self, parcels):
         parcels_by_pl = {}
         pls = [a.pl for a in self._result_cache if a.pl]
         if pls:
             parcels_by_pl = dict(
-                (p.pl, p) for p in Parcel.objects.filter(pl__in=pls)
+                (p.pl, p) for p in parcels.filter(pl__in=pls)
                 )
 
         for a in self._result_cache:
@@ -383,18 +807,10 @@ class AddressQuerySet(PrefetchQuerySet):
 
 
     def _prefetch_batches(self):
-        through = self.model.batches.through
-        qs = through.objects.filter(
-            address__in=[a.id for a in self._result_cache]).select_related(
-            "addressbatch", "addressbatch__user")
-        batches_by_aid = defaultdict(list)
-        for through_record in qs:
-            batches_by_aid[through_record.address_id].append(
-                through_record.addressbatch)
+        batches = batches_by_address([a.id for a in self._result_cache])
 
         for a in self._result_cache:
-            a._all_batches = sorted(
-                batches_by_aid.get(a.id, []), key=lambda b: b.timestamp)
+            a._all_batches = batches.get(a.id, [])
 
 
     def update(self, **kwargs):
@@ -403,22 +819,35 @@ class AddressQuerySet(PrefetchQuerySet):
             raise AddressVersioningError(
                 "Cannot update addresses without providing user.")
 
+        assert self.query.can_filter(), \
+            "Cannot update a query once a slice has been taken."
+
         now = datetime.now()
 
-        # save current values for recording changes
-        address_data = {}
-        for address in self:
-            address_data[address.id] = {"pre": {}, "post": {}}
-            for field, value in kwargs.items():
-                address_data[address.id]["pre"][field] = getattr(address, field)
-                address_data[address.id]["post"][field] = value
+        pls = set()
+        if MAPPING_SUMMARY_FIELDS.intersection(kwargs):
+            pls.update(
+                self.order_by().values_list("pl", flat=True).distinct())
+
+        rekeyed = None
+        if MATCH_KEY_FIELDS.intersection(kwargs):
+            rekeyed = list(self.order_by().values_list("id", flat=True))
 
-        record_bulk_changes.delay(
-            address_data=address_data,
-            user_id=user.id,
-            timestamp=now)
+        recorder = BulkChangeRecorder(self, now)
+        ret = super(AddressQuerySet, self).update(**kwargs)
+        recorder.record(user)
 
-        return super(AddressQuerySet, self).update(**kwargs)
+        if rekeyed:
+            Address.objects.refresh_match_keys(
+                Address._base_manager.filter(id__in=rekeyed))
+
+        counts.invalidate()
+
+        if pls:
+            pls.add(kwargs.get("pl", ""))
+            ParcelMapping.objects.refresh(pls)
+
+        return ret
 
 
     def delete(self, user=None):
@@ -428,12 +857,14 @@ class AddressQuerySet(PrefetchQuerySet):
 
         now = datetime.now()
 
-        record_bulk_delete.delay(
-            address_ids=[a.id for a in self],
-            user_id=user.id,
-            timestamp=now)
+        pls = set(self.order_by().values_list("pl", flat=True).distinct())
 
+        recorder = BulkChangeRecorder(self, now)
         super(AddressQuerySet, self).update(deleted=True)
+        recorder.record(user, deleted=True)
+
+        counts.invalidate()
+        ParcelMapping.objects.refresh(pls)
 
 
 
@@ -455,6 +886,44 @@ def clean_street(s):
     return s
 
 
+def normalize_input(data):
+    """
+    Normalize the "street", "city" and "state" of the address input ``data``
+    in place, moving "street" to "input_street". Return a tuple of the
+    normalized (street, city, state); each ``None`` if not given.
+
+    """
+    street = data.get("street", None)
+    city = data.get("city", None)
+    state = data.get("state", None)
+
+    if state is not None:
+        state = data["state"] = compact_whitespace(state.upper().strip())
+
+    if street is not None:
+        street = data["input_street"] = clean_street(
+            compact_whitespace(street.strip()).rstrip("."))
+        del data["street"]
+
+    if city is not None:
+        city = data["city"] = compact_whitespace(city.strip())
+
+    return street, city, state
+
+
+def address_match_key(street, city, state):
+    """
+    Return the key addresses with the given street, city and state are
+    matched as duplicates on: each normalized as address input is (see
+    ``normalize_input``), case-insensitively.
+
+    """
+    street, city, state = normalize_input(
+        {"street": street or u"", "city": city or u"", "state": state or u""})
+    return u"|".join([street, city, state]).lower()
+
+
+
 class AddressManager(models.GeoManager):
     # even deleted Addresses should be accessible via an AddressChange
     use_for_related_fields = False
@@ -468,6 +937,120 @@ class AddressManager(models.GeoManager):
         return self.get_query_set().prefetch(*args)
 
 
+    def undelete(self, address_ids, user):
+        """
+        Undelete the deleted addresses with the given ids, recording their
+        undeletion by ``user`` (as ``Address.undelete`` does, but in bulk).
+
+        """
+        addresses = self.model._base_manager.filter(
+            id__in=address_ids, deleted=True)
+
+        pls = set(addresses.order_by().values_list("pl", flat=True).distinct())
+
+        recorder = BulkChangeRecorder(addresses, datetime.now())
+        addresses.update(deleted=False)
+        recorder.record(user, created=True)
+
+        counts.invalidate()
+        ParcelMapping.objects.refresh(pls)
+
+
+    def refresh_batch_timestamps(self, address_ids=None):
+        """
+        Recompute ``latest_batch_timestamp`` from the batches of the addresses
+        (deleted or not) with the given ids, or of all addresses if
+        ``address_ids`` is None. Returns the number of addresses updated and,
+        if ids were given, a dictionary mapping each id to its new timestamp.
+
+        """
+        if address_ids is not None:
+            address_ids = set(address_ids)
+            if not address_ids:
+                return 0, {}
+
+        qn = connection.ops.quote_name
+        field = self.model._meta.get_field("batches")
+        sql = (
+            "UPDATE %(address)s SET %(latest)s = ("
+            "SELECT MAX(b.%(timestamp)s) FROM %(through)s ab "
+            "INNER JOIN %(batch)s b ON b.%(id)s = ab.%(batch_id)s "
+            "WHERE ab.%(address_id)s = %(address)s.%(id)s)" % {
+                "address": qn(self.model._meta.db_table),
+                "latest": qn("latest_batch_timestamp"),
+                "timestamp": qn("timestamp"),
+                "through": qn(field.m2m_db_table()),
+                "batch": qn(AddressBatch._meta.db_table),
+                "id": qn("id"),
+                "batch_id": qn(field.m2m_reverse_name()),
+                "address_id": qn(field.m2m_column_name()),
+                }
+            )
+        params = []
+        if address_ids is not None:
+            sql += " WHERE %s IN %%s RETURNING %s, %s" % (
+                qn("id"), qn("id"), qn("latest_batch_timestamp"))
+            params.append(tuple(address_ids))
+
+        cursor = connection.cursor()
+        cursor.execute(sql, params)
+        timestamps = {}
+        if address_ids is not None:
+            timestamps = dict(cursor.fetchall())
+
+        counts.invalidate()
+
+        return cursor.rowcount, timestamps
+
+
+    def refresh_match_keys(self, addresses=None):
+        """
+        Recompute ``match_key`` and ``street_key`` for the given queryset of
+        addresses, or for all addresses (deleted or not) if ``addresses`` is
+        None. Returns the number of addresses updated (those whose keys were
+        out of date).
+
+        """
+        if addresses is None:
+            addresses = self.model._base_manager.all()
+
+        stale = []
+        for (aid, input_street, street, city, state, match_key,
+             street_key) in addresses.order_by().values_list(
+                "id", "input_street", "street", "city", "state", "match_key",
+                "street_key").iterator():
+            keys = (
+                address_match_key(input_street, city, state),
+                address_match_key(street, city, state),
+                )
+            if keys != (match_key, street_key):
+                stale.append(keys + (aid,))
+        if not stale:
+            return 0
+
+        qn = connection.ops.quote_name
+        cursor = connection.cursor()
+        cursor.executemany(
+            "UPDATE %s SET %s = %%s, %s = %%s WHERE %s = %%s" % (
+                qn(self.model._meta.db_table), qn("match_key"),
+                qn("street_key"), qn("id")),
+            stale)
+
+        return len(stale)
+
+
+    def matching(self, street, city, state):
+        """
+        Return the addresses duplicating the given (input) street, city and
+        state: those with that input street or (as parsed or edited) street,
+        found on their indexed ``match_key`` and ``street_key``.
+
+        """
+        key = address_match_key(street, city, state)
+        return self.filter(
+            models.Q(match_key=key) | models.Q(street_key=key))
+
+
     def create_from_input(self, **kwargs):
         """
         Create an address with the given data, unless a duplicate existing
@@ -481,40 +1064,16 @@ class AddressManager(models.GeoManager):
         """
         user = kwargs.pop("user", None)
 
-        street = kwargs.get("street", None)
-        city = kwargs.get("city", None)
-        state = kwargs.get("state", None)
-
-        if state is not None:
-            state = kwargs["state"] = compact_whitespace(state.upper().strip())
-
-        if street is not None:
-            street = kwargs["input_street"] = clean_street(
-                compact_whitespace(street.strip()).rstrip("."))
-            del kwargs["street"]
-
-        if city is not None:
-            city = kwargs["city"] = compact_whitespace(city.strip())
+        street, city, state = normalize_input(kwargs)
 
         if None not in [street, city, state]:
-            addresses = self.filter(
-                (
-                    models.Q(input_street=street) |
-                    models.Q(street=street)
-                    ) &
-                models.Q(city=city) &
-                models.Q(state=state)
-                )
+            addresses = self.matching(street, city, state)
         else:
             addresses = None
 
         created = False
         if not addresses:
-            if kwargs.get("pl"):
-                kwargs["mapped_by"] = user
-                kwargs["mapped_timestamp"] = datetime.now()
-            obj = self.model(**kwargs)
-            obj.full_clean()
+            obj = self._new_from_input(user, kwargs)
             obj.save(user=user)
 
             created = True
@@ -523,15 +1082,59 @@ class AddressManager(models.GeoManager):
         return (created, addresses)
 
 
+    def prepare_from_input(self, **kwargs):
+        """
+        Return a new, validated but unsaved, address with the given data,
+        normalized as by ``create_from_input`` (but not checked for
+        duplicates).
+
+        If the data is bad (e.g. unknown state) will raise ValidationError.
+
+        """
+        user = kwargs.pop("user", None)
+
+        normalize_input(kwargs)
+
+        return self._new_from_input(user, kwargs)
+
+
+    def _new_from_input(self, user, data):
+        if data.get("pl"):
+            data["mapped_by"] = user
+            data["mapped_timestamp"] = datetime.now()
+        obj = self.model(**data)
+        # the mapping user needn't be looked up to validate it
+        obj.full_clean(exclude=["mapped_by"])
+        return obj
+
+
 
 class AddressVersioningError(Exception):
     pass
 
 
 
+# Address fields included in ParcelMapping summaries
+MAPPING_SUMMARY_FIELDS = set(["pl", "street", "needs_review"])
+
+# Address fields its match_key and street_key are computed from
+MATCH_KEY_FIELDS = set(["input_street", "street", "city", "state"])
+
+
+
 class Address(AddressBase):
     deleted = models.BooleanField(default=False, db_index=True)
     geocode_failed = models.BooleanField(default=False)
+    # denormalized from batches; see AddressManager.refresh_batch_timestamps
+    latest_batch_timestamp = models.DateTimeField(
+        blank=True, null=True, db_index=True)
+    # denormalized from input_street (match_key) and street (street_key),
+    # each with city and state, for duplicate detection; see
+    # address_match_key and AddressManager.refresh_match_keys
+    match_key = models.CharField(
+        max_length=404, blank=True, db_index=True, editable=False)
+    street_key = models.CharField(
+        max_length=404, blank=True, db_index=True, editable=False)
 
     batches = models.ManyToManyField(AddressBatch, related_name="addresses")
 
@@ -548,11 +1151,27 @@ class Address(AddressBase):
             ]
 
 
+    # attributes whose original values are tracked (see __setattr__)
+    _tracked_attnames = frozenset(f.attname for f in AddressBase._meta.fields)
+
+
     def __init__(self, *args, **kwargs):
         super(Address, self).__init__(*args, **kwargs)
 
         self._all_batches = None
-        self._initial_data = self.data(internal=True)
+        # original values of tracked attributes assigned since construction
+        self._original = None
+
+
+    def __setattr__(self, name, value):
+        # only after construction is complete, and only on first assignment
+        if name in self._tracked_attnames and "_original" in self.__dict__:
+            original = self._original
+            if original is None:
+                original = self._original = {}
+            if name not in original:
+                original[name] = getattr(self, name)
+        super(Address, self).__setattr__(name, value)
 
 
     def save(self, *args, **kwargs):
@@ -567,6 +1186,9 @@ class Address(AddressBase):
 
         post = self.snapshot_data(saved=False)
 
+        autocomplete.record(self, counts.invalidate())
+        self._refresh_mapping_summary(pre, post)
+
         # apply eagerly - one address won't be slow, better UI feedback
         record_address_change.apply(
             kwargs=dict(
@@ -579,6 +1201,14 @@ class Address(AddressBase):
         return ret
 
 
+    def denormalize(self):
+        super(Address, self).denormalize()
+        self.match_key = address_match_key(
+            self.input_street, self.city, self.state)
+        self.street_key = address_match_key(
+            self.street, self.city, self.state)
+
+
     def delete(self, user=None):
         if user is None:
             raise AddressVersioningError(
@@ -589,6 +1219,9 @@ class Address(AddressBase):
         self.deleted = True
         super(Address, self).save()
 
+        counts.invalidate()
+        ParcelMapping.objects.refresh([self.pl])
+
         # apply eagerly - one address won't be slow, better UI feedback
         record_address_change.apply(
             kwargs=dict(
@@ -609,6 +1242,9 @@ class Address(AddressBase):
         self.deleted = False
         super(Address, self).save()
 
+        counts.invalidate()
+        ParcelMapping.objects.refresh([self.pl])
+
         # apply eagerly - one address won't be slow, better UI feedback
         record_address_change.apply(
             kwargs=dict(
@@ -619,6 +1255,17 @@ class Address(AddressBase):
             )
 
 
+    def _refresh_mapping_summary(self, pre, post):
+        """
+        Update ParcelMapping summaries affected by a change from ``pre`` to
+        ``post`` snapshot data.
+
+        """
+        pre = pre or {}
+        if [f for f in MAPPING_SUMMARY_FIELDS if pre.get(f) != post.get(f)]:
+            ParcelMapping.objects.refresh([pre.get("pl", ""), post["pl"]])
+
+
     def snapshot_data(self, saved=True):
         """
         Return a data dictionary representing the state of this Address.
@@ -633,28 +1280,112 @@ class Address(AddressBase):
         if saved:
             if self.pk is None:
                 return None
-            data = self._initial_data.copy()
+            data = self.data(internal=True)
+            if self._original:
+                data.update(self._original)
         else:
             data = self.data(internal=True)
 
         return data
 
 
-    @property
-    def batch_tags(self):
-        if self._all_batches is None:
-            self._all_batches = list(self.batches.order_by("timestamp"))
-        return self._all_batches
+    def _fetch_batches(self):
+        return list(self.batches.order_by("timestamp"))
 
 
-    @property
-    def edit_url(self):
-        return reverse("map_edit_address", kwargs={"address_id": self.id})
 
+class AddressRow(AddressPropertiesMixin):
+    """
+    A read-only address built from a ``values()`` row (see
+    ``AddressQuerySet.rows``), with the data attributes and serializable
+    properties of an Address. Its ``mapped_by`` is a ``UserRow``.
+
+    Batches not prefetched are fetched from ``row_batches`` (a
+    ``RowBatches``, shared by the rows of a queryset), if given.
+
+    """
+    def __init__(self, values, row_batches=None):
+        username = values.pop("mapped_by__username")
+        self.__dict__.update(values)
+        if self.mapped_by is not None:
+            self.mapped_by = UserRow(self.mapped_by, username)
+        self.pk = self.id
+
+        self._parcel = None
+        self._parcel_fetched = False
+        self._all_batches = None
+        self._row_batches = row_batches
+        if row_batches is not None:
+            row_batches.add(self.id)
 
-    @property
-    def add_tag_url(self):
-        return reverse("map_add_tag", kwargs={"address_id": self.id})
+
+    @classmethod
+    def value_fields(cls):
+        return [f.name for f in Address._meta.fields] + ["mapped_by__username"]
+
+
+    def _fetch_batches(self):
+        if self._row_batches is None:
+            return batches_by_address([self.id]).get(self.id, [])
+        return self._row_batches.get(self.id)
+
+
+
+class RowBatches(object):
+    """
+    The batches of the ``AddressRow``s of a queryset, fetched in one query
+    for all rows added so far when the first of them is asked for.
+
+    """
+    def __init__(self):
+        self._pending = []
+        self._by_address = {}
+
+
+    def add(self, address_id):
+        self._pending.append(address_id)
+
+
+    def get(self, address_id):
+        if address_id not in self._by_address and self._pending:
+            fetched = batches_by_address(self._pending)
+            for aid in self._pending:
+                self._by_address[aid] = fetched.get(aid, [])
+            self._pending = []
+        return self._by_address.get(address_id, [])
+
+
+
+def batches_by_address(address_ids):
+    """
+    Return a dictionary mapping each of ``address_ids`` that has batches to
+    the list of them, by timestamp, with their users; in one query.
+
+    """
+    through = Address.batches.through
+    qs = through.objects.filter(address__in=address_ids).select_related(
+        "addressbatch", "addressbatch__user")
+    batches = defaultdict(list)
+    for through_record in qs:
+        batches[through_record.address_id].append(through_record.addressbatch)
+    for aid in batches:
+        batches[aid].sort(key=lambda b: b.timestamp)
+    return batches
+
+
+
+class UserRow(object):
+    """
+    The id and username of a user, as serialized for an ``AddressRow``.
+
+    """
+    def __init__(self, id, username):
+        self.id = self.pk = id
+        self.username = username
+
+
+    def __unicode__(self):
+        return self.username
 
 
 
@@ -668,6 +1399,199 @@ class AddressSnapshot(AddressBase):
 
 
 class AddressChangeQuerySet(PrefetchQuerySet):
+    def as_of(self, timestamp):
+        """
+        Limit to the latest change to each address at or before
+        ``timestamp``, leaving out addresses that were deleted (or had not
+        been created yet) at that time. The post snapshots of these changes
+        are thus the addresses as they were at ``timestamp``.
+
+        Relies on the index on address_id, changed_timestamp and id (see
+        migration 0041) to find the latest changes without sorting.
+
+        """
+        qn = connection.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        latest = (
+            "%(table)s.id IN ("
+            "SELECT DISTINCT ON (address_id) id FROM %(table)s "
+            "WHERE changed_timestamp <= %%s "
+            "ORDER BY address_id DESC, changed_timestamp DESC, id DESC)"
+            % {"table": table}
+            )
+        return self.extra(
+            where=[latest], params=[timestamp]).filter(post__isnull=False)
+
+
+    def revert(self, user):
+        """
+        Revert all of these changes, by ``user``, in one transaction, with the
+        same outcome as reverting each of them (latest first) with
+        ``AddressChange.revert``; but set-wise, in a few bulk statements per
+        round, where each round reverts at most one change to each address.
+
+        Returns a dictionary with the number of changes "reverted", the list
+        of ids of the changes that needed no reverting ("no-op"), and a
+        dictionary mapping the ids of changes whose reversion overwrote more
+        recent changes to the list of conflicting fields ("conflict").
+
+        """
+        rounds = []
+        seen = defaultdict(int)
+        for change_id, address_id in self.order_by(
+                "-changed_timestamp", "-id").values_list("id", "address_id"):
+            i = seen[address_id]
+            seen[address_id] += 1
+            if i == len(rounds):
+                rounds.append([])
+            rounds[i].append(change_id)
+
+        report = {"reverted": 0, "no-op": [], "conflict": {}}
+        with transaction.commit_on_success():
+            for change_ids in rounds:
+                self._revert_round(change_ids, user, report)
+        return report
+
+
+    def _revert_round(self, change_ids, user, report):
+        """
+        Revert the changes with the given ids (at most one per address), by
+        ``user``, adding the outcome to ``report``.
+
+        """
+        to_delete = []
+        to_undelete = []
+        to_modify = defaultdict(list)
+
+        for (change_id, address_id, pre_id, post_id, deleted, differing,
+             conflicting) in self._revert_plan(change_ids):
+            conflict = conflicting.split()
+            modified = False
+            if pre_id is None:
+                if not deleted:
+                    to_delete.append(address_id)
+                    modified = True
+            elif post_id is None:
+                if deleted:
+                    to_undelete.append(address_id)
+                    modified = True
+            else:
+                if deleted:
+                    conflict.append("deleted")
+                    to_undelete.append(address_id)
+                if differing:
+                    to_modify[tuple(differing.split())].append(change_id)
+                    modified = True
+
+            if modified:
+                report["reverted"] += 1
+            else:
+                report["no-op"].append(change_id)
+            if conflict:
+                report["conflict"][change_id] = conflict
+
+        if to_delete:
+            Address.objects.filter(id__in=to_delete).delete(user=user)
+        if to_undelete:
+            Address.objects.undelete(to_undelete, user)
+        if to_modify:
+            self._revert_fields(to_modify, user)
+
+
+    def _revert_plan(self, change_ids):
+        """
+        Return a list of (change id, address id, pre id, post id, address
+        deleted, differing fields, conflicting fields) tuples for the changes
+        with the given ids; the changed fields the address no longer has the
+        pre value of, and those of them it doesn't have the post value of
+        either, space-separated.
+
+        """
+        qn = connection.ops.quote_name
+        fields = AddressBase._meta.fields
+        changed = (
+            "(CASE WHEN c.changed_fields IS NULL THEN %s "
+            "ELSE position(%%s in ' ' || c.changed_fields || ' ') > 0 END)")
+        differing = [
+            "CASE WHEN %s AND %s THEN %%s END" % (
+                changed % _distinct("pre", "post", f),
+                _distinct("a", "pre", f))
+            for f in fields
+            ]
+        conflicting = [
+            "CASE WHEN %s AND %s AND %s THEN %%s END" % (
+                changed % _distinct("pre", "post", f),
+                _distinct("a", "pre", f),
+                _distinct("a", "post", f))
+            for f in fields
+            ]
+        params = []
+        for f in fields:
+            params.extend([" %s " % f.name, f.name])
+        params = params * 2 + [list(change_ids)]
+
+        cursor = connection.cursor()
+        cursor.execute(
+            "SELECT c.id, c.address_id, c.pre_id, c.post_id, a.deleted, "
+            "array_to_string(ARRAY[%(differing)s], ' '), "
+            "array_to_string(ARRAY[%(conflicting)s], ' ') "
+            "FROM %(changes)s c "
+            "JOIN %(addresses)s a ON a.id = c.address_id "
+            "LEFT OUTER JOIN %(snapshots)s pre ON pre.id = c.pre_id "
+            "LEFT OUTER JOIN %(snapshots)s post ON post.id = c.post_id "
+            "WHERE c.id = ANY(%%s)" % {
+                "differing": ", ".join(differing),
+                "conflicting": ", ".join(conflicting),
+                "changes": qn(self.model._meta.db_table),
+                "addresses": qn(Address._meta.db_table),
+                "snapshots": qn(AddressSnapshot._meta.db_table),
+                },
+            params)
+        return cursor.fetchall()
+
+
+    def _revert_fields(self, to_modify, user):
+        """
+        Set the given fields of addresses back to their values in the pre
+        snapshots of changes, by ``user``; ``to_modify`` maps tuples of field
+        names to lists of ids of changes to revert those fields of.
+
+        """
+        qn = connection.ops.quote_name
+        change_ids = list(itertools.chain(*to_modify.values()))
+        addresses = Address.objects.filter(
+            id__in=self.model._base_manager.filter(
+                id__in=change_ids).values("address_id"))
+
+        pls = set(addresses.order_by().values_list("pl", flat=True).distinct())
+
+        recorder = BulkChangeRecorder(addresses, datetime.now())
+        cursor = connection.cursor()
+        for names, ids in to_modify.items():
+            columns = [
+                qn(Address._meta.get_field(name).column) for name in names]
+            cursor.execute(
+                "UPDATE %(addresses)s a SET %(set)s, geocode_failed = false "
+                "FROM %(changes)s c "
+                "JOIN %(snapshots)s pre ON pre.id = c.pre_id "
+                "WHERE a.id = c.address_id AND c.id = ANY(%%s)" % {
+                    "addresses": qn(Address._meta.db_table),
+                    "set": ", ".join(
+                        ["%s = pre.%s" % (c, c) for c in columns]),
+                    "changes": qn(self.model._meta.db_table),
+                    "snapshots": qn(AddressSnapshot._meta.db_table),
+                    },
+                [ids])
+        recorder.record(user)
+
+        if MATCH_KEY_FIELDS.intersection(itertools.chain(*to_modify)):
+            Address.objects.refresh_match_keys(addresses)
+
+        pls.update(addresses.order_by().values_list("pl", flat=True))
+        counts.invalidate()
+        ParcelMapping.objects.refresh(pls)
+
+
     def _prefetch_linked_objects(self):
         if "parcels" in self._prefetch_linked:
             self._prefetch_parcels()
@@ -683,7 +1607,7 @@ class AddressChangeQuerySet(PrefetchQuerySet):
 
         parcels_by_pl = dict(
             (p.pl, p) for p in
-            Parcel.objects.filter(pl__in=pls))
+            Parcel.objects.defer(*GEOMETRY_FIELDS).filter(pl__in=pls))
 
         for c in self._result_cache:
             if c.pre is not None:
@@ -700,6 +1624,66 @@ class AddressChangeManager(models.GeoManager):
         return AddressChangeQuerySet(self.model, using=self._db)
 
 
+    def as_of(self, timestamp):
+        return self.get_query_set().as_of(timestamp)
+
+
+    def record(self, address_id, pre_data, post_data, user_id, timestamp):
+        """
+        Record a change by user ``user_id`` at ``timestamp`` to the address
+        with id ``address_id``, from ``pre_data`` to ``post_data`` (internal
+        address data; ``None`` for a creation or deletion, respectively).
+
+        Snapshots are shared rather than duplicated: the pre snapshot is the
+        previous change's post snapshot, and a change that leaves the data as
+        it was has the same pre and post snapshot, so each change writes at
+        most one snapshot. Every write of address data is recorded, so the
+        previous post snapshot is taken to be the address as it was, without
+        fetching it to compare (as ``BulkChangeRecorder`` does set-wise).
+
+        """
+        pre_id = post_id = None
+        changed_fields = None
+        if pre_data:
+            pre_id = self._latest_post_id(address_id)
+            if pre_id is None:
+                pre_id = AddressSnapshot.objects.create(
+                    snapshot_timestamp=timestamp, **pre_data).id
+        if post_data:
+            if pre_id is not None and post_data == pre_data:
+                post_id = pre_id
+            else:
+                post_id = AddressSnapshot.objects.create(
+                    snapshot_timestamp=timestamp, **post_data).id
+        if pre_data and post_data:
+            changed_fields = " ".join(
+                f.name for f in AddressBase._meta.fields
+                if pre_data[f.attname] != post_data[f.attname])
+
+        return self.create(
+            address_id=address_id,
+            changed_by_id=user_id,
+            pre_id=pre_id,
+            post_id=post_id,
+            changed_fields=changed_fields,
+            changed_timestamp=timestamp)
+
+
+    def _latest_post_id(self, address_id):
+        """
+        Return the id of the post snapshot of the latest recorded change to
+        the address with id ``address_id``; ``None`` if there is none, or
+        that change was its deletion. Only the id is fetched, through the
+        index on address, timestamp and id (see migration 0041).
+
+        """
+        latest = list(
+            self.filter(address=address_id).order_by(
+                "-changed_timestamp", "-id").values_list(
+                "post_id", flat=True)[:1])
+        return latest[0] if latest else None
+
+
 
 class AddressChange(models.Model):
     """
@@ -714,7 +1698,9 @@ class AddressChange(models.Model):
 
     changed_by = models.ForeignKey(
         User, on_delete=models.PROTECT, related_name="address_changes")
-    changed_timestamp = models.DateTimeField()
+    # also indexed together with address and id, for as_of queries (see
+    # migration 0041)
+    changed_timestamp = models.DateTimeField(db_index=True)
 
     # The prior snapshot. NULL indicates "address created"
     pre = models.ForeignKey(
@@ -722,6 +1708,9 @@ class AddressChange(models.Model):
     # The post snapshot. NULL indicates "address deleted"
     post = models.ForeignKey(
         AddressSnapshot, null=True, related_name="post_for")
+    # Space-separated names of the fields changed between pre and post. NULL
+    # for creations, deletions, and changes recorded before this was added.
+    changed_fields = models.TextField(null=True, blank=True)
 
 
     objects = AddressChangeManager()
@@ -741,6 +1730,15 @@ class AddressChange(models.Model):
         if self.pre is None or self.post is None:
             return None
 
+        if self.changed_fields is not None:
+            return dict(
+                (field, {
+                    "pre": getattr(self.pre, field),
+                    "post": getattr(self.post, field),
+                    })
+                for field in self.changed_fields.split()
+                )
+
         pre_data = self.pre.data()
         post_data = self.post.data()
 
@@ -822,3 +1820,234 @@ class ApiKey(models.Model):
 
     def __unicode__(self):
         return self.name
+
+
+
+# ids making the names of temporary tables (see temp_table_name) unique
+_temp_table_ids = itertools.count(1)
+
+
+
+def temp_table_name(prefix):
+    """
+    Return a name, starting with ``prefix``, for a temporary table no other
+    user of this function in this process (and so on this connection) has.
+    Qualify it with the "pg_temp" schema where it's used, so it can't be
+    taken for a permanent table.
+
+    """
+    return "%s_%s" % (prefix, next(_temp_table_ids))
+
+
+
+class BulkChangeRecorder(object):
+    """
+    Records the changes to all the addresses selected by a queryset in a
+    bulk update (or delete), in a handful of set-based statements rather than
+    per address, sharing snapshots as ``AddressChangeManager.record`` does.
+
+    The selection, and each address's pre snapshot, are captured (in a
+    temporary table of its own, dropped by ``record`` or else at the end of
+    the transaction) on creation; call ``record`` once the addresses have
+    been changed.
+
+    """
+    def __init__(self, qs, timestamp):
+        self.timestamp = timestamp
+        self.cursor = connection.cursor()
+        self.table = "pg_temp.%s" % temp_table_name("bulk_address_change")
+
+        qn = connection.ops.quote_name
+        self.address_table = qn(Address._meta.db_table)
+        self.snapshot_table = qn(AddressSnapshot._meta.db_table)
+        self.fields = AddressBase._meta.fields
+        self.columns = [qn(f.column) for f in self.fields]
+        self.cursor.execute(
+            "SELECT pg_get_serial_sequence(%s, %s)",
+            [AddressSnapshot._meta.db_table, AddressSnapshot._meta.pk.column])
+        self.sequence = self.cursor.fetchone()[0]
+
+        self.cursor.execute(
+            "CREATE TEMPORARY TABLE %s (address_id integer PRIMARY KEY, "
+            "pre_id integer, post_id integer, "
+            "new_pre boolean NOT NULL DEFAULT false) ON COMMIT DROP"
+            % self.table)
+
+        # reuse each address's latest post snapshot as its pre snapshot, if
+        # the address hasn't changed since
+        selection, params = qs.order_by().values("id").query.get_compiler(
+            qs.db).as_sql()
+        self.cursor.execute(
+            "INSERT INTO %(t)s (address_id, pre_id) "
+            "SELECT a.id, s.id FROM %(addresses)s a "
+            "LEFT OUTER JOIN (SELECT DISTINCT ON (address_id) "
+            "address_id, post_id FROM %(changes)s "
+            "WHERE address_id IN (%(selection)s) "
+            "ORDER BY address_id, id DESC) c ON c.address_id = a.id "
+            "LEFT OUTER JOIN %(snapshots)s s ON s.id = c.post_id AND %(same)s "
+            "WHERE a.id IN (%(selection)s)" % {
+                "t": self.table,
+                "addresses": self.address_table,
+                "changes": qn(AddressChange._meta.db_table),
+                "snapshots": self.snapshot_table,
+                "same": self._same("a", "s"),
+                "selection": selection,
+                },
+            tuple(params) * 2)
+
+        self.cursor.execute(
+            "UPDATE %s SET pre_id = nextval(%%s), new_pre = true "
+            "WHERE pre_id IS NULL" % self.table,
+            [self.sequence])
+        self._snapshot("pre_id", "t.new_pre")
+
+
+    def record(self, user, deleted=False, created=False):
+        """
+        Record the changes, by ``user``, from the pre snapshots to the
+        addresses' current state (or, if ``deleted``, their deletion; or, if
+        ``created``, their creation or undeletion, with the state in the pre
+        snapshots).
+
+        """
+        pre_id, post_id = "t.pre_id", "t.post_id"
+        if created:
+            pre_id, post_id = "NULL", "t.pre_id"
+        if deleted or created:
+            post_join = ""
+            changed_fields = "NULL"
+            changed_params = []
+        else:
+            self.cursor.execute(
+                "UPDATE %(t)s t SET post_id = CASE WHEN %(same)s "
+                "THEN t.pre_id ELSE nextval(%%s) END "
+                "FROM %(addresses)s a, %(snapshots)s s "
+                "WHERE a.id = t.address_id AND s.id = t.pre_id" % {
+                    "t": self.table,
+                    "addresses": self.address_table,
+                    "snapshots": self.snapshot_table,
+                    "same": self._same("a", "s"),
+                    },
+                [self.sequence])
+            self._snapshot("post_id", "t.post_id <> t.pre_id")
+
+            post_join = (
+                "JOIN %s post ON post.id = t.post_id" % self.snapshot_table)
+            changed_fields = "array_to_string(ARRAY[%s], ' ')" % ", ".join(
+                [
+                    "CASE WHEN %s THEN %%s END" % _distinct(
+                        "pre", "post", f)
+                    for f in self.fields
+                    ]
+                )
+            changed_params = [f.name for f in self.fields]
+
+        qn = connection.ops.quote_name
+        self.cursor.execute(
+            "INSERT INTO %(changes)s (address_id, changed_by_id, pre_id, "
+            "post_id, changed_fields, changed_timestamp) "
+            "SELECT t.address_id, %%s, %(pre_id)s, %(post_id)s, "
+            "%(changed_fields)s, %%s FROM %(t)s t "
+            "JOIN %(snapshots)s pre ON pre.id = t.pre_id %(post_join)s" % {
+                "changes": qn(AddressChange._meta.db_table),
+                "pre_id": pre_id,
+                "post_id": post_id,
+                "changed_fields": changed_fields,
+                "t": self.table,
+                "snapshots": self.snapshot_table,
+                "post_join": post_join,
+                },
+            [user.id] + changed_params + [self.timestamp])
+
+        self.cursor.execute("DROP TABLE %s" % self.table)
+
+
+    def _snapshot(self, id_column, where):
+        """
+        Snapshot the current state of the addresses in the temporary table
+        matching ``where``, with the snapshot ids in ``id_column``.
+
+        """
+        self.cursor.execute(
+            "INSERT INTO %(snapshots)s (id, %(columns)s, snapshot_timestamp) "
+            "SELECT t.%(id_column)s, %(a_columns)s, %%s "
+            "FROM %(t)s t JOIN %(addresses)s a ON a.id = t.address_id "
+            "WHERE %(where)s" % {
+                "snapshots": self.snapshot_table,
+                "columns": ", ".join(self.columns),
+                "id_column": id_column,
+                "a_columns": ", ".join(["a.%s" % c for c in self.columns]),
+                "t": self.table,
+                "addresses": self.address_table,
+                "where": where,
+                },
+            [self.timestamp])
+
+
+    def _same(self, a, b):
+        return "NOT (%s)" % " OR ".join(
+            [_distinct(a, b, f) for f in self.fields])
+
+
+
+def _distinct(a, b, field):
+    """
+    Return SQL comparing the column of ``field`` in tables ``a`` and ``b``.
+
+    """
+    # compared as text: case-sensitively (unlike citext), and exactly for
+    # geometries (unlike their "=", which compares bounding boxes)
+    column = connection.ops.quote_name(field.column)
+    return "CAST(%s.%s AS text) IS DISTINCT FROM CAST(%s.%s AS text)" % (
+        a, column, b, column)
+
+
+
+# Batches are added to addresses in many places (imports, tagging), so
+# latest_batch_timestamp is kept in sync by signal handlers. The admin's inline
+# editing of batches saves the through model directly, without signals; see
+# AddressAdmin.save_formset.
+
+def _address_batches_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    if reverse:
+        # instance is an AddressBatch; pk_set (if any) are Address ids
+        if action == "pre_clear":
+            instance._cleared_address_ids = _batch_address_ids(instance)
+        elif action == "post_clear":
+            Address.objects.refresh_batch_timestamps(
+                instance._cleared_address_ids)
+        elif action in ["post_add", "post_remove"]:
+            Address.objects.refresh_batch_timestamps(pk_set)
+    elif action in ["post_add", "post_remove", "post_clear"]:
+        updated, timestamps = Address.objects.refresh_batch_timestamps(
+            [instance.pk])
+        instance.latest_batch_timestamp = timestamps.get(instance.pk)
+
+
+def _address_batch_saved(sender, instance, created, **kwargs):
+    if created:
+        counts.invalidate()
+    else:
+        Address.objects.refresh_batch_timestamps(_batch_address_ids(instance))
+
+
+def _address_batch_pre_delete(sender, instance, **kwargs):
+    instance._deleted_address_ids = _batch_address_ids(instance)
+
+
+def _address_batch_post_delete(sender, instance, **kwargs):
+    Address.objects.refresh_batch_timestamps(instance._deleted_address_ids)
+
+
+def _batch_address_ids(batch):
+    return list(
+        Address.batches.through.objects.filter(
+            addressbatch=batch).values_list("address_id", flat=True))
+
+
+signals.m2m_changed.connect(
+    _address_batches_changed, sender=Address.batches.through)
+signals.post_save.connect(_address_batch_saved, sender=AddressBatch)
+signals.pre_delete.connect(_address_batch_pre_delete, sender=AddressBatch)
+signals.post_delete.connect(_address_batch_post_delete, sender=AddressBatch)
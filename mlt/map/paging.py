@@ -1,3 +1,13 @@
+import base64
+import datetime
+import json
+
+from django.db.models import Model, Q
+
+from .models import UserRow
+
+
+
 DEFAULT_PAGE_LENGTH = 20
 
 
@@ -36,3 +46,152 @@ def get_integer(GET, name, default):
         return int(GET[name])
     except (ValueError, KeyError):
         return default
+
+
+
+class BadCursor(ValueError):
+    pass
+
+
+
+def keyset(qs, GET, sort, index=False):
+    """
+    Page through ``qs`` ordered by the ``sort`` fields (as given to
+    ``sort.apply``) and then by id, starting after the row identified by the
+    opaque "cursor" in ``GET``, rather than at an offset. Returns a tuple of
+    the page of objects and the cursor for the next page (``None`` if this
+    page is the last).
+
+    Requests with a "start" but no cursor are paged by offset (see ``apply``),
+    as are sorts on aggregates, which can't be filtered by row position. If
+    ``index`` is True, objects are numbered starting from "start" in either
+    case. Raises ``BadCursor`` if the cursor is invalid or for another sort.
+
+    """
+    start, num = get_start_and_num(GET)
+    sort = list(sort)
+    if not [f for f in sort if f.lstrip("-") in ["id", "pk"]]:
+        sort.append("id")
+    qs = qs.order_by(*sort)
+
+    cursor = GET.get("cursor")
+    keyable = not [
+        f for f in sort if f.lstrip("-") in qs.query.aggregate_select]
+    if not keyable or (cursor is None and start != 1):
+        objs = apply(qs, GET, index)
+        return objs, None
+
+    if cursor is not None:
+        qs = qs.filter(_after(sort, decode_cursor(cursor, sort)))
+
+    objs = list(qs[:num])
+    if index:
+        for i, obj in enumerate(objs):
+            obj.index = i + start
+
+    next_cursor = None
+    if len(objs) == num:
+        next_cursor = encode_cursor(
+            sort, [_get_value(objs[-1], f.lstrip("-")) for f in sort])
+
+    return objs, next_cursor
+
+
+
+def encode_cursor(sort, values):
+    """
+    Return an opaque cursor for the row with the given ``values`` of the
+    ``sort`` fields.
+
+    """
+    return base64.urlsafe_b64encode(
+        json.dumps({"sort": sort, "values": map(_encode_value, values)}))
+
+
+
+def decode_cursor(cursor, sort):
+    """
+    Return the list of sort-field values encoded in ``cursor``, which must
+    have been created for the same ``sort``.
+
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        values = map(_decode_value, data["values"])
+        cursor_sort = data["sort"]
+    except (ValueError, TypeError, KeyError, UnicodeError):
+        raise BadCursor("Invalid cursor.")
+    if cursor_sort != sort or len(values) != len(sort):
+        raise BadCursor("Cursor does not match sort.")
+    return values
+
+
+
+def _after(sort, values):
+    """
+    Return a Q matching rows after the row with the given ``values`` of the
+    ``sort`` fields, given PostgreSQL's ordering of nulls (last when
+    ascending, first when descending).
+
+    """
+    clauses = []
+    equal = Q()
+    for field, value in zip(sort, values):
+        descending = field.startswith("-")
+        field = field.lstrip("-")
+
+        if value is None:
+            after = Q(**{"%s__isnull" % field: False}) if descending else None
+            same = Q(**{"%s__isnull" % field: True})
+        else:
+            if descending:
+                after = Q(**{"%s__lt" % field: value})
+            else:
+                after = (
+                    Q(**{"%s__gt" % field: value}) |
+                    Q(**{"%s__isnull" % field: True})
+                    )
+            same = Q(**{field: value})
+
+        if after is not None:
+            clauses.append(equal & after)
+        equal = equal & same
+
+    if not clauses:
+        return Q(pk__in=[])
+    return reduce(lambda a, b: a | b, clauses)
+
+
+
+def _get_value(obj, field):
+    for attr in field.split("__"):
+        if obj is None:
+            break
+        obj = getattr(obj, attr)
+    if isinstance(obj, (Model, UserRow)):
+        obj = obj.pk
+    return obj
+
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {"datetime": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"date": value.isoformat()}
+    return value
+
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "datetime" in value:
+            iso = value["datetime"]
+            return datetime.datetime.strptime(
+                iso, "%Y-%m-%dT%H:%M:%S.%f" if "." in iso
+                else "%Y-%m-%dT%H:%M:%S")
+        if "date" in value:
+            return datetime.datetime.strptime(
+                value["date"], "%Y-%m-%d").date()
+        raise ValueError("Unknown cursor value %r" % value)
+    return value
@@ -1,3 +1,7 @@
+from operator import attrgetter
+
+
+
 class Serializer(object):
     default_fields = []
 
@@ -12,26 +16,52 @@ class Serializer(object):
             f for f in list(fields or self.default_fields) + list(extra or [])
             if f not in exclude
             ]
+        self.plan = self.compile()
 
 
-    def one(self, obj):
-        ret = {}
+    def compile(self):
+        """
+        Return the serialization plan for ``self.fields``: a tuple of (field
+        name, accessor, encoder) steps, where the accessor gets the value to
+        encode from the object and the encoder (``None`` if the value is used
+        as-is) encodes it.
+
+        """
+        steps = []
         for field in self.fields:
+            encode = getattr(self, "encode_%s" % field, None)
             if field in self.virtual_fields:
-                val = obj
-                default_encode = lambda x: None
+                get = _identity
+                if encode is None:
+                    encode = _none
+            else:
+                get = attrgetter(field)
+            steps.append((field, get, encode))
+        return tuple(steps)
+
+
+    def one(self, obj):
+        ret = {}
+        for field, get, encode in self.plan:
+            if encode is None:
+                ret[field] = get(obj)
             else:
-                val = getattr(obj, field)
-                default_encode = lambda x: x
-            encode_func = getattr(self, "encode_%s" % field, default_encode)
-            ret[field] = encode_func(val)
+                ret[field] = encode(get(obj))
 
         return ret
 
 
     def many(self, objs):
+        # same as one(), inlined to save a method call per object
+        plan = self.plan
         for obj in objs:
-            yield self.one(obj)
+            ret = {}
+            for field, get, encode in plan:
+                if encode is None:
+                    ret[field] = get(obj)
+                else:
+                    ret[field] = encode(get(obj))
+            yield ret
 
 
     def _encode_datetime(self, dt):
@@ -101,13 +131,16 @@ class AddressSerializer(Serializer):
         ]
 
 
+    parcel_serializer = ParcelSerializer()
+
+
     def encode_mapped_timestamp(self, dt):
         return self._encode_datetime(dt)
 
 
     def encode_parcel(self, parcel):
         if parcel:
-            return ParcelSerializer().one(parcel)
+            return self.parcel_serializer.one(parcel)
         return parcel
 
 
@@ -134,6 +167,10 @@ class AddressChangeSerializer(Serializer):
         ]
 
 
+    # encode_diff uses the change's recorded changed fields where it can
+    virtual_fields = set(["diff"])
+
+
     def encode_changed_timestamp(self, dt):
         return self._encode_datetime(dt)
 
@@ -158,8 +195,22 @@ class AddressChangeSerializer(Serializer):
         return self._encode_address_snapshot(snapshot)
 
 
-    def encode_diff(self, diff):
+    def encode_diff(self, change):
         # Don't need diff details in a serialization, just need to know the
         # field changed.
-        if diff:
-            return dict((field, True) for field in diff.keys())
+        if change.changed_fields is not None:
+            fields = change.changed_fields.split()
+        else:
+            fields = (change.diff or {}).keys()
+        if fields:
+            return dict((field, True) for field in fields)
+
+
+
+def _identity(obj):
+    return obj
+
+
+
+def _none(obj):
+    return None
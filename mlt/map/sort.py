@@ -1,5 +1,4 @@
 from django.core.exceptions import FieldError
-from django.db.models import Max
 
 
 
@@ -11,9 +10,6 @@ class BadSort(ValueError):
 
 
 def apply(qs, sort):
-    # Avoid dupe results due to naive order_by across m2m
-    if "latest_batch_timestamp" in sort or "-latest_batch_timestamp" in sort:
-        qs = qs.annotate(latest_batch_timestamp=Max("batches__timestamp"))
     sortqs = qs.order_by(*sort)
 
     try:
@@ -2,65 +2,63 @@ import shutil
 
 from celery.task import task
 
+from ..core import aftercommit
+from ..core.conf import conf
+from . import autocomplete, counts
+
 
 
 @task(ignore_result=True)
-def record_bulk_delete(address_ids, user_id, timestamp):
-    from .models import Address
+def record_address_change(address_id, pre_data, post_data, user_id, timestamp):
+    from .models import AddressChange
 
-    for address in Address._base_manager.filter(id__in=address_ids):
-        pre_data = address.snapshot_data(saved=True)
-        record_address_change.delay(
-            address_id=address.id,
-            pre_data=pre_data,
-            post_data=None,
-            user_id=user_id,
-            timestamp=timestamp)
+    change = AddressChange.objects.record(
+        address_id, pre_data, post_data, user_id, timestamp)
+
+    autocomplete.record(change, counts.invalidate())
 
 
 
 @task(ignore_result=True)
-def record_bulk_changes(address_data, user_id, timestamp):
-    from .models import Address
+def build_autocomplete_indexes(qs, fields):
+    autocomplete.build(qs, fields)
 
-    for address in Address.objects.filter(id__in=set(address_data)):
-        for k, v in address_data[address.id]["pre"].items():
-            setattr(address, k, v)
-        pre_data = address.snapshot_data(saved=False)
-        for k, v in address_data[address.id]["post"].items():
-            setattr(address, k, v)
-        post_data = address.snapshot_data(saved=False)
-        record_address_change.delay(
-            address_id=address.id,
-            pre_data=pre_data,
-            post_data=post_data,
-            user_id=user_id,
-            timestamp=timestamp)
 
 
+@task
+def bulk_action_task(address_ids, user_id, updates, message):
+    """
+    Apply ``updates`` (a dictionary of field values, or ``None`` to delete)
+    to the addresses with the given ids, as user ``user_id``, in chunks of
+    ``MLT_BULK_ACTION_CHUNK_SIZE`` addresses, each in its own transaction,
+    reporting progress as it goes. Returns ``message``.
+
+    Not to be run eagerly within a request (see ``views.bulk_action_as_job``):
+    each chunk's commit would commit the request's transaction too.
+
+    """
+    from django.contrib.auth.models import User
+    from django.db import transaction
+    from .models import Address
 
-@task(ignore_result=True)
-def record_address_change(address_id, pre_data, post_data, user_id, timestamp):
-    from .models import AddressChange, AddressSnapshot
-
-    if pre_data:
-        pre_data["snapshot_timestamp"] = timestamp
-        pre = AddressSnapshot.objects.create(**pre_data)
-    else:
-        pre = None
-
-    if post_data:
-        post_data["snapshot_timestamp"] = timestamp
-        post = AddressSnapshot.objects.create(**post_data)
-    else:
-        post = None
-
-    AddressChange.objects.create(
-        address_id=address_id,
-        changed_by_id=user_id,
-        pre=pre,
-        post=post,
-        changed_timestamp=timestamp)
+    user = User.objects.get(pk=user_id)
+    total = len(address_ids)
+    size = conf.MLT_BULK_ACTION_CHUNK_SIZE
+    for start in range(0, total, size):
+        with transaction.commit_on_success():
+            addresses = Address.objects.filter(
+                id__in=address_ids[start:start + size])
+            if updates is None:
+                addresses.delete(user=user)
+            else:
+                addresses.update(user=user, **updates)
+        aftercommit.run_pending()
+        if not bulk_action_task.request.is_eager:
+            bulk_action_task.update_state(
+                state="PROGRESS",
+                meta={"done": min(start + size, total), "total": total})
+
+    return message
 
 
 
@@ -1,13 +1,19 @@
 from .test_admin import *
 from .test_api import *
+from .test_autocomplete import *
+from .test_commands import *
+from .test_counts import *
 from .test_encoder import *
 from .test_filters import *
 from .test_forms import *
 from .test_importer import *
 from .test_load import *
 from .test_models import *
+from .test_paging import *
 from .test_serializers import *
 from .test_tasks import *
+from .test_tiles import *
+from .test_topology import *
 from .test_utils import *
 from .test_views import *
 from .writers.test_base import *
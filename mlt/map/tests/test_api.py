@@ -1,9 +1,11 @@
 from datetime import datetime
+import urllib
 
 from django.core.urlresolvers import reverse
 
 from django_webtest import WebTest
 
+from .backports import override_settings
 from .utils import create_address, create_address_batch, create_user
 from ..models import ApiKey
 
@@ -12,6 +14,7 @@ __all__ = [
     "ApiHomeViewTest",
     "ApiBatchesViewTest",
     "ApiAddressesViewTest",
+    "ApiHistoryViewTest",
     ]
 
 
@@ -64,6 +67,7 @@ class ApiHomeViewTest(ApiViewTestCase):
                     {
                     "addresses": reverse("api_addresses"),
                     "batches": reverse("api_batches"),
+                    "history": reverse("api_history"),
                     },
                 "success": True,
                 }
@@ -166,6 +170,26 @@ class ApiBatchesViewTest(ApiListViewTestCase):
         self.assertEqual(res.json["batches"][0]["tag"], "b")
 
 
+    def test_cursor(self):
+        create_address_batch(tag="a")
+        create_address_batch(tag="b")
+
+        res1 = self.get(self.url + "?sort=tag&num=1")
+        res2 = self.get(
+            self.url + "?sort=tag&num=1&cursor=%s"
+            % urllib.quote(res1.json["next_cursor"]))
+
+        self.assertEqual(res1.json["batches"][0]["tag"], "a")
+        self.assertEqual(res2.json["batches"][0]["tag"], "b")
+
+
+    def test_bad_cursor(self):
+        res = self.get(self.url + "?cursor=foo")
+
+        self.assertEqual(res.json["success"], False)
+        self.assertEqual(res.json["error"], "Invalid cursor.")
+
+
 
 class ApiAddressesViewTest(ApiListViewTestCase):
     url_name = "api_addresses"
@@ -178,10 +202,23 @@ class ApiAddressesViewTest(ApiListViewTestCase):
         res = self.get()
 
         self.assertEqual(res.json["total"], 25)
+        self.assertEqual(res.json["total_exact"], True)
         self.assertEqual(len(res.json["addresses"]), 20)
         self.assertEqual(res.json["success"], True)
 
 
+    @override_settings(MLT_COUNT_ESTIMATE_THRESHOLD=0)
+    def test_estimated_total(self):
+        create_address()
+
+        res1 = self.get()
+        res2 = self.get(self.url + "?exact=true")
+
+        self.assertEqual(res1.json["total_exact"], False)
+        self.assertEqual(res2.json["total"], 1)
+        self.assertEqual(res2.json["total_exact"], True)
+
+
     def test_filter_mapped_by_username(self):
         create_address(street_name="one")
         create_address(
@@ -215,6 +252,36 @@ class ApiAddressesViewTest(ApiListViewTestCase):
         self.assertEqual(res.json["addresses"][0]["street_name"], "one")
 
 
+    def test_filter_match(self):
+        create_address(
+            input_street="123 N Main St", city="Rapid City", state="SD",
+            street_name="one")
+        create_address(
+            input_street="123 N Main St", city="Sturgis", state="SD",
+            street_name="two")
+
+        res = self.get(
+            self.url + "?" + urllib.urlencode(
+                {"match": "123 n main street, Rapid City, sd"}))
+
+        self.assertEqual(res.json["total"], 1)
+        self.assertEqual(res.json["success"], True)
+
+        self.assertEqual(res.json["addresses"][0]["street_name"], "one")
+
+
+    def test_filter_match_street(self):
+        create_address(
+            input_street="123 North Main", city="Rapid City", state="SD",
+            edited_street="123 N Main St")
+
+        res = self.get(
+            self.url + "?" + urllib.urlencode(
+                {"match": "123 n main street, Rapid City, sd"}))
+
+        self.assertEqual(res.json["total"], 1)
+
+
     def test_sort(self):
         create_address(street_name="a")
         create_address(street_name="b")
@@ -239,3 +306,68 @@ class ApiAddressesViewTest(ApiListViewTestCase):
         self.assertEqual(res.json["success"], True)
 
         self.assertEqual(res.json["addresses"][0]["street_name"], "b")
+
+
+    def test_cursor(self):
+        create_address(street_name="a")
+        create_address(street_name="b")
+
+        res1 = self.get(self.url + "?sort=street_name&num=1")
+        res2 = self.get(
+            self.url + "?sort=street_name&num=1&cursor=%s"
+            % urllib.quote(res1.json["next_cursor"]))
+
+        self.assertEqual(res1.json["addresses"][0]["street_name"], "a")
+        self.assertEqual(res2.json["addresses"][0]["street_name"], "b")
+        self.assertEqual(res2.json["next_cursor"], None)
+
+
+
+class ApiHistoryViewTest(ApiListViewTestCase):
+    url_name = "api_history"
+
+
+    def test_default(self):
+        a = create_address()
+        a.city = "Pawtucket"
+        a.save(user=create_user())
+
+        res = self.get()
+
+        self.assertEqual(res.json["total"], 2)
+        self.assertEqual(res.json["success"], True)
+        self.assertEqual(
+            [c["post"]["city"] for c in res.json["changes"]],
+            ["Pawtucket", "Providence"])
+
+
+    def test_as_of(self):
+        a1 = create_address(street_name="one")
+        a2 = create_address(street_name="two")
+        a1.batches.add(create_address_batch(tag="x"))
+        a1.address_changes.update(changed_timestamp=datetime(2011, 1, 1))
+        a1.street_name = "three"
+        a1.save(user=create_user())
+
+        res1 = self.get(self.url + "?as_of=2011-01-01&address__batches__tag=x")
+        res2 = self.get(self.url + "?as_of=today&sort=address")
+
+        self.assertEqual(res1.json["total"], 1)
+        self.assertEqual(res1.json["changes"][0]["address_id"], a1.id)
+        self.assertEqual(res1.json["changes"][0]["post"]["street_name"], "one")
+        self.assertEqual(
+            [c["post"]["street_name"] for c in res2.json["changes"]],
+            ["three", "two"])
+        self.assertEqual(res2.json["changes"][1]["address_id"], a2.id)
+
+
+    def test_bad_as_of(self):
+        res = self.get(self.url + "?as_of=foo")
+
+        self.assertEqual(
+            res.json,
+            {
+                "success": False,
+                "error": "Bad as_of date: foo",
+                }
+            )
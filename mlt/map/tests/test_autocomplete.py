@@ -0,0 +1,394 @@
+import copy
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils.unittest import TestCase as UnitTestCase
+
+from mock import patch
+
+from .backports import override_settings
+from .utils import create_address, create_address_batch, create_user
+
+
+
+__all__ = ["CandidatesTest", "IndexedCandidatesTest", "PrefixIndexTest"]
+
+
+
+class CandidatesTest(TestCase):
+    """
+    Candidates from the database (with no current index).
+
+    """
+    def setUp(self):
+        cache.clear()
+        self.patcher = patch(
+            "mlt.map.autocomplete._current_indexes", return_value=None)
+        self.patcher.start()
+
+
+    def tearDown(self):
+        self.patcher.stop()
+
+
+    @property
+    def func(self):
+        from mlt.map.autocomplete import candidates
+        return candidates
+
+
+    @property
+    def qs(self):
+        from mlt.map.models import Address
+        return Address.objects.all()
+
+
+    fields = {
+        "city": "city",
+        "mapped_by": "mapped_by__username",
+        "batches": "batches__tag",
+        }
+
+
+    def test_candidates(self):
+        user = create_user(username="alberta")
+        a = create_address(city="Albuquerque", mapped_by=user)
+        create_address(city="Providence")
+        b = create_address_batch(tag="alpha")
+        a.batches.add(b)
+
+        self.assertEqual(
+            self.func(self.qs, self.fields, "Al", 5),
+            {
+                "city": [(u"Albuquerque", u"Albuquerque")],
+                "mapped_by": [(u"alberta", user.id)],
+                "batches": [(u"alpha", b.id)],
+                }
+            )
+
+
+    def test_one_query(self):
+        create_address(city="Albuquerque")
+
+        with self.assertNumQueries(1):
+            self.func(self.qs, self.fields, "Al", 5)
+
+
+    def test_distinct(self):
+        create_address(city="Albuquerque")
+        create_address(city="Albuquerque")
+
+        self.assertEqual(
+            self.func(self.qs, {"city": "city"}, "al", 5),
+            {"city": [(u"Albuquerque", u"Albuquerque")]})
+
+
+    def test_too_many(self):
+        for i in range(3):
+            create_address(city="Providence %s" % i)
+
+        self.assertEqual(
+            self.func(self.qs, {"city": "city"}, "Prov", 2), {"city": None})
+
+
+    def test_longer_prefix_cached(self):
+        create_address(city="Albuquerque")
+        create_address(city="Alameda")
+        self.func(self.qs, {"city": "city"}, "Al", 5)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.func(self.qs, {"city": "city"}, "alb", 5),
+                {"city": [(u"Albuquerque", u"Albuquerque")]})
+
+
+    def test_too_many_not_narrowed(self):
+        create_address(city="Albuquerque")
+        create_address(city="Alameda")
+        self.func(self.qs, {"city": "city"}, "Al", 1)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                self.func(self.qs, {"city": "city"}, "alb", 1),
+                {"city": [(u"Albuquerque", u"Albuquerque")]})
+
+
+    def test_invalidated_by_save(self):
+        create_address(city="Albuquerque")
+        self.func(self.qs, {"city": "city"}, "Al", 5)
+
+        create_address(city="Alameda")
+
+        self.assertEqual(
+            self.func(self.qs, {"city": "city"}, "Al", 5),
+            {
+                "city": [
+                    (u"Alameda", u"Alameda"),
+                    (u"Albuquerque", u"Albuquerque"),
+                    ]
+                }
+            )
+
+
+
+class IndexedCandidatesTest(TestCase):
+    """
+    Candidates from cached indexes, built as soon as needed here (as tasks
+    run eagerly).
+
+    """
+    def setUp(self):
+        from mlt.map.autocomplete import clear_indexes, build
+        cache.clear()
+        clear_indexes()
+
+        self.patcher = patch(
+            "mlt.map.autocomplete.build", side_effect=build)
+        self.build = self.patcher.start()
+
+
+    def tearDown(self):
+        self.patcher.stop()
+
+
+    @property
+    def func(self):
+        from mlt.map.autocomplete import candidates
+        return candidates
+
+
+    @property
+    def qs(self):
+        from mlt.map.models import Address
+        return Address.objects.all()
+
+
+    fields = {"city": "city", "mapped_by": "mapped_by__username"}
+
+
+    def test_built_lazily(self):
+        create_address(city="Albuquerque")
+
+        with self.assertNumQueries(1):
+            self.func(self.qs, self.fields, "al", 5)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.func(self.qs, self.fields, "alb", 5),
+                {"city": [(u"Albuquerque", u"Albuquerque")], "mapped_by": []})
+
+
+    def test_shared(self):
+        """
+        Indexes built in another process are used from the cache.
+
+        """
+        from mlt.map.autocomplete import _indexes
+        create_address(city="Albuquerque")
+        self.func(self.qs, self.fields, "al", 5)
+
+        _indexes.clear()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.func(self.qs, self.fields, "alb", 5),
+                {"city": [(u"Albuquerque", u"Albuquerque")], "mapped_by": []})
+        self.assertEqual(self.build.call_count, 1)
+
+
+    def test_too_many(self):
+        for i in range(3):
+            create_address(city="Providence %s" % i)
+
+        self.assertEqual(
+            self.func(self.qs, {"city": "city"}, "Prov", 2), {"city": None})
+
+
+    def test_updated_by_save(self):
+        user = create_user(username="alberta")
+        self.func(self.qs, self.fields, "al", 5)
+
+        create_address(city="Albuquerque", mapped_by=user)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.func(self.qs, self.fields, "al", 5),
+                {
+                    "city": [(u"Albuquerque", u"Albuquerque")],
+                    "mapped_by": [(u"alberta", user.id)],
+                    }
+                )
+
+
+    def test_updated_by_save_elsewhere(self):
+        """
+        Saves in another process update the cached indexes (as this process'
+        copy is replaced).
+
+        """
+        from mlt.map.autocomplete import _indexes
+        self.func(self.qs, {"city": "city"}, "al", 5)
+        key, indexes = _indexes.items()[0]
+        unchanged = copy.deepcopy(indexes)
+
+        create_address(city="Albuquerque")
+        _indexes[key] = unchanged
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.func(self.qs, {"city": "city"}, "al", 5),
+                {"city": [(u"Albuquerque", u"Albuquerque")]})
+
+
+    def test_stale_after_version_reset(self):
+        """
+        A save that can't tell which data version it moved on from (the
+        version having been dropped from the cache) leaves the indexes stale.
+
+        """
+        from mlt.map import counts
+        a = create_address(city="Providence")
+        self.func(self.qs, {"city": "city"}, "al", 5)
+
+        cache.delete(counts.VERSION_KEY)
+        a.city = "Albuquerque"
+        a.save(user=create_user())
+
+        self.assertEqual(
+            self.func(self.qs, {"city": "city"}, "al", 5),
+            {"city": [(u"Albuquerque", u"Albuquerque")]})
+        self.assertEqual(self.build.call_count, 1)
+
+
+    def test_history_updated_by_save(self):
+        from mlt.map.models import AddressChange
+        fields = {"post__city": "post__city"}
+        a = create_address(city="Providence")
+        self.func(AddressChange.objects.all(), fields, "al", 5)
+
+        a.city = "Albuquerque"
+        a.save(user=create_user())
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.func(AddressChange.objects.all(), fields, "al", 5),
+                {"post__city": [(u"Albuquerque", u"Albuquerque")]})
+
+
+    def test_stale(self):
+        a = create_address(city="Providence")
+        self.func(self.qs, self.fields, "al", 5)
+
+        # bulk updates aren't tracked by the index
+        self.qs.filter(id=a.id).update(city="Albuquerque", user=create_user())
+
+        self.assertEqual(
+            self.func(self.qs, self.fields, "al", 5),
+            {"city": [(u"Albuquerque", u"Albuquerque")], "mapped_by": []})
+
+
+    def test_stale_not_rebuilt(self):
+        a = create_address(city="Providence")
+        self.func(self.qs, self.fields, "al", 5)
+        self.qs.filter(id=a.id).update(city="Albuquerque", user=create_user())
+
+        # just the rows written since the index was built
+        with self.assertNumQueries(1):
+            self.func(self.qs, self.fields, "al", 5)
+        self.assertEqual(self.build.call_count, 1)
+
+
+    def test_stale_too_many(self):
+        a = create_address(city="Alameda")
+        create_address(city="Albany")
+        self.func(self.qs, {"city": "city"}, "al", 5)
+        self.qs.filter(id=a.id).update(city="Albuquerque", user=create_user())
+
+        self.assertEqual(
+            self.func(self.qs, {"city": "city"}, "al", 2), {"city": None})
+
+
+    def test_stale_history(self):
+        from mlt.map.models import AddressChange
+        fields = {"post__city": "post__city"}
+        a = create_address(city="Providence")
+        self.func(AddressChange.objects.all(), fields, "al", 5)
+
+        self.qs.filter(id=a.id).update(city="Albuquerque", user=create_user())
+
+        self.assertEqual(
+            self.func(AddressChange.objects.all(), fields, "al", 5),
+            {"post__city": [(u"Albuquerque", u"Albuquerque")]})
+
+
+    def test_not_built_yet(self):
+        self.build.side_effect = None
+        self.build.return_value = None
+        create_address(city="Albuquerque")
+
+        self.assertEqual(
+            self.func(self.qs, {"city": "city"}, "al", 5),
+            {"city": [(u"Albuquerque", u"Albuquerque")]})
+        self.assertEqual(self.build.call_count, 1)
+
+
+    def test_rebuilt(self):
+        a = create_address(city="Providence")
+        self.func(self.qs, self.fields, "al", 5)
+        self.qs.filter(id=a.id).update(city="Albuquerque", user=create_user())
+        with override_settings(MLT_AUTOCOMPLETE_INDEX_REBUILD_AGE=0):
+            self.func(self.qs, self.fields, "al", 5)
+
+        self.assertEqual(self.build.call_count, 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.func(self.qs, self.fields, "alb", 5),
+                {"city": [(u"Albuquerque", u"Albuquerque")], "mapped_by": []})
+
+
+    def test_rebuilt_when_current(self):
+        """
+        Indexes are rebuilt once old even if current, as one built while a
+        write was not yet committed may be missing it.
+
+        """
+        self.func(self.qs, {"city": "city"}, "al", 5)
+
+        with override_settings(MLT_AUTOCOMPLETE_INDEX_REBUILD_AGE=0):
+            self.func(self.qs, {"city": "city"}, "al", 5)
+
+        self.assertEqual(self.build.call_count, 2)
+
+
+
+class PrefixIndexTest(UnitTestCase):
+    @property
+    def klass(self):
+        from mlt.map.autocomplete import PrefixIndex
+        return PrefixIndex
+
+
+    def test_search(self):
+        index = self.klass(
+            [(u"Providence", 1), (u"alameda", 2), (u"Albuquerque", 3)])
+
+        self.assertEqual(
+            index.search(u"al", 5), [(u"alameda", 2), (u"Albuquerque", 3)])
+
+
+    def test_too_many(self):
+        index = self.klass([(u"Alameda", 1), (u"Albuquerque", 2)])
+
+        self.assertEqual(index.search(u"al", 1), None)
+        self.assertEqual(len(index.search(u"al", 2)), 2)
+
+
+    def test_add(self):
+        index = self.klass([(u"Albuquerque", 1)])
+
+        index.add(u"Alameda", 2)
+        index.add(u"Alameda", 2)
+
+        self.assertEqual(len(index), 2)
+        self.assertEqual(
+            index.search(u"ala", 5), [(u"Alameda", 2)])
+
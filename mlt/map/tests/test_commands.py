@@ -0,0 +1,53 @@
+import datetime
+from cStringIO import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase
+
+from .utils import create_address, create_address_batch
+
+
+
+__all__ = ["UpdateBatchTimestampsCommandTest", "UpdateMatchKeysCommandTest"]
+
+
+
+class UpdateBatchTimestampsCommandTest(TransactionTestCase):
+    """
+    Run outside test transactions, so the command must commit its updates.
+
+    """
+    def test_committed(self):
+        from mlt.map.models import Address
+        a = create_address()
+        a.batches.add(
+            create_address_batch(timestamp=datetime.datetime(2011, 9, 10)))
+        Address._base_manager.update(latest_batch_timestamp=None)
+
+        call_command("update_batch_timestamps", stdout=StringIO())
+        connection.close()
+
+        self.assertEqual(
+            Address.objects.get(id=a.id).latest_batch_timestamp,
+            datetime.datetime(2011, 9, 10))
+
+
+
+class UpdateMatchKeysCommandTest(TransactionTestCase):
+    """
+    Run outside test transactions, so the command must commit its updates.
+
+    """
+    def test_committed(self):
+        from mlt.map.models import Address
+        a = create_address(
+            input_street="123 N Main St", city="Rapid City", state="SD")
+        Address._base_manager.update(match_key="")
+
+        call_command("update_match_keys", stdout=StringIO())
+        connection.close()
+
+        self.assertEqual(
+            Address.objects.get(id=a.id).match_key,
+            "123 n main st|rapid city|sd")
@@ -0,0 +1,182 @@
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import TestCase
+
+from .backports import override_settings
+from .utils import create_address, create_address_batch, create_user
+
+
+
+__all__ = ["CountTest"]
+
+
+
+class CountTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+
+    @property
+    def func(self):
+        from mlt.map.counts import count
+        return count
+
+
+    @property
+    def qs(self):
+        from mlt.map.models import Address
+        return Address.objects.all()
+
+
+    def filtered(self, querystring):
+        from mlt.map.filters import AddressFilter
+        return AddressFilter().apply(self.qs, QueryDict(querystring))
+
+
+    def test_count(self):
+        create_address()
+        create_address()
+
+        self.assertEqual(self.func(self.qs), (2, True))
+
+
+    def test_cached(self):
+        create_address()
+        self.func(self.qs)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.func(self.qs), (1, True))
+
+
+    def test_normalized(self):
+        create_address(city="Providence", state="RI")
+        self.func(self.filtered("city=Providence&state=RI"))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.func(self.filtered("state=RI&city=Providence")),
+                (1, True))
+
+
+    def test_ordering_ignored(self):
+        create_address()
+        self.func(self.qs.order_by("city"))
+
+        with self.assertNumQueries(0):
+            self.func(self.qs.order_by("-id"))
+
+
+    def test_empty(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.func(self.qs.filter(id__in=[])), (0, True))
+
+
+    def test_invalidate_versions(self):
+        from mlt.map import counts
+        version = counts.version()
+
+        self.assertEqual(counts.invalidate(), (version, version + 1))
+
+
+    def test_invalidate_versions_evicted(self):
+        from mlt.map import counts
+        cache.delete(counts.VERSION_KEY)
+
+        previous, version = counts.invalidate()
+
+        self.assertEqual(previous, None)
+        self.assertEqual(counts.version(), version)
+
+
+    def test_invalidated_by_save(self):
+        self.func(self.qs)
+
+        create_address()
+
+        self.assertEqual(self.func(self.qs), (1, True))
+
+
+    def test_invalidated_by_delete(self):
+        a = create_address()
+        self.func(self.qs)
+
+        a.delete(user=create_user())
+
+        self.assertEqual(self.func(self.qs), (0, True))
+
+
+    def test_invalidated_by_bulk_update(self):
+        create_address()
+        qs = self.qs.filter(pl="123")
+        self.func(qs)
+
+        self.qs.update(pl="123", user=create_user())
+
+        self.assertEqual(self.func(qs), (1, True))
+
+
+    def test_invalidated_by_batch(self):
+        a = create_address()
+        qs = self.filtered("batches__tag=one")
+        self.func(qs)
+
+        a.batches.add(create_address_batch(tag="one"))
+
+        self.assertEqual(self.func(qs), (1, True))
+
+
+    def test_history_invalidated(self):
+        from mlt.map.models import AddressChange
+        a = create_address()
+        self.func(AddressChange.objects.all())
+
+        a.street_name = "Main"
+        a.save(user=create_user())
+
+        self.assertEqual(self.func(AddressChange.objects.all()), (2, True))
+
+
+    @override_settings(MLT_COUNT_ESTIMATE_THRESHOLD=0)
+    def test_estimated(self):
+        create_address()
+
+        count, exact = self.func(self.qs, filtered=False)
+
+        self.assertEqual(exact, False)
+
+
+    @override_settings(MLT_COUNT_ESTIMATE_THRESHOLD=0)
+    def test_estimated_not_cached(self):
+        create_address()
+        self.func(self.qs, filtered=False)
+
+        self.assertEqual(self.func(self.qs, exact=True), (1, True))
+
+
+    @override_settings(MLT_COUNT_ESTIMATE_THRESHOLD=0)
+    def test_filtered_not_estimated(self):
+        create_address()
+
+        self.assertEqual(self.func(self.qs), (1, True))
+
+
+    @override_settings(MLT_COUNT_ESTIMATE_THRESHOLD=0)
+    def test_exact_required(self):
+        create_address()
+
+        self.assertEqual(
+            self.func(self.qs, filtered=False, exact=True), (1, True))
+
+
+    @override_settings(MLT_COUNT_ESTIMATE_THRESHOLD=0)
+    def test_cached_exact_preferred(self):
+        create_address()
+        self.func(self.qs)
+
+        self.assertEqual(self.func(self.qs, filtered=False), (1, True))
+
+
+    def test_small_not_estimated(self):
+        create_address()
+
+        self.assertEqual(self.func(self.qs, filtered=False), (1, True))
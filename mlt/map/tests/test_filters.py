@@ -4,7 +4,14 @@ from django.utils.unittest import TestCase
 
 
 
-__all__ = ["ParseDateTest", "ParseDateRangeTest"]
+__all__ = [
+    "ParseDateTest",
+    "ParseDateRangeTest",
+    "ParseAsOfTest",
+    "FilterActiveTest",
+    "MultivaluedTest",
+    "FilterApplyTest",
+    ]
 
 
 
@@ -98,3 +105,116 @@ class ParseDateRangeTest(TestCase):
             self.func("9/5/11 to"),
             (datetime(2011, 9, 5), self.today)
             )
+
+
+
+class ParseAsOfTest(TestCase):
+    @property
+    def func(self):
+        from mlt.map.filters import parse_as_of
+        return parse_as_of
+
+
+    def test_empty(self):
+        self.assertEqual(self.func(" "), None)
+
+
+    def test_bad(self):
+        self.assertEqual(self.func("foo"), None)
+
+
+    def test_date(self):
+        self.assertEqual(self.func("8/31/11"), datetime(2011, 9, 1))
+
+
+    def test_datetime(self):
+        self.assertEqual(
+            self.func("8/31/11 14:30"), datetime(2011, 8, 31, 14, 30))
+
+
+
+class FilterActiveTest(TestCase):
+    @property
+    def func(self):
+        from mlt.map.filters import AddressFilter
+        return AddressFilter().active
+
+
+    def test_none(self):
+        self.assertFalse(self.func({"sort": "city", "count": "true"}))
+
+
+    def test_field(self):
+        self.assertTrue(self.func({"city": "Providence"}))
+
+
+    def test_special_field(self):
+        self.assertTrue(self.func({"status": "unmapped"}))
+
+
+    def test_override_field(self):
+        self.assertTrue(self.func({"aid": "1"}))
+
+
+
+class MultivaluedTest(TestCase):
+    @property
+    def func(self):
+        from mlt.map.filters import multivalued
+        return multivalued
+
+
+    @property
+    def Address(self):
+        from mlt.map.models import Address
+        return Address
+
+
+    def test_m2m(self):
+        self.assertTrue(self.func(self.Address, "batches__tag__in"))
+
+
+    def test_reverse_fk(self):
+        self.assertTrue(self.func(self.Address, "address_changes__changed_by"))
+
+
+    def test_through_fk(self):
+        from mlt.map.models import AddressChange
+        self.assertTrue(self.func(AddressChange, "address__batches"))
+
+
+    def test_fk(self):
+        self.assertFalse(self.func(self.Address, "mapped_by__username"))
+
+
+    def test_field(self):
+        self.assertFalse(self.func(self.Address, "city__istartswith"))
+
+
+    def test_pk(self):
+        self.assertFalse(self.func(self.Address, "pk__in"))
+
+
+
+class FilterApplyTest(TestCase):
+    def sql(self, querystring):
+        from django.http import QueryDict
+        from mlt.map.filters import AddressFilter
+        from mlt.map.models import Address
+        return str(
+            AddressFilter().apply(
+                Address.objects.all(), QueryDict(querystring)).query)
+
+
+    def test_multivalued_subquery(self):
+        sql = self.sql("batches=1&city=Providence")
+
+        self.assertIn("IN (SELECT", sql)
+        self.assertNotIn("DISTINCT", sql)
+
+
+    def test_no_subquery(self):
+        sql = self.sql("city=Providence")
+
+        self.assertNotIn("IN (SELECT", sql)
+        self.assertNotIn("DISTINCT", sql)
@@ -163,6 +163,23 @@ class AddressFormTest(TestCase):
             f.errors, {'__all__': [u'Please enter a street address.']})
 
 
+    def test_create_dupe(self):
+        create_address(
+            input_street="3635 Van Gordon St", city="Providence", state="RI")
+        f = self.form(
+            {
+                "street_number": "3635",
+                "street_name": "van gordon",
+                "street_type": "Street",
+                "city": "Providence",
+                "state": "RI",
+                })
+
+        self.assertFalse(f.is_valid())
+        self.assertEqual(
+            f.errors, {'__all__': [u'This address already exists.']})
+
+
     def test_edit(self):
         a = create_address(
             street_number="1234",
@@ -154,6 +154,112 @@ class AddressImporterTest(GetImporterMixin, TransactionTestCase):
         self.assertEqual(len(batches), 0)
 
 
+    def test_import_duplicate_of_parsed_street(self):
+        """
+        A row whose street is an existing address' parsed street, rather than
+        its input street, is counted as a dupe of it.
+
+        """
+        a = create_address(
+            input_street="123 North Main", city="Rapid City", state="SD",
+            street_number="123", street_prefix="N", street_name="Main",
+            street_type="St")
+        i = self.get_importer()
+
+        count, dupes = i.process(
+            [
+                {
+                    "street": "123 N Main St",
+                    "city": "Rapid City",
+                    "state": "SD"
+                    },
+                ]
+            )
+
+        self.assertEqual(count, 0)
+        self.assertEqual(dupes, 1)
+        self.assertEqual(list(self.model.objects.all()), [a])
+        self.assertEqual(
+            [b.tag for b in self.model.objects.get().batches.all()],
+            ["tests"])
+
+
+    def test_import_duplicate_rows(self):
+        """
+        A row duplicating an earlier row is counted as a dupe, and adds the
+        earlier row's address to the batch.
+
+        """
+        i = self.get_importer()
+
+        count, dupes = i.process(
+            [
+                {
+                    "street": "3815 Brookside Dr",
+                    "city": "Rapid City",
+                    "state": "SD"
+                    },
+                {
+                    "street": "3815  brookside dr.",
+                    "city": "rapid city",
+                    "state": "sd"
+                    },
+                ]
+            )
+
+        self.assertEqual(count, 1)
+        self.assertEqual(dupes, 1)
+        a = self.model.objects.get()
+        self.assertEqual(a.input_street, "3815 Brookside Dr")
+        self.assertEqual(
+            [b.tag for b in a.batches.all()], ["tests"])
+
+
+    def test_import_history(self):
+        i = self.get_importer()
+
+        i.process(
+            [
+                {
+                    "street": "3815 Brookside Dr",
+                    "city": "Rapid City",
+                    "state": "SD"
+                    },
+                ]
+            )
+
+        change = self.model.objects.get().address_changes.get()
+        self.assertIs(change.pre, None)
+        self.assertEqual(change.post.input_street, "3815 Brookside Dr")
+        self.assertEqual(change.post.street, "3815 Brookside Dr")
+        self.assertEqual(change.changed_by, self.user)
+
+
+    def test_import_batch_timestamp(self):
+        i = self.get_importer()
+        create_address(
+            input_street="3815 Brookside Dr", city="Rapid City", state="SD")
+
+        i.process(
+            [
+                {
+                    "street": "123 N Main St",
+                    "city": "Rapid City",
+                    "state": "SD"
+                    },
+                {
+                    "street": "3815 Brookside Dr",
+                    "city": "Rapid City",
+                    "state": "SD"
+                    },
+                ]
+            )
+
+        self.assertEqual(
+            [a.latest_batch_timestamp for a in self.model.objects.all()],
+            [datetime.datetime(2011, 7, 8, 1, 2, 3)] * 2)
+
+
     def test_import_errors(self):
         """
         Errors, if any, are raised as an ImporterError whose ``errors``
@@ -245,7 +351,8 @@ class AddressImporterTest(GetImporterMixin, TransactionTestCase):
         """
         i = self.get_importer()
 
-        with patch("mlt.map.importer.Address.objects.create_from_input") as ci:
+        with patch(
+                "mlt.map.importer.Address.objects.prepare_from_input") as ci:
             class SomeError(Exception):
                 pass
             def raise_someerror(*args, **kwargs):
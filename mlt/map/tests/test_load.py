@@ -60,6 +60,20 @@ class LoadParcelsTest(TestCase):
         self.assertEqual(parcel.pl, "123 45")
 
 
+    def test_simplified_geometries(self):
+        p = create_parcel(pl="123 45", commit=False)
+
+        shapefile = self.write_shapefile([p])
+
+        self.func(shapefile, verbose=False, stream=Mock())
+
+        parcel = self.model.objects.get()
+
+        self.assertIsNot(parcel.geom_low, None)
+        self.assertIsNot(parcel.geom_medium, None)
+        self.assertTrue(parcel.geom_low.num_coords <= parcel.geom.num_coords)
+
+
     def test_second_load(self):
         create_parcel(pl="135 79")
 
@@ -1,4 +1,5 @@
 import datetime
+import json
 
 from django.core.exceptions import ValidationError
 from django.test import TestCase
@@ -13,6 +14,7 @@ from .utils import (
 
 __all__ = [
     "ParcelTest",
+    "ParcelMappingTest",
     "AddressTest",
     "AddressBatchTest",
     "PrefetchQuerySetTest"]
@@ -64,6 +66,164 @@ class ParcelTest(TestCase):
         self.assertEqual(parcel.longitude, 2.0)
 
 
+    def test_centroid_stored(self):
+        parcel = create_parcel(
+            geom=create_mpolygon([
+                    (1.0, 5.0),
+                    (1.0, 9.0),
+                    (3.0, 9.0),
+                    (3.0, 5.0),
+                    (1.0, 5.0)]))
+
+        parcel = refresh(parcel)
+
+        self.assertEqual((parcel.centroid.x, parcel.centroid.y), (2.0, 7.0))
+
+
+    def test_latlong_geom_not_loaded(self):
+        create_parcel(
+            geom=create_mpolygon([
+                    (1.0, 5.0),
+                    (1.0, 9.0),
+                    (3.0, 9.0),
+                    (3.0, 5.0),
+                    (1.0, 5.0)]))
+
+        with self.assertNumQueries(1):
+            parcel = self.model.objects.defer("geom").get()
+            self.assertEqual((parcel.longitude, parcel.latitude), (2.0, 7.0))
+
+
+    def test_geometry_for_zoom(self):
+        parcel = create_parcel()
+        parcel.geom_low = create_mpolygon(
+            [(1.0, 5.0), (1.0, 9.0), (3.0, 9.0), (1.0, 5.0)])
+
+        self.assertEqual(parcel.geometry_for_zoom(13), parcel.geom_low)
+        self.assertEqual(parcel.geometry_for_zoom(18), parcel.geom)
+        self.assertEqual(parcel.geometry_for_zoom(None), parcel.geom)
+
+
+    def test_geometry_for_zoom_not_simplified(self):
+        parcel = create_parcel()
+
+        self.assertEqual(parcel.geometry_for_zoom(13), parcel.geom)
+
+
+    def test_with_geojson(self):
+        create_parcel(
+            geom=create_mpolygon(
+                [(1.0, 5.0), (1.0, 6.0), (2.0, 6.0), (1.0, 5.0)]))
+
+        parcel = self.model.objects.all().with_geojson().get()
+
+        self.assertEqual(
+            json.loads(parcel.geojson),
+            {
+                "type": "MultiPolygon",
+                "coordinates": [[[[1, 5], [1, 6], [2, 6], [1, 5]]]],
+                }
+            )
+
+
+    def test_with_geojson_precision(self):
+        create_parcel(
+            geom=create_mpolygon(
+                [(1.0, 5.0), (1.0, 6.0), (2.123456, 6.0), (1.0, 5.0)]))
+
+        parcel = self.model.objects.all().with_geojson(precision=2).get()
+
+        self.assertEqual(
+            json.loads(parcel.geojson)["coordinates"][0][0][2], [2.12, 6])
+
+
+    def test_with_geojson_zoom(self):
+        create_parcel(
+            geom=create_mpolygon(
+                [(1.0, 5.0), (1.0, 6.0), (2.0, 6.0), (2.0, 5.0), (1.0, 5.0)]),
+            geom_low=create_mpolygon(
+                [(1.0, 5.0), (1.0, 6.0), (2.0, 6.0), (1.0, 5.0)]))
+
+        low = self.model.objects.all().with_geojson(zoom=13).get()
+        full = self.model.objects.all().with_geojson(zoom=18).get()
+
+        self.assertEqual(
+            len(json.loads(low.geojson)["coordinates"][0][0]), 4)
+        self.assertEqual(
+            len(json.loads(full.geojson)["coordinates"][0][0]), 5)
+
+
+    def test_stream_values(self):
+        create_parcel(pl="1")
+        create_parcel(pl="2")
+
+        rows = list(
+            self.model.objects.order_by("pl").extra(
+                select={"lower_pl": "lower(pl)"}).stream_values(
+                "pl", "lower_pl", chunk_size=1))
+
+        self.assertEqual(
+            rows,
+            [{"pl": "1", "lower_pl": "1"}, {"pl": "2", "lower_pl": "2"}])
+
+
+    def test_stream_values_queries(self):
+        create_parcel()
+
+        with self.assertNumQueries(1):
+            list(self.model.objects.all().stream_values("pl"))
+
+
+    def test_clusters(self):
+        square = lambda x, y: create_mpolygon(
+            [(x, y), (x, y + 1), (x + 1, y + 1), (x + 1, y), (x, y)])
+        create_parcel(pl="1", geom=square(1.0, 5.0))
+        create_parcel(pl="2", geom=square(2.0, 5.0))
+        create_parcel(pl="3", geom=square(21.0, 5.0))
+        create_address(pl="1")
+        create_address(pl="3", needs_review=True)
+
+        clusters = sorted(
+            self.model.objects.all().clusters(36),
+            key=lambda c: c["count"])
+
+        self.assertEqual(
+            [json.loads(c.pop("geojson"))["coordinates"] for c in clusters],
+            [[21.5, 5.5], [2.0, 5.5]])
+        self.assertEqual(
+            clusters,
+            [
+                {"count": 1, "mapped": 1, "unmapped": 0, "flagged": 1},
+                {"count": 2, "mapped": 1, "unmapped": 1, "flagged": 0},
+                ]
+            )
+
+
+    def test_clusters_tile_aligned(self):
+        square = lambda x, y: create_mpolygon(
+            [(x, y), (x, y + 1), (x + 1, y + 1), (x + 1, y), (x, y)])
+        # either side of the edge between tiles 0 and 1 at zoom 1
+        create_parcel(pl="1", geom=square(-1.5, 5.0))
+        create_parcel(pl="2", geom=square(0.5, 5.0))
+        # either side of the equator, also a tile edge at zoom 1
+        create_parcel(pl="3", geom=square(-60.0, 0.1))
+        create_parcel(pl="4", geom=square(-60.0, -1.1))
+
+        for pls in [["1", "2"], ["3", "4"]]:
+            clusters = self.model.objects.filter(pl__in=pls).clusters(2)
+
+            self.assertEqual([c["count"] for c in clusters], [1, 1])
+
+
+    def test_clusters_filtered(self):
+        create_parcel(pl="1")
+        create_parcel(pl="2")
+
+        clusters = self.model.objects.filter(pl="1").clusters(36)
+
+        self.assertEqual([c["count"] for c in clusters], [1])
+
+
     def test_mapped_to(self):
         parcel = create_parcel(pl="1234")
         address1 = create_address(pl="1234", needs_review=False)
@@ -109,6 +269,131 @@ class ParcelTest(TestCase):
 
 
 
+class ParcelMappingTest(TestCase):
+    @property
+    def model(self):
+        from mlt.map.models import ParcelMapping
+        return ParcelMapping
+
+
+    def test_save(self):
+        a = create_address(pl="1", needs_review=True)
+
+        pm = self.model.objects.get(pl="1")
+        self.assertEqual(pm.mapped_count, 1)
+        self.assertEqual(pm.flagged_count, 1)
+        self.assertEqual(
+            json.loads(pm.addresses),
+            [{"id": a.id, "street": a.street, "needs_review": True}])
+
+
+    def test_save_remap(self):
+        a = create_address(pl="1")
+        create_address(pl="1")
+
+        a.pl = "2"
+        a.save(user=create_user())
+
+        self.assertEqual(self.model.objects.get(pl="1").mapped_count, 1)
+        self.assertEqual(self.model.objects.get(pl="2").mapped_count, 1)
+
+
+    def test_save_unmapped(self):
+        a = create_address(pl="1")
+
+        a.pl = ""
+        a.save(user=create_user())
+
+        self.assertEqual(self.model.objects.filter(pl="1").count(), 0)
+
+
+    def test_save_unchanged(self):
+        from mlt.map.models import Address
+        a = Address.objects.get(pk=create_address(pl="1").pk)
+
+        a.multi_units = True
+        with self.assertNumQueries(0):
+            a._refresh_mapping_summary(
+                a.snapshot_data(saved=True), a.snapshot_data(saved=False))
+
+
+    def test_refresh_locks_pls(self):
+        from django.db import connection
+        from mlt.map.models import PARCEL_MAPPING_LOCK
+
+        self.model.objects.refresh(["1", "2"])
+
+        cursor = connection.cursor()
+        cursor.execute(
+            "SELECT COUNT(*) FROM pg_locks WHERE locktype = 'advisory' "
+            "AND classid = %s AND pid = pg_backend_pid()",
+            [PARCEL_MAPPING_LOCK])
+        self.assertEqual(cursor.fetchone()[0], 2)
+
+
+    def test_delete_undelete(self):
+        a = create_address(pl="1")
+        user = create_user()
+
+        a.delete(user=user)
+        self.assertEqual(self.model.objects.filter(pl="1").count(), 0)
+
+        a.undelete(user=user)
+        self.assertEqual(self.model.objects.get(pl="1").mapped_count, 1)
+
+
+    def test_queryset_update(self):
+        from mlt.map.models import Address
+        create_address(pl="1")
+        create_address(pl="2")
+
+        Address.objects.all().update(
+            user=create_user(), pl="3", needs_review=True)
+
+        self.assertEqual(
+            list(self.model.objects.values_list(
+                    "pl", "mapped_count", "flagged_count")),
+            [("3", 2, 2)])
+
+
+    def test_queryset_delete(self):
+        from mlt.map.models import Address
+        create_address(pl="1")
+        create_address(pl="1")
+
+        Address.objects.all().delete(user=create_user())
+
+        self.assertEqual(self.model.objects.count(), 0)
+
+
+    def test_parcel_summary(self):
+        from mlt.map.models import Parcel
+        a = create_address(pl="1")
+        create_parcel(pl="1")
+        create_parcel(pl="2")
+
+        with self.assertNumQueries(1):
+            summaries = dict(
+                (p.pl, p.mapped_summary)
+                for p in Parcel.objects.all().with_mapping_summary())
+
+        self.assertEqual(
+            summaries,
+            {
+                "1": [{"id": a.id, "street": a.street, "needs_review": False}],
+                "2": [],
+                }
+            )
+
+
+    def test_parcel_summary_not_selected(self):
+        create_address(pl="1")
+        p = create_parcel(pl="1")
+
+        self.assertEqual(len(p.mapped_summary), 1)
+
+
+
 class AddressTest(TestCase):
     @property
     def model(self):
@@ -249,6 +534,21 @@ class AddressTest(TestCase):
         self.assertEqual(a.mapped_timestamp, now)
 
 
+    def test_prepare_from_input(self):
+        create_address(
+            input_street="123 N Main St", city="Rapid City", state="SD")
+        data = self.import_data()
+
+        a = self.model.objects.prepare_from_input(
+            street=" 123  N Main Street. ", city="Rapid City", state="sd",
+            pl="123", **data)
+
+        self.assertIs(a.id, None)
+        self.assertEqual(a.input_street, "123 N Main St")
+        self.assertEqual(a.state, "SD")
+        self.assertEqual(a.mapped_by, data["user"])
+
+
     def test_create_dupe(self):
         a = create_address(
             input_street="123 N Main St", city="Rapid City", state="SD")
@@ -284,6 +584,20 @@ class AddressTest(TestCase):
         self.assertFalse(created)
 
 
+    def test_create_dupe_of_parsed_street(self):
+        a = create_address(
+            input_street="123 North Main", city="Rapid City", state="SD",
+            street_number="123", street_prefix="N", street_name="Main",
+            street_type="St")
+
+        (created, addresses) = self.create_from_input(
+            street="123 N Main St", city="Rapid City", state="SD")
+
+
+        self.assertFalse(created)
+        self.assertEqual(list(addresses), [a])
+
+
     def test_create_dupe_trailing_period(self):
         create_address(
             input_street="123 N Main St", city="Rapid City", state="SD")
@@ -341,6 +655,72 @@ class AddressTest(TestCase):
         self.assertFalse(created)
 
 
+    def test_match_key(self):
+        a = create_address(
+            input_street="123  N Main Street.", city=" Rapid City",
+            state="sd")
+
+        self.assertEqual(a.match_key, "123 n main st|rapid city|sd")
+
+
+    def test_street_key(self):
+        a = create_address(
+            input_street="123 North Main", city="Rapid City", state="SD",
+            edited_street="123 N Main St")
+
+        self.assertEqual(a.match_key, "123 north main|rapid city|sd")
+        self.assertEqual(a.street_key, "123 n main st|rapid city|sd")
+
+
+    def test_matching(self):
+        a = create_address(
+            input_street="123 N Main St", city="Rapid City", state="SD")
+        create_address(
+            input_street="123 N Main St", city="Rapid City", state="SD"
+            ).delete(user=create_user())
+
+        self.assertEqual(
+            list(self.model.objects.matching(
+                    "123 n main street", "rapid city", "SD")),
+            [a])
+
+
+    def test_matching_street(self):
+        a = create_address(
+            input_street="123 North Main", city="Rapid City", state="SD",
+            edited_street="123 N Main St")
+
+        self.assertEqual(
+            list(self.model.objects.matching(
+                    "123 n main street", "rapid city", "SD")),
+            [a])
+
+
+    def test_refresh_match_keys(self):
+        a = create_address(
+            input_street="123 N Main St", city="Rapid City", state="SD")
+        create_address()
+        self.model._base_manager.filter(id=a.id).update(
+            match_key="", street_key="")
+
+        self.assertEqual(self.model.objects.refresh_match_keys(), 1)
+        a = self.model.objects.get(id=a.id)
+        self.assertEqual(a.match_key, "123 n main st|rapid city|sd")
+        self.assertEqual(a.street_key, "123 n main st|rapid city|sd")
+
+
+    def test_bulk_update_match_key(self):
+        a = create_address(
+            input_street="123 N Main St", city="Rapid City", state="SD")
+
+        self.model.objects.filter(city="Rapid City").update(
+            city="Sturgis", user=create_user())
+
+        self.assertEqual(
+            self.model.objects.get(id=a.id).match_key,
+            "123 n main st|sturgis|sd")
+
+
     def test_create_uppercases_state(self):
         (created, addresses) = self.create_from_input(
             street="321 S Little St", city="Rapid City", state="sd")
@@ -423,6 +803,35 @@ class AddressTest(TestCase):
         self.assertEqual(s["city"], "Providence")
 
 
+    def test_snapshot_saved_first_assignment(self):
+        a = create_address(city="Providence")
+        a.city = "Albuquerque"
+        a.city = "Amarillo"
+
+        s = a.snapshot_data(saved=True)
+
+        self.assertEqual(s["city"], "Providence")
+
+
+    def test_snapshot_saved_foreign_key(self):
+        u = create_user()
+        a = create_address(mapped_by=u)
+        a.mapped_by = create_user(username="other")
+
+        s = a.snapshot_data(saved=True)
+
+        self.assertEqual(s["mapped_by_id"], u.id)
+
+
+    def test_snapshot_saved_loaded(self):
+        create_address(city="Providence")
+        a = self.model.objects.get()
+
+        # loading an address records no original values
+        self.assertEqual(a._original, None)
+        self.assertEqual(a.snapshot_data(saved=True), a.data(internal=True))
+
+
     def test_snapshot_current(self):
         a = create_address(city="Providence")
         a.city = "Albuquerque"
@@ -540,6 +949,167 @@ class AddressTest(TestCase):
         self.assertEqual(change.changed_timestamp, fake_now)
 
 
+    def test_snapshots_shared(self):
+        a = create_address(city="Albuquerque")
+        a.city = "Providence"
+        a.save(user=create_user())
+
+        created = self.change_model.objects.get(pre__isnull=True)
+        changed = self.change_model.objects.get(pre__isnull=False)
+
+        self.assertEqual(changed.pre_id, created.post_id)
+        self.assertEqual(self.snapshot_model.objects.count(), 2)
+
+
+    def test_record_queries(self):
+        """
+        Recording a change looks up just the id of the previous change's post
+        snapshot, then writes the new post snapshot and the change.
+
+        """
+        a = create_address(city="Albuquerque")
+        user = create_user()
+        pre = a.data(internal=True)
+        post = dict(pre, city="Providence")
+
+        with self.assertNumQueries(3):
+            change = self.change_model.objects.record(
+                a.id, pre, post, user.id, datetime.datetime.now())
+
+        self.assertEqual(change.pre.city, "Albuquerque")
+        self.assertEqual(change.post.city, "Providence")
+
+
+    def test_unchanged_one_snapshot(self):
+        a = create_address(city="Albuquerque")
+        a.save(user=create_user())
+
+        changed = self.change_model.objects.get(pre__isnull=False)
+
+        self.assertEqual(changed.pre_id, changed.post_id)
+        self.assertEqual(changed.diff, {})
+
+
+    def test_changed_fields(self):
+        u = create_user()
+        a = create_address(city="Albuquerque")
+        a.city = "Providence"
+        a.mapped_by = u
+        a.save(user=u)
+
+        created = self.change_model.objects.get(pre__isnull=True)
+        changed = self.change_model.objects.get(pre__isnull=False)
+
+        self.assertEqual(created.changed_fields, None)
+        self.assertEqual(
+            sorted(changed.changed_fields.split()), ["city", "mapped_by"])
+
+
+    def test_diff_without_changed_fields(self):
+        a = create_address(city="Albuquerque")
+        a.city = "Providence"
+        a.save(user=create_user())
+        self.change_model.objects.update(changed_fields=None)
+
+        c = a.address_changes.get(pre__isnull=False)
+
+        self.assertEqual(
+            c.diff, {"city": {"pre": "Albuquerque", "post": "Providence"}})
+
+
+    def test_bulk_update_snapshots_shared(self):
+        a = create_address(city="Albuquerque")
+        created = self.change_model.objects.get()
+
+        self.model.objects.all().update(needs_review=True, user=create_user())
+
+        changed = self.change_model.objects.get(pre__isnull=False)
+
+        self.assertEqual(changed.pre_id, created.post_id)
+        self.assertEqual(changed.changed_fields, "needs_review")
+        self.assertEqual(changed.post.needs_review, True)
+        self.assertEqual(changed.address, a)
+
+
+    def test_bulk_recorders_overlapping(self):
+        from mlt.map.models import BulkChangeRecorder
+        a = create_address(city="Albuquerque")
+        b = create_address(city="Providence")
+        user = create_user()
+        now = datetime.datetime(2011, 11, 4, 17, 0, 5)
+
+        recorder_a = BulkChangeRecorder(self.model.objects.filter(id=a.id), now)
+        recorder_b = BulkChangeRecorder(self.model.objects.filter(id=b.id), now)
+        self.model._base_manager.update(needs_review=True)
+        recorder_a.record(user)
+        recorder_b.record(user)
+
+        self.assertEqual(
+            sorted(
+                self.change_model.objects.filter(
+                    pre__isnull=False).values_list("address", flat=True)),
+            [a.id, b.id])
+
+
+    def test_bulk_update_unchanged(self):
+        create_address(needs_review=True)
+
+        self.model.objects.all().update(needs_review=True, user=create_user())
+
+        changed = self.change_model.objects.get(pre__isnull=False)
+
+        self.assertEqual(changed.pre_id, changed.post_id)
+        self.assertEqual(changed.diff, {})
+
+
+    def test_bulk_update_case_change(self):
+        create_address(city="providence")
+
+        self.model.objects.all().update(city="Providence", user=create_user())
+
+        changed = self.change_model.objects.get(pre__isnull=False)
+
+        self.assertEqual(
+            changed.diff,
+            {"city": {"pre": "providence", "post": "Providence"}})
+
+
+    def test_bulk_update_changed_since_recorded(self):
+        a = create_address(city="Albuquerque")
+        # changed without recording a change
+        self.model._base_manager.filter(id=a.id).update(city="Amarillo")
+
+        self.model.objects.all().update(needs_review=True, user=create_user())
+
+        changed = self.change_model.objects.get(pre__isnull=False)
+
+        self.assertEqual(changed.pre.city, "Amarillo")
+        self.assertEqual(changed.post.city, "Amarillo")
+
+
+    def test_bulk_update_selection_changed(self):
+        create_address(pl="1")
+
+        self.model.objects.filter(pl="1").update(pl="2", user=create_user())
+
+        changed = self.change_model.objects.get(pre__isnull=False)
+
+        self.assertEqual(changed.pre.pl, "1")
+        self.assertEqual(changed.post.pl, "2")
+
+
+    def test_bulk_delete_snapshots_shared(self):
+        create_address()
+        created = self.change_model.objects.get()
+
+        self.model.objects.all().delete(user=create_user())
+
+        deleted = self.change_model.objects.get(post__isnull=True)
+
+        self.assertEqual(deleted.pre_id, created.post_id)
+        self.assertEqual(deleted.changed_fields, None)
+
+
     def test_save_without_user(self):
         from mlt.map.models import AddressVersioningError
         with self.assertRaises(AddressVersioningError):
@@ -784,6 +1354,126 @@ class AddressTest(TestCase):
         self.assertEqual(flags, {"conflict": ["deleted"]})
 
 
+    def test_bulk_revert(self):
+        a1 = create_address(needs_review=True, pl="1")
+        a2 = create_address(needs_review=True, pl="2")
+        u = create_user()
+        self.model.objects.all().update(needs_review=False, user=u)
+        self.model.objects.filter(id=a1.id).update(geocode_failed=True, user=u)
+
+        report = self.change_model.objects.filter(
+            changed_by=u, pre__needs_review=True).revert(create_user())
+
+        self.assertEqual(report, {"reverted": 2, "no-op": [], "conflict": {}})
+        self.assertEqual(refresh(a1).needs_review, True)
+        self.assertEqual(refresh(a1).geocode_failed, False)
+        self.assertEqual(refresh(a2).needs_review, True)
+
+
+    def test_bulk_revert_records_changes(self):
+        a = create_address(needs_review=True)
+        u = create_user()
+        self.model.objects.all().update(needs_review=False, user=u)
+
+        u2 = create_user()
+        self.change_model.objects.filter(changed_by=u).revert(u2)
+
+        change = a.address_changes.get(changed_by=u2)
+        self.assertEqual(change.pre.needs_review, False)
+        self.assertEqual(change.post.needs_review, True)
+        self.assertEqual(change.changed_fields, "needs_review")
+
+
+    def test_bulk_revert_create(self):
+        a = create_address()
+
+        report = self.change_model.objects.all().revert(create_user())
+
+        self.assertEqual(report["reverted"], 1)
+        self.assertEqual(refresh(a).deleted, True)
+
+
+    def test_bulk_revert_delete(self):
+        a = create_address(city="Providence")
+        u = create_user()
+        a.delete(user=u)
+
+        u2 = create_user()
+        report = self.change_model.objects.filter(changed_by=u).revert(u2)
+
+        self.assertEqual(report["reverted"], 1)
+        self.assertEqual(refresh(a).deleted, False)
+        change = a.address_changes.get(changed_by=u2)
+        self.assertIs(change.pre, None)
+        self.assertEqual(change.post.city, "Providence")
+
+
+    def test_bulk_revert_twice(self):
+        a = create_address(city="Providence")
+        u = create_user()
+        a.city = "Albuquerque"
+        a.save(user=u)
+        changes = self.change_model.objects.filter(changed_by=u)
+        c = changes.get()
+
+        changes.revert(create_user())
+        report = changes.revert(create_user())
+
+        self.assertEqual(
+            report, {"reverted": 0, "no-op": [c.id], "conflict": {}})
+
+
+    def test_bulk_revert_conflict(self):
+        a = create_address(city="Providence")
+        u = create_user()
+        a.city = "Albuquerque"
+        a.save(user=u)
+        a.city = "New Bedford"
+        a.save(user=create_user())
+        c = a.address_changes.get(changed_by=u)
+
+        report = self.change_model.objects.filter(
+            changed_by=u).revert(create_user())
+
+        self.assertEqual(refresh(a).city, "Providence")
+        self.assertEqual(report["conflict"], {c.id: ["city"]})
+
+
+    def test_bulk_revert_deletion_conflict(self):
+        a = create_address(city="Providence")
+        u = create_user()
+        a.city = "Albuquerque"
+        a.save(user=u)
+        a.delete(user=create_user())
+        c = a.address_changes.get(changed_by=u)
+
+        report = self.change_model.objects.filter(
+            changed_by=u).revert(create_user())
+
+        a = refresh(a)
+        self.assertEqual(a.city, "Providence")
+        self.assertEqual(a.deleted, False)
+        self.assertEqual(report["conflict"], {c.id: ["deleted"]})
+
+
+    def test_bulk_revert_several_changes_per_address(self):
+        a = create_address(city="Providence", state="RI")
+        u = create_user()
+        a.city = "Albuquerque"
+        a.save(user=u)
+        a.city = "New Bedford"
+        a.state = "MA"
+        a.save(user=u)
+
+        report = self.change_model.objects.filter(
+            changed_by=u).revert(create_user())
+
+        a = refresh(a)
+        self.assertEqual(a.city, "Providence")
+        self.assertEqual(a.state, "RI")
+        self.assertEqual(report, {"reverted": 2, "no-op": [], "conflict": {}})
+
+
     def test_prefetch_parcels(self):
         create_address(pl="1")
         create_address(pl="2")
@@ -800,6 +1490,18 @@ class AddressTest(TestCase):
             [a.pl for a in qs]
 
 
+    def test_prefetch_parcel_centroids(self):
+        create_address(pl="1")
+        create_parcel(pl="1")
+
+        with self.assertNumQueries(2): # one for addresses, one for parcels
+            qs = self.model.objects.all().prefetch_linked("parcel_centroids")
+            for address in qs:
+                self.assertEqual(address.parcel.pl, "1")
+                address.latitude
+                address.longitude
+
+
     def test_prefetch_parcels_none_to_fetch(self):
         create_address(pl="")
         create_address(pl="")
@@ -836,6 +1538,75 @@ class AddressTest(TestCase):
             [a for a in qs]
 
 
+    def test_rows(self):
+        from mlt.map.models import AddressRow
+        u = create_user(username="blametern")
+        a = create_address(city="Providence", mapped_by=u)
+
+        rows = list(self.model.objects.rows())
+
+        self.assertEqual([r.__class__ for r in rows], [AddressRow])
+        self.assertEqual(rows[0].id, a.id)
+        self.assertEqual(rows[0].city, "Providence")
+        self.assertEqual(rows[0].mapped_by.username, "blametern")
+        self.assertEqual(rows[0].edit_url, a.edit_url)
+
+
+    def test_rows_filtered_and_sliced(self):
+        create_address(city="Providence")
+        create_address(city="Albuquerque")
+        create_address(city="Amarillo")
+
+        # cloning preserves the rows marker
+        qs = self.model.objects.rows().filter(
+            city__startswith="A").order_by("city")._clone()
+
+        self.assertEqual([r.city for r in qs[1:]], ["Amarillo"])
+
+
+    def test_rows_prefetch(self):
+        a = create_address(pl="1")
+        create_parcel(pl="1")
+        b = create_address_batch(tag="one")
+        a.batches.add(b)
+
+        # one for addresses, one for parcels, one for batches
+        with self.assertNumQueries(3):
+            for row in self.model.objects.prefetch().rows():
+                self.assertEqual(row.parcel.pl, "1")
+                self.assertEqual(row.batch_tags, [b])
+                row.latitude
+
+
+    def test_rows_batches_not_prefetched(self):
+        a = create_address()
+        create_address()
+        b = create_address_batch(tag="one")
+        a.batches.add(b)
+
+        # one for addresses, one for the batches of all of them
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                [row.batch_tags
+                 for row in self.model.objects.order_by("id").rows()],
+                [[b], []])
+
+
+    def test_rows_serialized(self):
+        from mlt.map.serializers import AddressSerializer
+        create_parcel(pl="1")
+        create_address(
+            pl="1",
+            street_number="3635",
+            street_name="Van Gordon",
+            mapped_by=create_user(username="blametern"),
+            mapped_timestamp=datetime.datetime(2011, 7, 8, 1, 2, 3))
+
+        self.assertEqual(
+            list(AddressSerializer().many(self.model.objects.rows())),
+            list(AddressSerializer().many(self.model.objects.all())))
+
+
     def test_change_prefetch_parcels(self):
         create_address(pl="1")
         create_address(pl="2")
@@ -868,6 +1639,68 @@ class AddressTest(TestCase):
             list(self.change_model.objects.all().prefetch_linked("foo"))
 
 
+    def test_changes_as_of(self):
+        user = create_user()
+        with patch("mlt.map.models.datetime") as mock_dt:
+            mock_dt.now.return_value = datetime.datetime(2011, 1, 1)
+            a = create_address(city="Albuquerque")
+            mock_dt.now.return_value = datetime.datetime(2011, 2, 1)
+            a.city = "Providence"
+            a.save(user=user)
+            mock_dt.now.return_value = datetime.datetime(2011, 3, 1)
+            create_address(city="Pawtucket")
+
+        as_of = self.change_model.objects.as_of
+
+        self.assertEqual(
+            [c.post.city for c in as_of(datetime.datetime(2011, 1, 15))],
+            ["Albuquerque"])
+        self.assertEqual(
+            [c.post.city for c in as_of(datetime.datetime(2011, 2, 1))],
+            ["Providence"])
+        self.assertEqual(
+            sorted(c.post.city for c in as_of(datetime.datetime(2011, 3, 1))),
+            ["Pawtucket", "Providence"])
+
+
+    def test_changes_as_of_deleted(self):
+        with patch("mlt.map.models.datetime") as mock_dt:
+            mock_dt.now.return_value = datetime.datetime(2011, 1, 1)
+            a = create_address(city="Albuquerque")
+            mock_dt.now.return_value = datetime.datetime(2011, 2, 1)
+            a.delete(user=create_user())
+
+        as_of = self.change_model.objects.as_of
+
+        self.assertEqual(as_of(datetime.datetime(2011, 1, 15)).count(), 1)
+        self.assertEqual(as_of(datetime.datetime(2011, 2, 15)).count(), 0)
+
+
+    def test_changes_as_of_same_timestamp(self):
+        user = create_user()
+        with patch("mlt.map.models.datetime") as mock_dt:
+            mock_dt.now.return_value = datetime.datetime(2011, 1, 1)
+            a = create_address(city="Albuquerque")
+            a.city = "Providence"
+            a.save(user=user)
+
+        self.assertEqual(
+            [c.post.city for c in self.change_model.objects.as_of(
+                    datetime.datetime(2011, 1, 1))],
+            ["Providence"])
+
+
+    def test_changes_as_of_filtered(self):
+        a = create_address(city="Albuquerque")
+        create_address(city="Albuquerque")
+        a.batches.add(create_address_batch(tag="one"))
+
+        changes = self.change_model.objects.as_of(
+            datetime.datetime.now()).filter(address__batches__tag="one")
+
+        self.assertEqual([c.address_id for c in changes], [a.id])
+
+
 
 class PrefetchQuerySetTest(TestCase):
     @property
@@ -895,3 +1728,92 @@ class AddressBatchTest(TestCase):
         b = create_address_batch(tag="foo")
 
         self.assertEqual(unicode(b), u"foo")
+
+
+    def test_latest_batch_timestamp(self):
+        a = create_address()
+
+        a.batches.add(
+            create_address_batch(
+                tag="one", timestamp=datetime.datetime(2011, 9, 10)),
+            create_address_batch(
+                tag="two", timestamp=datetime.datetime(2011, 9, 12)))
+
+        self.assertEqual(
+            a.latest_batch_timestamp, datetime.datetime(2011, 9, 12))
+        self.assertEqual(
+            refresh(a).latest_batch_timestamp, datetime.datetime(2011, 9, 12))
+
+
+    def test_latest_batch_timestamp_reverse_add(self):
+        a = create_address()
+        b = create_address_batch(timestamp=datetime.datetime(2011, 9, 10))
+
+        b.addresses.add(a)
+
+        self.assertEqual(
+            refresh(a).latest_batch_timestamp, datetime.datetime(2011, 9, 10))
+
+
+    def test_latest_batch_timestamp_remove(self):
+        a = create_address()
+        b1 = create_address_batch(
+            tag="one", timestamp=datetime.datetime(2011, 9, 10))
+        b2 = create_address_batch(
+            tag="two", timestamp=datetime.datetime(2011, 9, 12))
+        a.batches.add(b1, b2)
+
+        b2.addresses.remove(a)
+
+        self.assertEqual(
+            refresh(a).latest_batch_timestamp, datetime.datetime(2011, 9, 10))
+
+
+    def test_latest_batch_timestamp_reverse_clear(self):
+        a = create_address()
+        b = create_address_batch()
+        a.batches.add(b)
+
+        b.addresses.clear()
+
+        self.assertEqual(refresh(a).latest_batch_timestamp, None)
+
+
+    def test_latest_batch_timestamp_batch_edited(self):
+        a = create_address()
+        b = create_address_batch(timestamp=datetime.datetime(2011, 9, 10))
+        a.batches.add(b)
+
+        b.timestamp = datetime.datetime(2011, 9, 11)
+        b.save()
+
+        self.assertEqual(
+            refresh(a).latest_batch_timestamp, datetime.datetime(2011, 9, 11))
+
+
+    def test_latest_batch_timestamp_batch_deleted(self):
+        a = create_address()
+        b1 = create_address_batch(
+            tag="one", timestamp=datetime.datetime(2011, 9, 10))
+        b2 = create_address_batch(
+            tag="two", timestamp=datetime.datetime(2011, 9, 12))
+        a.batches.add(b1, b2)
+
+        b2.delete()
+
+        self.assertEqual(
+            refresh(a).latest_batch_timestamp, datetime.datetime(2011, 9, 10))
+
+
+    def test_refresh_batch_timestamps(self):
+        from mlt.map.models import Address
+        a = create_address()
+        a.batches.add(
+            create_address_batch(timestamp=datetime.datetime(2011, 9, 10)))
+        Address._base_manager.update(latest_batch_timestamp=None)
+
+        updated, timestamps = Address.objects.refresh_batch_timestamps()
+
+        self.assertEqual(updated, 1)
+        self.assertEqual(
+            refresh(a).latest_batch_timestamp, datetime.datetime(2011, 9, 10))
@@ -0,0 +1,185 @@
+from datetime import datetime
+
+from django.test import TestCase
+
+from .utils import create_address, create_address_batch
+
+
+
+__all__ = ["KeysetTest", "CursorTest"]
+
+
+
+class KeysetTest(TestCase):
+    @property
+    def func(self):
+        from mlt.map.paging import keyset
+        return keyset
+
+
+    @property
+    def qs(self):
+        from mlt.map.models import Address
+        return Address.objects.all()
+
+
+    def page(self, sort, **GET):
+        GET.setdefault("num", "2")
+        return self.func(self.qs, GET, sort)
+
+
+    def test_first_page(self):
+        for name in ["c", "a", "b"]:
+            create_address(street_name=name)
+
+        objs, cursor = self.page(["street_name"])
+
+        self.assertEqual([a.street_name for a in objs], ["a", "b"])
+        self.assertNotEqual(cursor, None)
+
+
+    def test_next_page(self):
+        for name in ["c", "a", "b"]:
+            create_address(street_name=name)
+
+        objs, cursor = self.page(["street_name"])
+        objs, cursor = self.page(["street_name"], cursor=cursor)
+
+        self.assertEqual([a.street_name for a in objs], ["c"])
+        self.assertEqual(cursor, None)
+
+
+    def test_ties(self):
+        addresses = [create_address(street_name="a") for i in range(3)]
+
+        objs, cursor = self.page(["street_name"])
+        objs2, cursor = self.page(["street_name"], cursor=cursor)
+
+        self.assertEqual(
+            [a.id for a in objs + objs2], [a.id for a in addresses])
+
+
+    def test_descending(self):
+        for name in ["c", "a", "b"]:
+            create_address(street_name=name)
+
+        objs, cursor = self.page(["-street_name"], num="1")
+        objs, cursor = self.page(["-street_name"], cursor=cursor)
+
+        self.assertEqual([a.street_name for a in objs], ["b", "a"])
+
+
+    def test_nulls_last(self):
+        create_address(street_name="b", mapped_timestamp=datetime(2011, 2, 1))
+        create_address(street_name="c")
+        create_address(street_name="a", mapped_timestamp=datetime(2011, 1, 1))
+
+        objs, cursor = self.page(["mapped_timestamp"], num="1")
+        objs2, cursor = self.page(["mapped_timestamp"], cursor=cursor)
+
+        self.assertEqual(
+            [a.street_name for a in objs + objs2], ["a", "b", "c"])
+
+
+    def test_nulls_first_descending(self):
+        create_address(street_name="b", mapped_timestamp=datetime(2011, 2, 1))
+        create_address(street_name="c")
+        create_address(street_name="a", mapped_timestamp=datetime(2011, 1, 1))
+
+        objs, cursor = self.page(["-mapped_timestamp"], num="1")
+        objs2, cursor = self.page(["-mapped_timestamp"], cursor=cursor)
+
+        self.assertEqual(
+            [a.street_name for a in objs + objs2], ["c", "b", "a"])
+
+
+    def test_index(self):
+        for name in ["c", "a", "b"]:
+            create_address(street_name=name)
+
+        objs, cursor = self.func(
+            self.qs, {"num": "2"}, ["street_name"], index=True)
+        objs2, cursor = self.func(
+            self.qs,
+            {"num": "2", "start": "3", "cursor": cursor},
+            ["street_name"],
+            index=True)
+
+        self.assertEqual([a.index for a in objs + objs2], [1, 2, 3])
+
+
+    def test_start_without_cursor(self):
+        for name in ["c", "a", "b"]:
+            create_address(street_name=name)
+
+        objs, cursor = self.page(["street_name"], start="2")
+
+        self.assertEqual([a.street_name for a in objs], ["b", "c"])
+        self.assertEqual(cursor, None)
+
+
+    def test_aggregate_sort(self):
+        from django.db.models import Max
+
+        create_address(street_name="a")
+        create_address(street_name="b").batches.add(
+            create_address_batch(timestamp=datetime(2011, 1, 1)))
+
+        qs = self.qs.annotate(latest=Max("batches__timestamp"))
+        objs, cursor = self.func(qs, {"num": "1"}, ["-latest"])
+
+        self.assertEqual([a.street_name for a in objs], ["a"])
+        self.assertEqual(cursor, None)
+
+
+    def test_bad_cursor(self):
+        from mlt.map.paging import BadCursor
+
+        with self.assertRaises(BadCursor):
+            self.page(["street_name"], cursor="foo")
+
+
+    def test_non_ascii_cursor(self):
+        from mlt.map.paging import BadCursor
+
+        with self.assertRaises(BadCursor):
+            self.page(["street_name"], cursor=u"f\xf6\xf6")
+
+
+    def test_cursor_for_other_sort(self):
+        from mlt.map.paging import BadCursor
+        create_address(street_name="a")
+
+        objs, cursor = self.page(["street_name"], num="1")
+
+        with self.assertRaises(BadCursor):
+            self.page(["city"], cursor=cursor)
+
+
+
+class CursorTest(TestCase):
+    def round_trip(self, values):
+        from mlt.map.paging import encode_cursor, decode_cursor
+        sort = ["f%s" % i for i in range(len(values))]
+        return decode_cursor(encode_cursor(sort, values), sort)
+
+
+    def test_datetime(self):
+        values = [
+            datetime(2011, 1, 2, 3, 4, 5),
+            datetime(2011, 1, 2, 3, 4, 5, 6),
+            ]
+
+        self.assertEqual(self.round_trip(values), values)
+
+
+    def test_date(self):
+        values = [datetime(2011, 1, 2).date()]
+
+        self.assertEqual(self.round_trip(values), values)
+
+
+    def test_plain(self):
+        values = [None, 1, u"foo"]
+
+        self.assertEqual(self.round_trip(values), values)
@@ -2,7 +2,7 @@ import datetime
 
 from django.test import TestCase
 
-from mock import Mock
+from mock import Mock, patch
 
 from .utils import create_address, create_parcel, create_user
 
@@ -102,6 +102,32 @@ class SerializerTest(TestCase):
             {"real_field": "real", "virtual_field": "virtual real"})
 
 
+    def test_plan(self):
+        s = self.serializer(extra=["field3"])
+
+        self.assertEqual(
+            [name for name, get, encode in s.plan],
+            ["field1", "field2", "field3"])
+
+
+    def test_plan_compiled_once(self):
+        from mlt.map.serializers import Serializer
+
+        class EncodingSerializer(Serializer):
+            default_fields = ["field1"]
+
+            def encode_field1(self, val):
+                return val.upper()
+
+        s = EncodingSerializer()
+        # encoders are looked up when the serializer is created, not per object
+        s.encode_field1 = lambda val: "changed"
+
+        self.assertEqual(
+            list(s.many([self.mock(), self.mock(field1="other")])),
+            [{"field1": "VAL1"}, {"field1": "OTHER"}])
+
+
 
 
 class AddressSerializerTest(TestCase):
@@ -137,6 +163,20 @@ class AddressSerializerTest(TestCase):
             self.serializer(["parcel"]).one(a)["parcel"]["pl"], "1234")
 
 
+    def test_parcel_serializer_shared(self):
+        from mlt.map.serializers import ParcelSerializer
+        create_parcel(pl="1234")
+        addresses = [create_address(pl="1234"), create_address(pl="1234")]
+        s = self.serializer(["parcel"])
+
+        with patch(
+                "mlt.map.serializers.ParcelSerializer",
+                side_effect=ParcelSerializer) as mock_serializer:
+            list(s.many(addresses))
+
+        self.assertEqual(mock_serializer.call_count, 0)
+
+
     def test_parcel_none(self):
         a = create_address(pl="")
 
@@ -1,9 +1,50 @@
 from django.test import TestCase
 from mock import patch
 
+from .backports import override_settings
+from .utils import create_address, create_user
 
 
-__all__ = ["LoadParcelsTaskTest"]
+
+__all__ = ["BulkActionTaskTest", "LoadParcelsTaskTest"]
+
+
+
+class BulkActionTaskTest(TestCase):
+    @property
+    def task(self):
+        from mlt.map.tasks import bulk_action_task
+        return bulk_action_task
+
+
+    @override_settings(MLT_BULK_ACTION_CHUNK_SIZE=1)
+    def test_update(self):
+        from mlt.map.models import AddressChange
+        a1 = create_address(multi_units=False)
+        a2 = create_address(multi_units=False)
+        user = create_user()
+
+        result = self.task.delay(
+            [a1.id, a2.id], user.id, {"multi_units": True}, "Done.")
+
+        self.assertEqual(result.status, "SUCCESS")
+        self.assertEqual(result.info, "Done.")
+        self.assertEqual(
+            a1.__class__.objects.filter(multi_units=True).count(), 2)
+        self.assertEqual(
+            AddressChange.objects.filter(changed_by=user).count(), 2)
+
+
+    @override_settings(MLT_BULK_ACTION_CHUNK_SIZE=1)
+    def test_delete(self):
+        a1 = create_address()
+        a2 = create_address()
+        a3 = create_address()
+
+        self.task.delay([a1.id, a2.id], create_user().id, None, "Done.")
+
+        self.assertEqual(
+            list(a1.__class__.objects.values_list("id", flat=True)), [a3.id])
 
 
 
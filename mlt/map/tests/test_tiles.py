@@ -0,0 +1,136 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from .utils import create_parcel, create_mpolygon
+
+
+
+__all__ = ["TileMathTest", "TileCacheTest"]
+
+
+
+class TileMathTest(TestCase):
+    def test_bounds_world(self):
+        from mlt.map.tiles import tile_bounds
+        west, south, east, north = tile_bounds(0, 0, 0)
+
+        self.assertEqual((west, east), (-180.0, 180.0))
+        self.assertAlmostEqual(north, 85.0511287798, places=6)
+        self.assertAlmostEqual(south, -85.0511287798, places=6)
+
+
+    def test_bounds_quadrant(self):
+        from mlt.map.tiles import tile_bounds
+        west, south, east, north = tile_bounds(1, 1, 1)
+
+        self.assertEqual((west, east), (0.0, 180.0))
+        self.assertAlmostEqual(north, 0.0)
+
+
+    def test_tile_for_point(self):
+        from mlt.map.tiles import tile_for_point
+
+        self.assertEqual(tile_for_point(1, -90.0, 45.0), (0, 0))
+        self.assertEqual(tile_for_point(1, 90.0, -45.0), (1, 1))
+
+
+    def test_tile_for_point_clamped(self):
+        from mlt.map.tiles import tile_for_point
+
+        self.assertEqual(tile_for_point(1, 180.0, -89.0), (1, 1))
+
+
+    def test_round_trip(self):
+        from mlt.map.tiles import tile_bounds, tile_for_point
+        west, south, east, north = tile_bounds(17, 39537, 48713)
+
+        self.assertEqual(
+            tile_for_point(17, (west + east) / 2, (north + south) / 2),
+            (39537, 48713))
+
+
+    def test_tiles_for_extent(self):
+        from mlt.map.tiles import tiles_for_extent
+
+        self.assertEqual(
+            sorted(tiles_for_extent(1, (-90.0, -45.0, 90.0, 45.0))),
+            [(0, 0), (0, 1), (1, 0), (1, 1)])
+
+
+
+class TileCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+
+    @property
+    def tiles(self):
+        from mlt.map import tiles
+        return tiles
+
+
+    def test_get_set(self):
+        self.assertEqual(self.tiles.get_cached(17, 1, 2), None)
+
+        self.tiles.set_cached(17, 1, 2, "content")
+
+        self.assertEqual(self.tiles.get_cached(17, 1, 2), "content")
+
+
+    def test_invalidate_pls(self):
+        create_parcel(
+            pl="1",
+            geom=create_mpolygon(
+                [(1.0, 5.0), (1.0, 6.0), (2.0, 6.0), (2.0, 5.0), (1.0, 5.0)]))
+        x, y = self.tiles.tile_for_point(17, 1.5, 5.5)
+        far_x, far_y = self.tiles.tile_for_point(17, 50.0, 50.0)
+        self.tiles.set_cached(17, x, y, "near")
+        self.tiles.set_cached(17, far_x, far_y, "far")
+        self.tiles.set_cached(17, x, y, "near", "topojson")
+
+        self.tiles.invalidate_pls(["1"])
+
+        self.assertEqual(self.tiles.get_cached(17, x, y), None)
+        self.assertEqual(self.tiles.get_cached(17, x, y, "topojson"), None)
+        self.assertEqual(self.tiles.get_cached(17, far_x, far_y), "far")
+
+
+    def test_invalidate_pls_after_commit(self):
+        """
+        Tiles re-cached before the invalidating transaction commits are
+        dropped again once it does.
+
+        """
+        from mlt.core import aftercommit
+        create_parcel(
+            pl="1",
+            geom=create_mpolygon(
+                [(1.0, 5.0), (1.0, 6.0), (2.0, 6.0), (2.0, 5.0), (1.0, 5.0)]))
+        x, y = self.tiles.tile_for_point(17, 1.5, 5.5)
+
+        self.tiles.invalidate_pls(["1"])
+        self.tiles.set_cached(17, x, y, "stale")
+        aftercommit.run_pending()
+
+        self.assertEqual(self.tiles.get_cached(17, x, y), None)
+
+
+    def test_per_format(self):
+        self.tiles.set_cached(17, 1, 2, "topojson", "topojson")
+
+        self.assertEqual(self.tiles.get_cached(17, 1, 2), None)
+        self.assertEqual(
+            self.tiles.get_cached(17, 1, 2, "topojson"), "topojson")
+
+
+    def test_invalidate_no_pls(self):
+        with self.assertNumQueries(0):
+            self.tiles.invalidate_pls(["", ""])
+
+
+    def test_invalidate_all(self):
+        self.tiles.set_cached(17, 1, 2, "content")
+
+        self.tiles.invalidate_all()
+
+        self.assertEqual(self.tiles.get_cached(17, 1, 2), None)
@@ -0,0 +1,152 @@
+from django.test import TestCase
+
+
+
+__all__ = ["TopologyTest"]
+
+
+
+def square(x0, y0, x1, y1):
+    return {
+        "type": "MultiPolygon",
+        "coordinates": [[[[x0, y0], [x0, y1], [x1, y1], [x1, y0], [x0, y0]]]],
+        }
+
+
+
+def decode(topology):
+    """
+    Decode a topology back to a list of (id, coordinates) tuples.
+
+    """
+    (kx, ky), (tx, ty) = (
+        topology["transform"]["scale"], topology["transform"]["translate"])
+    arcs = []
+    for arc in topology["arcs"]:
+        x, y, coords = 0, 0, []
+        for dx, dy in arc:
+            x, y = x + dx, y + dy
+            coords.append([x * kx + tx, y * ky + ty])
+        arcs.append(coords)
+
+    decoded = []
+    for geometry in topology["objects"]["parcels"]["geometries"]:
+        polygons = []
+        for polygon in geometry["arcs"]:
+            rings = []
+            for indexes in polygon:
+                ring = []
+                for i, index in enumerate(indexes):
+                    arc = arcs[index] if index >= 0 else arcs[~index][::-1]
+                    ring.extend(arc[1:] if i else arc)
+                rings.append(ring)
+            polygons.append(rings)
+        decoded.append((geometry["id"], polygons))
+    return decoded
+
+
+
+class TopologyTest(TestCase):
+    def encode(self, features, quantization=3):
+        from mlt.map.topology import encode
+        return encode(features, quantization)
+
+
+    def test_round_trip(self):
+        topology = self.encode(
+            [(1, square(0.0, 0.0, 1.0, 1.0), {"pl": "1"})])
+
+        self.assertEqual(
+            decode(topology),
+            [(1, [[[[0.0, 0.0], [0.0, 1.0], [1.0, 1.0], [1.0, 0.0],
+                    [0.0, 0.0]]]])])
+        self.assertEqual(
+            topology["objects"]["parcels"]["geometries"][0]["properties"],
+            {"pl": "1"})
+
+
+    def test_polygon(self):
+        geometry = square(0.0, 0.0, 1.0, 1.0)
+        geometry = {
+            "type": "Polygon", "coordinates": geometry["coordinates"][0]}
+
+        topology = self.encode([(1, geometry, {})])
+
+        self.assertEqual(
+            topology["objects"]["parcels"]["geometries"][0]["type"],
+            "MultiPolygon")
+        self.assertEqual(len(decode(topology)[0][1][0][0]), 5)
+
+
+    def test_quantized(self):
+        topology = self.encode(
+            [(1, square(10.0, 20.0, 12.0, 21.0), {})])
+
+        self.assertEqual(
+            topology["transform"],
+            {"scale": [1.0, 0.5], "translate": [10.0, 20.0]})
+        for arc in topology["arcs"]:
+            for position in arc:
+                self.assertEqual([int(p) for p in position], position)
+
+
+    def test_delta_encoded(self):
+        topology = self.encode(
+            [(1, square(0.0, 0.0, 2.0, 2.0), {})])
+
+        self.assertEqual(
+            topology["arcs"], [[[0, 0], [0, 2], [2, 0], [0, -2], [-2, 0]]])
+
+
+    def test_shared_edge(self):
+        topology = self.encode(
+            [
+                (1, square(0.0, 0.0, 1.0, 1.0), {}),
+                (2, square(1.0, 0.0, 2.0, 1.0), {}),
+                ])
+
+        # shared edge stored once, traversed in reverse by the second parcel
+        self.assertEqual(len(topology["arcs"]), 3)
+        self.assertEqual(
+            [g["arcs"] for g in topology["objects"]["parcels"]["geometries"]],
+            [[[[0, 1]]], [[[~0, 2]]]])
+        self.assertEqual(
+            [
+                sorted(tuple(point) for point in ring[:-1])
+                for fid, [[ring]] in decode(topology)
+                ],
+            [
+                [(0.0, 0.0), (0.0, 1.0), (1.0, 0.0), (1.0, 1.0)],
+                [(1.0, 0.0), (1.0, 1.0), (2.0, 0.0), (2.0, 1.0)],
+                ])
+
+
+    def test_identical_rings(self):
+        topology = self.encode(
+            [
+                (1, square(0.0, 0.0, 1.0, 1.0), {}),
+                (2, square(0.0, 0.0, 1.0, 1.0), {}),
+                ])
+
+        self.assertEqual(len(topology["arcs"]), 1)
+        self.assertEqual(
+            [g["arcs"] for g in topology["objects"]["parcels"]["geometries"]],
+            [[[[0]]], [[[0]]]])
+
+
+    def test_collapsed_ring(self):
+        topology = self.encode(
+            [
+                (1, square(0.0, 0.0, 10.0, 10.0), {}),
+                (2, square(0.0, 0.0, 0.1, 0.1), {}),
+                ])
+
+        self.assertEqual(
+            topology["objects"]["parcels"]["geometries"][1]["arcs"], [])
+
+
+    def test_empty(self):
+        topology = self.encode([])
+
+        self.assertEqual(topology["arcs"], [])
+        self.assertEqual(topology["objects"]["parcels"]["geometries"], [])
@@ -1,5 +1,7 @@
 import datetime
+import gzip
 import json
+from StringIO import StringIO
 import urllib
 
 from django.core.urlresolvers import reverse
@@ -9,6 +11,7 @@ from django_webtest import WebTest
 
 from mock import patch
 
+from .backports import override_settings
 from .utils import (
     create_address, create_parcel, create_mpolygon, create_user,
     create_address_batch, refresh, zip_shapefile)
@@ -18,10 +21,13 @@ from .utils import (
 __all__ = [
     "ImportViewTest",
     "ExportViewTest",
+    "ExportHistoryViewTest",
     "AssociateViewTest",
     "AddressesViewTest",
     "HistoryViewTest",
     "GeoJSONViewTest",
+    "ParcelTileViewTest",
+    "ParcelLookupViewTest",
     "AddAddressViewTest",
     "EditAddressViewTest",
     "FilterAutocompleteViewTest",
@@ -29,9 +35,11 @@ __all__ = [
     "GeocodeViewTest",
     "AddressActionsViewTest",
     "RevertChangeViewTest",
+    "RevertChangesViewTest",
     "AddTagViewTest",
     "LoadParcelsViewTest",
     "LoadParcelsStatusViewTest",
+    "BulkActionStatusViewTest",
     ]
 
 
@@ -123,6 +131,7 @@ class ImportViewTest(AuthenticatedWebTest):
 class MockWriter(object):
     mimetype = "text/mock"
     extension = "mck"
+    parcel_geometry = False
 
     def __init__(self, addresses):
         self.addresses = addresses
@@ -198,6 +207,43 @@ class ExportViewTest(AuthenticatedWebTest):
 
 
 
+@patch("mlt.map.views.EXPORT_FORMATS", ["mock"])
+@patch("mlt.map.views.EXPORT_WRITERS", {"mock": MockWriter})
+class ExportHistoryViewTest(AuthenticatedWebTest):
+    url_name = "map_export_history"
+
+
+    def test_export(self):
+        a1 = create_address(city="Providence")
+        a2 = create_address(city="Providence")
+        a1.address_changes.update(
+            changed_timestamp=datetime.datetime(2011, 1, 1))
+        a1.city = "Pawtucket"
+        a1.save(user=self.user)
+
+        res = self.app.get(
+            self.url + "?export_format=mock&as_of=2011-01-01",
+            user=self.user)
+
+        self.assertEqual(res.headers["Content-Type"], "text/mock")
+        self.assertEqual(res.body, str(a1.id))
+
+        res = self.app.get(
+            self.url + "?export_format=mock&as_of=today&post__city=Providence",
+            user=self.user)
+
+        self.assertEqual(res.body, str(a2.id))
+
+
+    def test_no_as_of(self):
+        create_address()
+
+        res = self.get()
+
+        self.assertEqual(res.status_int, 302)
+
+
+
 class CSRFAuthenticatedWebTest(AuthenticatedWebTest):
     url_name = "map_associate"
 
@@ -459,6 +505,36 @@ class AssociateViewTest(CSRFAuthenticatedWebTest):
             )
 
 
+    @override_settings(
+        MLT_BULK_ACTION_JOB_THRESHOLD=1, CELERY_ALWAYS_EAGER=False)
+    @patch("mlt.map.views.tasks.bulk_action_task.delay")
+    def test_associate_job(self, delay):
+        delay.return_value = MockResult(task_id="mock-task-id")
+        create_parcel(pl="1234")
+        a1 = create_address()
+        a2 = create_address()
+
+        res = self.post(self.url, {"maptopl": "1234", "aid": [a1.id, a2.id]})
+
+        ids, user_id, updates, message = delay.call_args[0]
+        self.assertEqual(sorted(ids), sorted([a1.id, a2.id]))
+        self.assertEqual(user_id, self.user.id)
+        self.assertEqual(updates["pl"], "1234")
+        self.assertEqual(message, "Mapped 2 addresses to PL 1234")
+        self.assertEqual(
+            res.json["job_url"],
+            reverse(
+                "map_bulk_action_status", kwargs={"task_id": "mock-task-id"}))
+        self.assertEqual(
+            res.json["messages"],
+            [{
+                    "level": 20,
+                    "message": "Updating 2 addresses in the background.",
+                    "tags": "info",
+                    }]
+            )
+
+
 
 class AddressesViewTest(AuthenticatedWebTest):
     url_name = "map_addresses"
@@ -558,6 +634,41 @@ class AddressesViewTest(AuthenticatedWebTest):
             [letter_key(i) for i in range(21, 31)])
 
 
+    def test_cursor(self):
+        for name in ["c", "a", "b"]:
+            create_address(street_name=name)
+
+        res1 = self.app.get(
+            self.url + "?sort=street_name&num=2", user=self.user)
+        res2 = self.app.get(
+            self.url + "?sort=street_name&num=2&start=3&cursor=%s"
+            % urllib.quote(res1.json["next_cursor"]),
+            user=self.user)
+
+        self.assertEqual(
+            [a["street_name"] for a in res1.json["addresses"]], ["a", "b"])
+        self.assertEqual(
+            [(a["index"], a["street_name"])
+             for a in res2.json["addresses"]],
+            [("C", "c")])
+        self.assertEqual(res2.json["next_cursor"], None)
+
+
+    def test_bad_cursor(self):
+        create_address(street_name="a")
+
+        res = self.app.get(
+            self.url + "?cursor=foo",
+            extra_environ={"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"},
+            user=self.user)
+
+        self.assertEqual(
+            [a["street_name"] for a in res.json["addresses"]], ["a"])
+        self.assertEqual(
+            [m["message"] for m in res.json["messages"]],
+            ["Invalid paging cursor: Invalid cursor."])
+
+
     def test_sort(self):
         a1 = create_address(
             input_street="123 N Main St",
@@ -618,6 +729,25 @@ class AddressesViewTest(AuthenticatedWebTest):
             )
 
 
+    def test_default_sort_cursor(self):
+        a1 = create_address()
+        a2 = create_address()
+        a1.batches.add(
+            create_address_batch(timestamp=datetime.datetime(2011, 9, 10)))
+
+        res1 = self.app.get(self.url + "?num=1", user=self.user)
+        res2 = self.app.get(
+            self.url + "?num=1&cursor=%s"
+            % urllib.quote(res1.json["next_cursor"]),
+            user=self.user)
+
+        # addresses in no batch sort first
+        self.assertEqual(
+            [a["id"] for a in res1.json["addresses"]
+             + res2.json["addresses"]],
+            [a2.id, a1.id])
+
+
     def test_filter_batch_no_dupes(self):
         a1 = create_address()
 
@@ -972,9 +1102,19 @@ class AddressesViewTest(AuthenticatedWebTest):
         res = self.app.get(self.url + "?city=Albuquerque&num=1&count=true", user=self.user)
 
         self.assertEqual(res.json["count"], 2)
+        self.assertEqual(res.json["count_exact"], True)
         self.assertEqual(len(res.json["addresses"]), 1)
 
 
+    @override_settings(MLT_COUNT_ESTIMATE_THRESHOLD=0)
+    def test_count_estimated(self):
+        create_address()
+
+        res = self.app.get(self.url + "?count=true", user=self.user)
+
+        self.assertEqual(res.json["count_exact"], False)
+
+
 
 class HistoryViewTest(AuthenticatedWebTest):
     url_name = "map_history"
@@ -1048,6 +1188,41 @@ class HistoryViewTest(AuthenticatedWebTest):
             )
 
 
+    def test_as_of(self):
+        a = create_address(street_number="1")
+        create_address(street_number="2")
+        a.address_changes.update(
+            changed_timestamp=datetime.datetime(2011, 1, 1))
+        a.street_number = "3"
+        a.save(user=self.user)
+
+        res1 = self.app.get(self.url + "?as_of=1/1/2011", user=self.user)
+        res2 = self.app.get(
+            self.url + "?as_of=today&sort=address", user=self.user)
+
+        self.assertEqual(
+            [c["post"]["street_number"] for c in res1.json["changes"]], ["1"])
+        self.assertEqual(
+            [c["post"]["street_number"] for c in res2.json["changes"]],
+            ["3", "2"])
+
+
+    def test_bad_as_of(self):
+        create_address()
+
+        res = self.app.get(self.url + "?as_of=foo", user=self.user)
+
+        self.assertEqual(len(res.json["changes"]), 1)
+        self.assertEqual(
+            res.json["messages"],
+            [{
+                    "level": 40,
+                    "message": "'foo' is not a valid as-of date.",
+                    "tags": "error",
+                    }]
+            )
+
+
     def test_get_specific_changes(self):
         for i in range(50):
             create_address(street_number=str(i+1))
@@ -1061,6 +1236,24 @@ class HistoryViewTest(AuthenticatedWebTest):
             [str(i) for i in range(21, 31)])
 
 
+    def test_cursor(self):
+        for i in range(3):
+            create_address(street_number=str(i+1))
+
+        res1 = self.app.get(self.url + "?num=2", user=self.user)
+        res2 = self.app.get(
+            self.url + "?num=2&cursor=%s"
+            % urllib.quote(res1.json["next_cursor"]),
+            user=self.user)
+
+        self.assertEqual(
+            [c["post"]["street_number"] for c in res1.json["changes"]],
+            ["1", "2"])
+        self.assertEqual(
+            [c["post"]["street_number"] for c in res2.json["changes"]],
+            ["3"])
+
+
     def test_sort(self):
         a1 = create_address(
             input_street="123 N Main St",
@@ -1260,6 +1453,7 @@ class HistoryViewTest(AuthenticatedWebTest):
             user=self.user)
 
         self.assertEqual(res.json["count"], 2)
+        self.assertEqual(res.json["count_exact"], True)
         self.assertEqual(len(res.json["changes"]), 1)
 
 
@@ -1578,6 +1772,123 @@ class GeoJSONViewTest(AuthenticatedWebTest):
             )
 
 
+    def test_topojson(self):
+        p = create_parcel(
+            geom=create_mpolygon(
+                [(1.0, 5.0), (1.0, 6.0), (2.0, 6.0), (2.0, 5.0), (1.0, 5.0)]))
+
+        response = self.get(
+            westlng="0.0", eastlng="3.0", southlat="4.0", northlat="5.5",
+            format="topojson")
+
+        geometries = response.json["objects"]["parcels"]["geometries"]
+        self.assertEqual(response.json["type"], "Topology")
+        self.assertEqual(
+            response.json["transform"]["translate"], [1.0, 5.0])
+        self.assertEqual([g["id"] for g in geometries], [p.id])
+
+
+    @override_settings(MLT_PARCEL_POLYGON_ZOOM=0)
+    def test_zoom_simplified(self):
+        create_parcel(
+            geom=create_mpolygon(
+                [(1.0, 5.0), (1.0, 6.0), (2.0, 6.0), (2.0, 5.0), (1.0, 5.0)]),
+            geom_low=create_mpolygon(
+                [(1.0, 5.0), (1.0, 6.0), (2.0, 6.0), (1.0, 5.0)]))
+
+        low = self.get(
+            westlng="0.0", eastlng="3.0", southlat="4.0", northlat="5.5",
+            zoom="13")
+        full = self.get(
+            westlng="0.0", eastlng="3.0", southlat="4.0", northlat="5.5",
+            zoom="18")
+
+        self.assertEqual(
+            low.json["features"][0]["geometry"]["coordinates"],
+            [[[[1.0, 5.0], [1.0, 6.0], [2.0, 6.0], [1.0, 5.0]]]])
+        self.assertEqual(
+            len(full.json["features"][0]["geometry"]["coordinates"][0][0]), 5)
+
+
+    def test_gzip(self):
+        create_parcel(
+            geom=create_mpolygon(
+                [(1.0, 5.0), (1.0, 6.0), (2.0, 6.0), (2.0, 5.0), (1.0, 5.0)]))
+
+        response = self.app.get(
+            self.url + "?" + urllib.urlencode(
+                {
+                    "westlng": "0.0",
+                    "eastlng": "3.0",
+                    "southlat": "4.0",
+                    "northlat": "5.5",
+                    }),
+            headers={"Accept-Encoding": "gzip"},
+            user=self.user)
+
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(
+            response.headers["Content-Length"], str(len(response.body)))
+        body = gzip.GzipFile(fileobj=StringIO(response.body)).read()
+        self.assertEqual(len(json.loads(body)["features"]), 1)
+
+
+    def test_content_length(self):
+        response = self.get(
+            westlng="0.0", eastlng="3.0", southlat="4.0", northlat="7.0")
+
+        self.assertEqual(
+            response.headers["Content-Length"], str(len(response.body)))
+        self.assertEqual(response.json["features"], [])
+
+
+    def test_clusters(self):
+        create_parcel(
+            pl="1",
+            geom=create_mpolygon(
+                [(1.0, 5.0), (1.0, 6.0), (2.0, 6.0), (2.0, 5.0), (1.0, 5.0)]))
+        create_parcel(
+            pl="2",
+            geom=create_mpolygon(
+                [(2.0, 5.0), (2.0, 6.0), (3.0, 6.0), (3.0, 5.0), (2.0, 5.0)]))
+        create_address(pl="1", needs_review=True)
+
+        response = self.get(
+            westlng="0.0", eastlng="4.0", southlat="4.0", northlat="7.0",
+            zoom="1")
+
+        self.assertEqual(
+            response.json["features"],
+            [
+                {
+                    u"type": u"Feature",
+                    u"id": None,
+                    u"geometry": {
+                        u"type": u"Point", u"coordinates": [2.0, 5.5]},
+                    u"properties": {
+                        u"cluster": True,
+                        u"count": 2,
+                        u"mapped": 1,
+                        u"unmapped": 1,
+                        u"flagged": 1,
+                        },
+                    }
+                ]
+            )
+
+
+    def test_clusters_by_centroid(self):
+        create_parcel(
+            geom=create_mpolygon(
+                [(1.0, 5.0), (1.0, 6.0), (2.0, 6.0), (2.0, 5.0), (1.0, 5.0)]))
+
+        response = self.get(
+            westlng="0.0", eastlng="3.0", southlat="4.0", northlat="5.4",
+            zoom="1")
+
+        self.assertEqual(response.json["features"], [])
+
+
     def test_mapped(self):
         p = create_parcel(
             geom=create_mpolygon(
@@ -1604,13 +1915,243 @@ class GeoJSONViewTest(AuthenticatedWebTest):
         create_address(pl=p1.pl)
         create_address(pl=p2.pl)
 
-        # 1 for parcels, 1 for addresses, 11 for sessions/auth/etc
-        with self.assertNumQueries(13):
+        # 1 for parcels with mapping summaries, 11 for sessions/auth/etc
+        with self.assertNumQueries(12):
             self.get(
                 westlng="0.0", eastlng="3.0", southlat="4.0", northlat="5.5")
 
 
 
+class ParcelTileViewTest(AuthenticatedWebTest):
+    def setUp(self):
+        super(ParcelTileViewTest, self).setUp()
+        from django.core.cache import cache
+        cache.clear()
+
+
+    @property
+    def url(self):
+        from mlt.map.tiles import tile_for_point
+        x, y = tile_for_point(17, 1.5, 5.5)
+        return reverse(
+            "map_parcel_tile", kwargs={"zoom": 17, "x": x, "y": y})
+
+
+    def create_parcel(self, **kwargs):
+        return create_parcel(
+            geom=create_mpolygon(
+                [(1.0, 5.0), (1.0, 6.0), (2.0, 6.0), (2.0, 5.0), (1.0, 5.0)]),
+            **kwargs)
+
+
+    def test_content_type(self):
+        response = self.get()
+
+        self.assertEqual(response.headers["content-type"], "application/json")
+
+
+    def test_contains(self):
+        p = self.create_parcel()
+        create_parcel(
+            geom=create_mpolygon(
+                [(41.0, 8.0), (41.0, 9.0), (42.0, 9.0), (41.0, 8.0)]))
+
+        response = self.get()
+
+        self.assertEqual(
+            [f["id"] for f in response.json["features"]], [p.id])
+
+
+    def test_topojson(self):
+        p = self.create_parcel()
+
+        response = self.app.get(self.url + "?format=topojson", user=self.user)
+
+        geometries = response.json["objects"]["parcels"]["geometries"]
+        self.assertEqual([g["id"] for g in geometries], [p.id])
+        self.assertEqual(geometries[0]["properties"]["pl"], p.pl)
+
+
+    def test_cached_per_format(self):
+        self.create_parcel()
+        self.get()
+
+        response = self.app.get(self.url + "?format=topojson", user=self.user)
+
+        self.assertEqual(response.json["type"], "Topology")
+
+
+    def test_clusters(self):
+        self.create_parcel()
+        from mlt.map.tiles import tile_for_point
+        x, y = tile_for_point(10, 1.5, 5.5)
+
+        response = self.app.get(
+            reverse("map_parcel_tile", kwargs={"zoom": 10, "x": x, "y": y}),
+            user=self.user)
+
+        self.assertEqual(
+            [f["properties"]["count"] for f in response.json["features"]], [1])
+
+
+    def test_cached(self):
+        self.create_parcel()
+        self.get()
+
+        # 11 for sessions/auth; parcels come from the tile cache
+        with self.assertNumQueries(11):
+            response = self.get()
+
+        self.assertEqual(len(response.json["features"]), 1)
+
+
+    def test_associate_invalidates(self):
+        p = self.create_parcel(pl="1")
+        a = create_address()
+        self.get()
+
+        a.pl = p.pl
+        a.save(user=self.user)
+
+        response = self.get()
+
+        self.assertEqual(
+            response.json["features"][0]["properties"]["mapped"], True)
+
+
+
+class ParcelLookupViewTest(AuthenticatedWebTest):
+    url_name = "map_parcel_lookup"
+
+
+    def get(self, **kwargs):
+        return self.app.get(
+            self.url + "?" + urllib.urlencode(kwargs),
+            user=self.user,
+            extra_environ={"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"})
+
+
+    def setUp(self):
+        super(ParcelLookupViewTest, self).setUp()
+        square = lambda pl, x: create_parcel(
+            pl=pl,
+            geom=create_mpolygon(
+                [(x, 5.0), (x, 5.001), (x + 0.001, 5.001), (x + 0.001, 5.0),
+                 (x, 5.0)]))
+        self.near = square("1", 1.0)
+        self.nearer = square("2", 1.002)
+        self.far = square("3", 2.0)
+
+
+    def test_contained(self):
+        response = self.get(lng="1.0005", lat="5.0005")
+
+        self.assertEqual(response.json["success"], True)
+        self.assertEqual(response.json["contained"], True)
+        self.assertEqual(
+            [(p["pl"], p["distance"]) for p in response.json["parcels"]],
+            [("1", 0)])
+
+
+    def test_nearest(self):
+        response = self.get(lng="1.0018", lat="5.0005")
+
+        self.assertEqual(response.json["contained"], False)
+        self.assertEqual(
+            [p["pl"] for p in response.json["parcels"]], ["2", "1"])
+        self.assertTrue(0 < response.json["parcels"][0]["distance"] < 50)
+
+
+    def test_num(self):
+        response = self.get(lng="1.0018", lat="5.0005", num="1")
+
+        self.assertEqual(
+            [p["pl"] for p in response.json["parcels"]], ["2"])
+
+
+    def test_bad_num(self):
+        response = self.get(lng="1.0018", lat="5.0005", num="-1")
+
+        self.assertEqual(
+            [p["pl"] for p in response.json["parcels"]], ["2"])
+
+
+    @override_settings(MLT_PARCEL_LOOKUP_MAX_NUM=1)
+    def test_num_too_large(self):
+        response = self.get(lng="1.0018", lat="5.0005", num="1000")
+
+        self.assertEqual(
+            [p["pl"] for p in response.json["parcels"]], ["2"])
+
+
+    def test_none_near(self):
+        response = self.get(lng="10.0", lat="5.0")
+
+        self.assertEqual(response.json["contained"], False)
+        self.assertEqual(response.json["parcels"], [])
+
+
+    def test_address(self):
+        a = create_address(geocoded="POINT(1.0017 5.0005)")
+
+        response = self.get(address_id=a.id)
+
+        self.assertEqual(
+            [p["pl"] for p in response.json["parcels"]], ["2", "1"])
+
+
+    def test_mapped(self):
+        create_address(pl="1")
+
+        response = self.get(lng="1.0005", lat="5.0005")
+
+        parcel = response.json["parcels"][0]
+        self.assertEqual(parcel["mapped"], True)
+        self.assertEqual(len(parcel["mapped_to"]), 1)
+
+
+    def test_address_not_geocoded(self):
+        a = create_address()
+
+        response = self.get(address_id=a.id)
+
+        self.assertEqual(
+            response.json,
+            {
+                "messages": [{
+                        "level": 40,
+                        "message":
+                            "Parcel lookup: address '%s' is not geocoded."
+                        % a.id,
+                        "tags": "error",
+                        }],
+                "success": False,
+                }
+            )
+
+
+    def test_bad_address(self):
+        response = self.get(address_id="foo")
+
+        self.assertEqual(response.json["success"], False)
+        self.assertEqual(
+            response.json["messages"][0]["message"],
+            "Parcel lookup: 'foo' is not a valid address ID.")
+
+
+    def test_no_point(self):
+        response = self.get(lng="1.0")
+
+        self.assertEqual(response.json["success"], False)
+
+
+    def test_queries(self):
+        # 1 for containing parcels, 1 for nearest, 11 for sessions/auth
+        with self.assertNumQueries(13):
+            self.get(lng="1.0018", lat="5.0005")
+
+
+
 class RevertChangeViewTest(CSRFAuthenticatedWebTest):
     def setUp(self):
         super(RevertChangeViewTest, self).setUp()
@@ -1704,10 +2245,100 @@ class RevertChangeViewTest(CSRFAuthenticatedWebTest):
 
 
 
+class RevertChangesViewTest(CSRFAuthenticatedWebTest):
+    url_name = "map_revert_changes"
+
+
+    def test_revert(self):
+        a1 = create_address(needs_review=True)
+        a2 = create_address(needs_review=True)
+        u = create_user()
+        a1.__class__.objects.all().update(needs_review=False, user=u)
+
+        res = self.post(self.url, {"changed_by": [u.id]})
+
+        self.assertEqual(
+            res.json,
+            {
+                "success": True,
+                "reverted": 2,
+                "no-op": [],
+                "conflict": {},
+                "messages": [
+                    {
+                        "level": 25,
+                        "message": "2 changes reverted.",
+                        "tags": "success"
+                        }
+                    ]
+                }
+            )
+        self.assertEqual(refresh(a1).needs_review, True)
+        self.assertEqual(refresh(a2).needs_review, True)
+
+
+    def test_revert_noop(self):
+        a = create_address(city="Providence")
+        u = create_user()
+        a.city = "Albuquerque"
+        a.save(user=u)
+        a.city = "New Bedford"
+        a.save(user=self.user)
+        self.post(self.url, {"changed_by": [u.id]})
+
+        res = self.post(self.url, {"changed_by": [u.id]})
+
+        self.assertEqual(res.json["success"], False)
+        self.assertEqual(
+            [m["message"] for m in res.json["messages"]],
+            ["1 change was already reverted."])
+
+
+    def test_conflict(self):
+        a = create_address(city="Providence")
+        u = create_user()
+        a.city = "Albuquerque"
+        a.save(user=u)
+        a.city = "New Bedford"
+        a.save(user=self.user)
+
+        res = self.post(self.url, {"changed_by": [u.id]})
+
+        self.assertEqual(
+            [m["message"] for m in res.json["messages"]],
+            [
+                "1 change reverted.",
+                "Reverting 1 change overwrote more recent changes.",
+                ])
+        self.assertEqual(refresh(a).city, "Providence")
+
+
+    def test_no_filter(self):
+        a = create_address()
+
+        res = self.post(self.url, {})
+
+        self.assertEqual(
+            res.json,
+            {"messages": [{"level": 40,
+                           "message": "No changes selected.",
+                           "tags": "error"}],
+             "success": False}
+            )
+        self.assertEqual(refresh(a).deleted, False)
+
+
+
 class FilterAutocompleteViewTest(AuthenticatedWebTest):
     url_name = "map_filter_autocomplete"
 
 
+    def setUp(self):
+        from mlt.map.autocomplete import clear_indexes
+        super(FilterAutocompleteViewTest, self).setUp()
+        clear_indexes()
+
+
     def test_filter(self):
         blametern = create_user(username="blametern")
         create_address(
@@ -1858,6 +2489,12 @@ class HistoryAutocompleteViewTest(AuthenticatedWebTest):
     url_name = "map_history_autocomplete"
 
 
+    def setUp(self):
+        from mlt.map.autocomplete import clear_indexes
+        super(HistoryAutocompleteViewTest, self).setUp()
+        clear_indexes()
+
+
     def test_filter(self):
         blametern = create_user(username="blametern")
         create_address(
@@ -2216,8 +2853,10 @@ class AddressActionsViewTest(CSRFAuthenticatedWebTest):
         a3 = create_address(pl="234", needs_review=False)
 
         # 1 to update, 1 for addresses, 1 for parcels, 1 for batches,
-        # 1 for querying addresses again to record change, 11 for sessions/auth
-        with self.assertNumQueries(16):
+        # 1 for querying addresses again to record change, 3 to refresh
+        # parcel mapping summaries, 1 to invalidate parcel tiles, 11 for
+        # sessions/auth
+        with self.assertNumQueries(20):
             self.post(
                 self.url,
                 {"aid": [a1.id, a2.id, a3.id], "action": "flag"},
@@ -2507,6 +3146,75 @@ class AddressActionsViewTest(CSRFAuthenticatedWebTest):
             )
 
 
+    @override_settings(
+        MLT_BULK_ACTION_JOB_THRESHOLD=1, CELERY_ALWAYS_EAGER=False)
+    @patch("mlt.map.views.tasks.bulk_action_task.delay")
+    def test_delete_job(self, delay):
+        delay.return_value = MockResult(task_id="mock-task-id")
+        a1 = create_address()
+        a2 = create_address()
+
+        res = self.post(
+            self.url,
+            {"aid": [a1.id, a2.id], "action": "delete"},
+            )
+
+        self.assertEqual(res.json["success"], True)
+        self.assertEqual(
+            res.json["job_url"],
+            reverse(
+                "map_bulk_action_status", kwargs={"task_id": "mock-task-id"}))
+        self.assertEqual(delay.call_args[0][2], None)
+        # left to the job
+        self.assertEqual(a1.__class__.objects.count(), 2)
+
+
+    @override_settings(
+        MLT_BULK_ACTION_JOB_THRESHOLD=1, CELERY_ALWAYS_EAGER=False)
+    @patch("mlt.map.views.tasks.bulk_action_task.delay")
+    def test_flag_job(self, delay):
+        delay.return_value = MockResult(task_id="mock-task-id")
+        a1 = create_address(pl="123", needs_review=False)
+        a2 = create_address(pl="234", needs_review=False)
+
+        res = self.post(
+            self.url,
+            {"aid": [a1.id, a2.id], "action": "flag"},
+            )
+
+        self.assertNotIn("addresses", res.json)
+        self.assertEqual(delay.call_args[0][2], {"needs_review": True})
+
+
+    @override_settings(MLT_BULK_ACTION_JOB_THRESHOLD=1)
+    def test_eager_no_job(self):
+        """
+        With tasks running eagerly, large bulk actions run inline, rather
+        than as a job run (and committed chunk by chunk) within the request.
+
+        """
+        a1 = create_address(pl="123", needs_review=False)
+        a2 = create_address(pl="234", needs_review=False)
+
+        res = self.post(
+            self.url,
+            {"aid": [a1.id, a2.id], "action": "flag"},
+            )
+
+        self.assertNotIn("job_url", res.json)
+        self.assertEqual(res.json["success"], True)
+        self.assertEqual(refresh(a1).needs_review, True)
+        self.assertEqual(refresh(a2).needs_review, True)
+
+
+    def test_under_threshold_no_job(self):
+        a1 = create_address()
+
+        res = self.post(self.url, {"aid": [a1.id], "action": "delete"})
+
+        self.assertNotIn("job_url", res.json)
+
+
 class StaffOnlyWebTest(CSRFAuthenticatedWebTest):
     def setUp(self):
         self.user = create_user(is_staff=True)
@@ -2574,9 +3282,10 @@ class LoadParcelsViewTest(StaffOnlyWebTest):
 
 
 class MockResult(object):
-    def __init__(self, status="PENDING", info=None):
+    def __init__(self, status="PENDING", info=None, task_id=None):
         self.status = status
         self.info = info
+        self.task_id = task_id
 
 
     def ready(self):
@@ -2665,3 +3374,107 @@ class LoadParcelsStatusViewTest(StaffOnlyWebTest):
                 "messages": [],
                 }
             )
+
+
+
+@patch("mlt.map.views.tasks.bulk_action_task.AsyncResult")
+class BulkActionStatusViewTest(AuthenticatedWebTest):
+    url_name = "map_bulk_action_status"
+
+
+    def setUp(self):
+        from django.core.cache import cache
+        super(BulkActionStatusViewTest, self).setUp()
+        cache.clear()
+        # as started by this user (see views.bulk_action_job)
+        cache.set("bulkaction:owner:mock-task-id", self.user.id)
+
+
+    @property
+    def url(self):
+        return reverse(self.url_name, kwargs={"task_id": "mock-task-id"})
+
+
+    def test_other_user(self, result_class):
+        result_class.return_value = MockResult("SUCCESS", "Done.")
+
+        res = self.app.get(
+            self.url, user=create_user(username="other"), status=404)
+
+        self.assertEqual(res.status_int, 404)
+
+
+    def test_unknown_task(self, result_class):
+        result_class.return_value = MockResult("SUCCESS", "Done.")
+
+        res = self.app.get(
+            reverse(self.url_name, kwargs={"task_id": "other-task-id"}),
+            user=self.user,
+            status=404)
+
+        self.assertEqual(res.status_int, 404)
+
+
+    def test_success_reported_once(self, result_class):
+        result_class.return_value = MockResult("SUCCESS", "Done.")
+        self.get(ajax=True)
+
+        res = self.get(ajax=True)
+
+        self.assertEqual(res.json["ready"], True)
+        self.assertEqual(res.json["messages"], [])
+
+
+    def test_progress(self, result_class):
+        result_class.return_value = MockResult(
+            "PROGRESS", {"done": 1000, "total": 6000})
+
+        res = self.get(ajax=True)
+
+        self.assertEqual(
+            res.json,
+            {
+                "ready": False,
+                "success": False,
+                "in_progress": True,
+                "status": "PROGRESS",
+                "done": 1000,
+                "total": 6000,
+                "messages": [],
+                }
+            )
+
+
+    def test_success(self, result_class):
+        result_class.return_value = MockResult(
+            "SUCCESS", "6000 mappings approved.")
+
+        res = self.get(ajax=True)
+
+        self.assertEqual(res.json["ready"], True)
+        self.assertEqual(res.json["success"], True)
+        self.assertEqual(
+            res.json["messages"],
+            [{
+                    "level": 25,
+                    "message": "6000 mappings approved.",
+                    "tags": "success",
+                    }]
+            )
+
+
+    def test_failure(self, result_class):
+        result_class.return_value = MockResult("FAILURE", Exception("blah"))
+
+        res = self.get(ajax=True)
+
+        self.assertEqual(res.json["ready"], True)
+        self.assertEqual(res.json["success"], False)
+        self.assertEqual(
+            res.json["messages"],
+            [{
+                    "level": 40,
+                    "message": "Bulk action failed: blah",
+                    "tags": "error",
+                    }]
+            )
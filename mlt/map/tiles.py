@@ -0,0 +1,173 @@
+"""
+Slippy-map tile math and a server-side cache of rendered parcel tiles.
+
+Tiles use the standard web-map (OSM/Google) numbering: at zoom ``z`` the world
+is divided into ``2**z`` by ``2**z`` tiles, ``x`` counting east from the
+antimeridian and ``y`` counting south from the north edge.
+
+"""
+import math
+import time
+
+from django.core.cache import cache
+from django.db import connection
+
+from ..core import aftercommit
+from ..core.conf import conf
+
+
+
+GENERATION_KEY = "parceltiles:generation"
+
+# response formats in which tiles may be cached
+FORMATS = ["geojson", "topojson"]
+
+
+
+def tile_bounds(zoom, x, y):
+    """
+    Return the (west, south, east, north) lon/lat bounds of the given tile.
+
+    """
+    n = 2.0 ** zoom
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = _tile_lat(y, n)
+    south = _tile_lat(y + 1, n)
+    return (west, south, east, north)
+
+
+
+def _tile_lat(y, n):
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+
+
+
+def tile_wkt(zoom, x, y):
+    """
+    Return a WKT polygon covering the given tile.
+
+    """
+    west, south, east, north = tile_bounds(zoom, x, y)
+    return (
+        "POLYGON(("
+        "%(w)r %(s)r, "
+        "%(w)r %(n)r, "
+        "%(e)r %(n)r, "
+        "%(e)r %(s)r, "
+        "%(w)r %(s)r"
+        "))" % {"w": west, "e": east, "s": south, "n": north}
+        )
+
+
+
+def tile_for_point(zoom, lon, lat):
+    """
+    Return the (x, y) of the tile at ``zoom`` containing the given point.
+
+    """
+    n = 2 ** zoom
+    lat_rad = math.radians(lat)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int(
+        (1.0 - math.log(math.tan(lat_rad) + 1.0 / math.cos(lat_rad)) / math.pi)
+        / 2.0 * n)
+    return (min(max(x, 0), n - 1), min(max(y, 0), n - 1))
+
+
+
+def tiles_for_extent(zoom, extent):
+    """
+    Yield (x, y) for every tile at ``zoom`` touched by the given
+    (west, south, east, north) extent.
+
+    """
+    west, south, east, north = extent
+    min_x, min_y = tile_for_point(zoom, west, north)
+    max_x, max_y = tile_for_point(zoom, east, south)
+    for x in range(min_x, max_x + 1):
+        for y in range(min_y, max_y + 1):
+            yield (x, y)
+
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, int(time.time()))
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+
+def _key(zoom, x, y, generation, format):
+    return "parceltiles:%s:%s:%s:%s:%s" % (generation, format, zoom, x, y)
+
+
+
+def get_cached(zoom, x, y, format="geojson"):
+    """
+    Return the cached rendering of the given tile, or ``None``.
+
+    """
+    return cache.get(_key(zoom, x, y, _generation(), format))
+
+
+
+def set_cached(zoom, x, y, content, format="geojson"):
+    cache.set(
+        _key(zoom, x, y, _generation(), format),
+        content,
+        conf.MLT_PARCEL_TILE_CACHE_TIMEOUT)
+
+
+
+def invalidate_pls(pls):
+    """
+    Drop cached tiles, at every cached zoom level, that contain any parcel with
+    one of the given PLs: now, and again once the current transaction commits
+    (see ``aftercommit``), in case another request re-cached one from the
+    data as it was until then.
+
+    """
+    from .models import Parcel
+
+    pls = set(pls) - set([""])
+    if not pls:
+        return
+
+    qn = connection.ops.quote_name
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT ST_XMin(e), ST_YMin(e), ST_XMax(e), ST_YMax(e) "
+        "FROM (SELECT ST_Extent(%(geom)s) AS e FROM %(parcels)s "
+        "WHERE %(pl)s IN %%s GROUP BY %(pl)s) AS extents" % {
+            "geom": qn("geom"),
+            "parcels": qn(Parcel._meta.db_table),
+            "pl": qn("pl"),
+            },
+        [tuple(pls)])
+
+    generation = _generation()
+    keys = set()
+    for extent in cursor.fetchall():
+        for zoom in conf.MLT_PARCEL_TILE_ZOOMS:
+            for x, y in tiles_for_extent(zoom, extent):
+                for format in FORMATS:
+                    keys.add(_key(zoom, x, y, generation, format))
+    keys = list(keys)
+
+    cache.delete_many(keys)
+    aftercommit.on_commit(lambda: cache.delete_many(keys))
+
+
+
+def invalidate_all():
+    """
+    Drop all cached tiles (e.g. after a new parcel load).
+
+    """
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, int(time.time()))
@@ -0,0 +1,239 @@
+"""
+Compact TopoJSON encoding of parcel geometries for the map.
+
+Coordinates are quantized to integers on a grid covering all the encoded
+parcels, polygon rings are cut into arcs wherever neighbouring rings diverge,
+each arc shared by adjacent parcels is stored only once, and arc positions are
+delta-encoded. See https://github.com/mbostock/topojson/wiki/Specification
+
+"""
+from collections import defaultdict
+
+
+
+def encode(features, quantization):
+    """
+    Return a TopoJSON topology (as a dictionary) of ``features``, an iterable
+    of (id, geometry, properties) tuples where ``geometry`` is a GeoJSON
+    Polygon or MultiPolygon dictionary.
+
+    The topology has a single "parcels" object, a GeometryCollection of
+    MultiPolygons. Coordinates are quantized to a ``quantization`` by
+    ``quantization`` grid.
+
+    """
+    features = [
+        (fid, _polygons(geometry), properties)
+        for fid, geometry, properties in features
+        ]
+
+    transform, quantize = _transform(
+        [
+            point
+            for fid, polygons, properties in features
+            for polygon in polygons
+            for ring in polygon
+            for point in ring
+            ],
+        quantization)
+
+    features = [
+        (fid, _quantize_polygons(polygons, quantize), properties)
+        for fid, polygons, properties in features
+        ]
+
+    junctions = _junctions(
+        [
+            ring
+            for fid, polygons, properties in features
+            for polygon in polygons
+            for ring in polygon
+            ])
+
+    arcs = ArcIndex()
+    geometries = [
+        {
+            "type": "MultiPolygon",
+            "id": fid,
+            "properties": properties,
+            "arcs": [
+                [arcs.add_ring(ring, junctions) for ring in polygon]
+                for polygon in polygons
+                ],
+            }
+        for fid, polygons, properties in features
+        ]
+
+    return {
+        "type": "Topology",
+        "transform": transform,
+        "objects": {
+            "parcels": {
+                "type": "GeometryCollection",
+                "geometries": geometries,
+                },
+            },
+        "arcs": [_delta(arc) for arc in arcs.arcs],
+        }
+
+
+
+class ArcIndex(object):
+    """
+    Collects the distinct arcs of a topology.
+
+    An arc that is the reverse of an already-collected arc is referred to by
+    the one's complement of that arc's index, per the TopoJSON spec.
+
+    """
+    def __init__(self):
+        self.arcs = []
+        self._indexes = {}
+
+
+    def add(self, arc):
+        """
+        Add ``arc`` (a tuple of points), if not already present either way
+        round, and return its index.
+
+        """
+        try:
+            return self._indexes[arc]
+        except KeyError:
+            pass
+        try:
+            return ~self._indexes[arc[::-1]]
+        except KeyError:
+            pass
+        self._indexes[arc] = len(self.arcs)
+        self.arcs.append(arc)
+        return self._indexes[arc]
+
+
+    def add_ring(self, ring, junctions):
+        """
+        Cut the closed ``ring`` into arcs at ``junctions``, add them, and
+        return the list of arc indexes making up the ring.
+
+        """
+        points = ring[:-1]
+        cuts = [i for i, point in enumerate(points) if point in junctions]
+
+        if not cuts:
+            # a ring shared whole (or not at all) has no junctions; start it
+            # at its least point so any duplicate ring matches regardless of
+            # where it started
+            start = points.index(min(points))
+            points = points[start:] + points[:start]
+            return [self.add(tuple(points + points[:1]))]
+
+        start = cuts[0]
+        points = points[start:] + points[:start] + points[start:start + 1]
+        cuts = [i - start for i in cuts] + [len(points) - 1]
+
+        return [
+            self.add(tuple(points[begin:end + 1]))
+            for begin, end in zip(cuts, cuts[1:])
+            ]
+
+
+
+def _polygons(geometry):
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    return geometry["coordinates"]
+
+
+
+def _transform(points, quantization):
+    """
+    Return a (transform, quantize) tuple: the TopoJSON transform for a
+    ``quantization`` grid over the extent of ``points``, and a function
+    quantizing a point to that grid.
+
+    """
+    if points:
+        xs, ys = zip(*points)
+        x0, y0, x1, y1 = min(xs), min(ys), max(xs), max(ys)
+    else:
+        x0, y0, x1, y1 = 0, 0, 0, 0
+
+    kx = float(x1 - x0) / (quantization - 1) if x1 > x0 else 1.0
+    ky = float(y1 - y0) / (quantization - 1) if y1 > y0 else 1.0
+
+    def quantize(point):
+        return (
+            int(round((point[0] - x0) / kx)),
+            int(round((point[1] - y0) / ky)),
+            )
+
+    transform = {"scale": [kx, ky], "translate": [x0, y0]}
+    return transform, quantize
+
+
+
+def _quantize_polygons(polygons, quantize):
+    """
+    Quantize the rings of ``polygons``, leaving out rings (and polygons) that
+    collapse to fewer than three distinct points.
+
+    """
+    quantized = []
+    for polygon in polygons:
+        rings = [_quantize_ring(ring, quantize) for ring in polygon]
+        rings = [ring for ring in rings if len(ring) > 3]
+        if rings:
+            quantized.append(rings)
+    return quantized
+
+
+
+def _quantize_ring(ring, quantize):
+    """
+    Return the quantized ring as a closed list of (x, y) tuples, dropping
+    points that quantize to the same position as their predecessor.
+
+    """
+    quantized = []
+    for point in ring:
+        point = quantize(point)
+        if not quantized or point != quantized[-1]:
+            quantized.append(point)
+
+    if quantized and quantized[0] != quantized[-1]:
+        quantized.append(quantized[0])
+    return quantized
+
+
+
+def _junctions(rings):
+    """
+    Return the set of points at which the given closed rings must be cut so
+    that shared boundaries become identical arcs: points that appear with
+    different neighbours in different places.
+
+    """
+    neighbours = defaultdict(set)
+    for ring in rings:
+        points = ring[:-1]
+        for i, point in enumerate(points):
+            before = points[i - 1]
+            after = points[(i + 1) % len(points)]
+            neighbours[point].add(
+                (before, after) if before < after else (after, before))
+
+    return set(point for point, seen in neighbours.items() if len(seen) > 1)
+
+
+
+def _delta(arc):
+    """
+    Delta-encode the positions of ``arc``.
+
+    """
+    encoded = []
+    x, y = 0, 0
+    for px, py in arc:
+        encoded.append([px - x, py - y])
+        x, y = px, py
+    return encoded
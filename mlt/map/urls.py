@@ -13,6 +13,7 @@ urlpatterns = patterns(
     url(r"^_addresses/$", "addresses", name="map_addresses"),
     url(r"^_history/$", "history", name="map_history"),
     url(r"^_export/$", "export_addresses", name="map_export_addresses"),
+    url(r"^_history/_export/$", "export_history", name="map_export_history"),
     url(r"^_add_address/$", "add_address", name="map_add_address"),
     url(r"^_edit_address/(?P<address_id>\d+)/$",
         "edit_address", name="map_edit_address"),
@@ -20,10 +21,16 @@ urlpatterns = patterns(
         "add_tag", name="map_add_tag"),
     url(r"^_associate/$", "associate", name="map_associate"),
     url(r"^_geojson/$", "geojson", name="map_geojson"),
+    url(r"^_tiles/(?P<zoom>\d+)/(?P<x>\d+)/(?P<y>\d+)/$",
+        "parcel_tile", name="map_parcel_tile"),
+    url(r"^_parcel_lookup/$", "parcel_lookup", name="map_parcel_lookup"),
     url(r"^_filter_autocomplete/$", "filter_autocomplete", name="map_filter_autocomplete"),
     url(r"^_history_autocomplete/$", "history_autocomplete", name="map_history_autocomplete"),
     url(r"^_geocode/$", "geocode", name="map_geocode"),
     url(r"^_action/$", "address_actions", name="map_address_actions"),
+    url(r"^_action/status/(?P<task_id>[^/]+)/$",
+        "bulk_action_status", name="map_bulk_action_status"),
     url(r"^_revert/(?P<change_id>\d+)/$",
         "revert_change", name="map_revert_change"),
+    url(r"^_revert/$", "revert_changes", name="map_revert_changes"),
     )
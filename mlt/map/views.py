@@ -1,7 +1,11 @@
 import json, datetime
+from StringIO import StringIO
 
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import NON_FIELD_ERRORS
-from django.http import HttpResponse
+from django.core.urlresolvers import reverse
+from django.http import HttpResponse, Http404
 from django.shortcuts import render, redirect, get_object_or_404
 from django.template.response import TemplateResponse
 from django.utils.formats import date_format
@@ -9,18 +13,19 @@ from django.views.decorators.http import require_POST
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.gis.geos import Point
 
-from vectorformats.Formats import GeoJSON
-from vectorformats.Feature import Feature
-
+from ..core.conf import conf
+from ..core.http import spooled_response
 from .encoder import IterEncoder
 from .export import EXPORT_FORMATS, EXPORT_WRITERS
-from .filters import AddressFilter, AddressChangeFilter
+from .filters import AddressFilter, AddressChangeFilter, parse_as_of
 from .forms import AddressForm, AddressImportForm, LoadParcelsForm
 from .importer import ImporterError
 from .models import Parcel, Address, AddressChange, AddressBatch
 from .utils import letter_key
-from . import serializers, sort, tasks, paging, geocoder
+from . import (
+    serializers, sort, tasks, paging, geocoder, tiles, topology, counts)
 
 
 
@@ -58,16 +63,23 @@ class UIFullAddressParcelSerializer(serializers.ParcelSerializer):
         return self.address_serializer.many(addresses)
 
 
-class UIParcelSerializer(UIFullAddressParcelSerializer):
-    address_serializer = UIAddressSerializer(
-        exclude=[
-            "has_parcel",
-            "latitude",
-            "longitude",
-            "mapped_by",
-            "batch_tags",
-            ]
-        )
+class UIParcelSerializer(serializers.ParcelSerializer):
+    """
+    Serializes parcels for the map, reading mapped addresses from the
+    ParcelMapping summary (see ``ParcelQuerySet.with_mapping_summary``).
+
+    """
+    default_fields = serializers.ParcelSerializer.default_fields + [
+        "mapped_to", "mapped"]
+    virtual_fields = set(["mapped_to", "mapped"])
+
+
+    def encode_mapped_to(self, parcel):
+        return parcel.mapped_summary
+
+
+    def encode_mapped(self, parcel):
+        return bool(parcel.mapped_summary)
 
 
 
@@ -124,11 +136,47 @@ def export_addresses(request):
     writer_class = EXPORT_WRITERS.get(format, EXPORT_WRITERS[EXPORT_FORMATS[0]])
 
     addresses = AddressFilter().apply(
-        Address.objects.prefetch("parcels"),
+        Address.objects.prefetch(
+            "parcels" if writer_class.parcel_geometry else "parcel_centroids"
+            ).rows(),
         request.GET)
 
-    writer = writer_class(addresses)
+    return export_response(request, writer_class(addresses))
+
+
+
+@login_required
+def export_history(request):
+    """
+    Export the addresses of the changes matching the history filters, as they
+    were at the request's "as_of" date.
+
+    """
+    format = request.GET.get("export_format", EXPORT_FORMATS[0])
+    writer_class = EXPORT_WRITERS.get(format, EXPORT_WRITERS[EXPORT_FORMATS[0]])
+
+    changes, limited = as_of_changes(
+        request,
+        AddressChange.objects.select_related("post", "post__mapped_by"))
+    if not limited:
+        if "as_of" not in request.GET:
+            messages.error(
+                request, "Exporting address history requires an as-of date.")
+        return redirect("home")
+
+    changes = AddressChangeFilter().apply(
+        changes.prefetch_linked("parcels"), request.GET).order_by("address")
+
+    return export_response(request, writer_class(as_of_addresses(changes)))
 
+
+
+def export_response(request, writer):
+    """
+    Return a response with the output of ``writer`` as an attachment; or, if
+    it has nothing to write, redirect home with an error message.
+
+    """
     response = HttpResponse(content_type=writer.mimetype)
     response['Content-Disposition'] = (
         'attachment; filename=addresses.%s' % writer.extension)
@@ -143,6 +191,20 @@ def export_addresses(request):
 
 
 
+def as_of_addresses(changes):
+    """
+    Return the list of the post snapshots of ``changes`` (as returned by
+    ``as_of_changes``), each under the id of its address rather than its own.
+
+    """
+    snapshots = []
+    for change in changes:
+        change.post.id = change.address_id
+        snapshots.append(change.post)
+    return snapshots
+
+
+
 @login_required
 def associate(request):
     ret = {}
@@ -163,23 +225,22 @@ def associate(request):
             request, "No addresses selected.")
 
     if parcel and count:
-        addresses.update(
-            user=request.user,
+        updates = dict(
             pl=pl,
             mapped_by=request.user,
             mapped_timestamp=datetime.datetime.now(),
             needs_review=not request.user.has_perm(
                 "map.mappings_trusted"))
-        ret = UIFullAddressParcelSerializer().one(parcel)
-        messages.success(
-            request,
-            "Mapped %s address%s to PL %s"
-            % (
-                count,
-                "es" if (count != 1) else "",
-                pl
-                )
+        message = "Mapped %s address%s to PL %s" % (
+            count,
+            "es" if (count != 1) else "",
+            pl
             )
+        if bulk_action_as_job(count):
+            return bulk_action_job(request, addresses, updates, message)
+        addresses.update(user=request.user, **updates)
+        ret = UIFullAddressParcelSerializer().one(parcel)
+        messages.success(request, message)
 
     return json_response(ret)
 
@@ -196,31 +257,37 @@ class IndexedAddressSerializer(UIAddressSerializer):
 
 @login_required
 def addresses(request):
-    qs = AddressFilter().apply(
-        Address.objects.prefetch(),
+    address_filter = AddressFilter()
+    qs = address_filter.apply(
+        Address.objects.prefetch("parcel_centroids", "batches").rows(),
         request.GET)
 
     get_count = request.GET.get("count", "false").lower() not in ["false", "0"]
     if get_count:
-        count = qs.count()
+        count, count_exact = counts.count(
+            qs, filtered=address_filter.active(request.GET))
 
+    sort_fields = request.GET.getlist("sort") or ["-latest_batch_timestamp"]
     try:
-        qs = sort.apply(
-            qs, request.GET.getlist("sort") or ["-latest_batch_timestamp"])
+        qs = sort.apply(qs, sort_fields)
     except sort.BadSort as e:
+        sort_fields = []
         for field in e.bad_fields:
             messages.error(
                 request, "'%s' is not a valid sort field." % field)
 
-    addresses = paging.apply(qs, request.GET, index=True)
+    addresses, next_cursor = keyset_page(
+        request, qs, sort_fields, index=True)
 
     data = {
         "addresses": IndexedAddressSerializer(
-            extra=["parcel"]).many(addresses)
+            extra=["parcel"]).many(addresses),
+        "next_cursor": next_cursor,
         }
 
     if get_count:
         data["count"] = count
+        data["count_exact"] = count_exact
 
     return json_response(data)
 
@@ -228,36 +295,78 @@ def addresses(request):
 
 @login_required
 def history(request):
-    qs = AddressChangeFilter().apply(
+    change_filter = AddressChangeFilter()
+    qs, limited = as_of_changes(
+        request,
         AddressChange.objects.select_related(
             "pre", "post", "changed_by"
-            ).prefetch_linked("parcels"),
-        request.GET)
+            ).prefetch_linked("parcels"))
+    qs = change_filter.apply(qs, request.GET)
 
     get_count = request.GET.get("count", "false").lower() not in ["false", "0"]
     if get_count:
-        count = qs.count()
+        count, count_exact = counts.count(
+            qs, filtered=limited or change_filter.active(request.GET))
 
+    sort_fields = request.GET.getlist("sort") or ["changed_timestamp"]
     try:
-        qs = sort.apply(
-            qs, request.GET.getlist("sort") or ["changed_timestamp"])
+        qs = sort.apply(qs, sort_fields)
     except sort.BadSort as e:
+        sort_fields = []
         for field in e.bad_fields:
             messages.error(
                 request, "'%s' is not a valid sort field." % field)
 
-    qs = paging.apply(qs, request.GET)
+    changes, next_cursor = keyset_page(request, qs, sort_fields)
 
     data = {
-        "changes": UIAddressChangeSerializer().many(qs)
+        "changes": UIAddressChangeSerializer().many(changes),
+        "next_cursor": next_cursor,
         }
 
     if get_count:
         data["count"] = count
+        data["count_exact"] = count_exact
     return json_response(data)
 
 
 
+def as_of_changes(request, qs):
+    """
+    Return a tuple of ``qs`` (of address changes) and False; or, if the
+    request has a valid "as_of" date, of ``qs`` limited to the latest change
+    to each address as of that date (see ``AddressChangeQuerySet.as_of``) and
+    True. An invalid date is ignored, with an error message.
+
+    """
+    as_of = request.GET.get("as_of")
+    if as_of is None:
+        return qs, False
+
+    timestamp = parse_as_of(as_of)
+    if timestamp is None:
+        messages.error(request, "'%s' is not a valid as-of date." % as_of)
+        return qs, False
+
+    return qs.as_of(timestamp), True
+
+
+
+def keyset_page(request, qs, sort_fields, index=False):
+    """
+    Return a page of ``qs`` and the cursor for the next page, per
+    ``paging.keyset``. Falls back to offset paging (with an error message) if
+    the request's cursor is invalid.
+
+    """
+    try:
+        return paging.keyset(qs, request.GET, sort_fields, index)
+    except paging.BadCursor as e:
+        messages.error(request, "Invalid paging cursor: %s" % e)
+        return paging.apply(qs, request.GET, index), None
+
+
+
 @login_required
 def add_address(request):
     form = AddressForm(request.POST or None)
@@ -360,20 +469,259 @@ def geojson(request):
         "%(w)s %(s)s"
         "))" % {"w": westlng, "e": eastlng, "s": southlat, "n": northlat}
         )
-    qs = Parcel.objects.filter(geom__intersects=wkt).prefetch_mapped()
+    zoom = paging.get_integer(request.GET, "zoom", None)
+    format = parcel_format(request)
+    if format == "geojson" and not clustered(zoom):
+        # unlike tiles, viewport responses are not bounded in size
+        qs = Parcel.objects.filter(geom__intersects=wkt)
+        return spooled_response(
+            request,
+            lambda out: write_parcel_geojson(out, qs, zoom),
+            "application/json")
+
+    return HttpResponse(
+        render_parcels(wkt, zoom, format), content_type="application/json")
+
+
+
+@login_required
+def parcel_tile(request, zoom, x, y):
+    """
+    GeoJSON (or TopoJSON; see ``parcel_format``) for all parcels intersecting
+    the given map tile (or clusters of them, at low zooms; see
+    ``render_parcels``), served from the tile cache when possible.
+
+    """
+    zoom, x, y = int(zoom), int(x), int(y)
+    format = parcel_format(request)
+    content = tiles.get_cached(zoom, x, y, format)
+    if content is None:
+        content = render_parcels(tiles.tile_wkt(zoom, x, y), zoom, format)
+        if zoom in conf.MLT_PARCEL_TILE_ZOOMS:
+            tiles.set_cached(zoom, x, y, content, format)
+
+    return HttpResponse(content, content_type="application/json")
+
+
+
+def render_parcels(wkt, zoom, format):
+    """
+    Return parcels in the given WKT area, rendered as ``format`` (see
+    ``PARCEL_FORMATS``) for display at ``zoom``.
+
+    Below ``MLT_PARCEL_POLYGON_ZOOM`` parcels are instead aggregated into
+    clusters (see ``parcel_clusters``), always rendered as GeoJSON.
+
+    """
+    if clustered(zoom):
+        return parcel_clusters(
+            Parcel.objects.filter(centroid__intersects=wkt), zoom)
+
+    return PARCEL_FORMATS[format](
+        Parcel.objects.filter(geom__intersects=wkt), zoom)
+
+
+
+def clustered(zoom):
+    """
+    Return True if parcels are shown as clusters at ``zoom``.
+
+    """
+    return zoom is not None and zoom < conf.MLT_PARCEL_POLYGON_ZOOM
+
+
+
+GEOJSON_FEATURE = (
+    '{"type": "Feature", "id": %(id)s, '
+    '"geometry": %(geometry)s, "properties": %(properties)s}')
+
+
+GEOJSON_FEATURE_COLLECTION = (
+    '{"type": "FeatureCollection", "crs": null, "features": [%s]}')
+
+
+
+# Parcel fields read to render parcels as GeoJSON (see UIParcelSerializer)
+GEOJSON_PARCEL_FIELDS = [
+    "id", "pl", "address", "first_owner", "classcode", "centroid"]
+
+
+
+def parcel_geojson(qs, zoom=None):
+    """
+    Return GeoJSON FeatureCollection (as a JSON string) for the parcels in
+    ``qs``, with geometries simplified as appropriate for display at ``zoom``.
+
+    """
+    out = StringIO()
+    write_parcel_geojson(out, qs, zoom)
+    return out.getvalue()
+
+
+
+def write_parcel_geojson(out, qs, zoom=None):
+    """
+    Write GeoJSON FeatureCollection for the parcels in ``qs`` to the file-like
+    ``out``, one feature at a time; see ``parcel_geojson``.
+
+    Parcels are read through a server-side cursor, and geometries are rendered
+    by the database and written out as-is rather than decoded and re-encoded.
+
+    """
+    qs = qs.with_geojson(
+        zoom, conf.MLT_GEOJSON_PRECISION).with_mapping_summary()
+
+    serializer = UIParcelSerializer()
+    header, footer = GEOJSON_FEATURE_COLLECTION.split("%s")
+
+    out.write(header)
+    separator = ""
+    for row in qs.stream_values(
+            "geojson", "mapped_summary_json", *GEOJSON_PARCEL_FIELDS):
+        parcel = Parcel(
+            **dict((field, row[field]) for field in GEOJSON_PARCEL_FIELDS))
+        parcel.mapped_summary_json = row["mapped_summary_json"]
+
+        out.write(separator)
+        out.write(
+            GEOJSON_FEATURE % {
+                "id": parcel.id,
+                "geometry": row["geojson"],
+                "properties": json.dumps(
+                    serializer.one(parcel), cls=IterEncoder),
+                }
+            )
+        separator = ", "
+    out.write(footer)
+
+
+
+def parcel_clusters(qs, zoom):
+    """
+    Return GeoJSON FeatureCollection (as a JSON string) of a point feature for
+    each cluster of parcels in ``qs`` at ``zoom``. Clusters are cells of a grid
+    of ``MLT_PARCEL_CLUSTER_CELLS`` per map tile width, and have "count",
+    "mapped", "unmapped" and "flagged" parcel counts as properties.
+
+    """
+    cells = 2 ** zoom * conf.MLT_PARCEL_CLUSTER_CELLS
+
     features = []
+    for cluster in qs.clusters(cells, conf.MLT_GEOJSON_PRECISION):
+        geometry = cluster.pop("geojson")
+        cluster["cluster"] = True
+        features.append(
+            GEOJSON_FEATURE % {
+                "id": "null",
+                "geometry": geometry,
+                "properties": json.dumps(cluster),
+                }
+            )
+
+    return GEOJSON_FEATURE_COLLECTION % ", ".join(features)
+
+
+
+def parcel_topojson(qs, zoom=None):
+    """
+    Return a compact TopoJSON topology (as a JSON string) of the parcels in
+    ``qs``, with geometries simplified as appropriate for display at ``zoom``.
+    See ``topology.encode``.
+
+    """
+    qs = qs.with_geojson(zoom).with_mapping_summary()
+
     serializer = UIParcelSerializer()
-    for parcel in qs:
-        feature = Feature(parcel.id)
-        feature.geometry = {
-            "type": parcel.geom.geom_type,
-            "coordinates": parcel.geom.coords,
-            }
-        feature.properties = serializer.one(parcel)
-        features.append(feature)
+    return json.dumps(
+        topology.encode(
+            (
+                (parcel.id, json.loads(parcel.geojson), serializer.one(parcel))
+                for parcel in qs
+                ),
+            conf.MLT_TOPOJSON_QUANTIZATION),
+        cls=IterEncoder,
+        separators=(",", ":"))
+
+
+
+PARCEL_FORMATS = {
+    "geojson": parcel_geojson,
+    "topojson": parcel_topojson,
+    }
 
-    output = GeoJSON.GeoJSON().encode(features, to_string=False)
-    return json_response(output)
+
+
+def parcel_format(request):
+    """
+    Return the parcel response format requested by the "format" querystring
+    parameter: "geojson" (the default) or "topojson".
+
+    """
+    format = request.GET.get("format")
+    if format in PARCEL_FORMATS:
+        return format
+    return "geojson"
+
+
+
+@login_required
+def parcel_lookup(request):
+    """
+    Find parcels at a point, given either by "lng" and "lat" or as the
+    geocoded location of the address "address_id".
+
+    Returns the parcel(s) containing the point or, failing that, the "num"
+    parcels nearest to it (within ``MLT_PARCEL_LOOKUP_RADIUS``), each with its
+    distance from the point in meters.
+
+    """
+    if "address_id" in request.GET:
+        address_id = request.GET["address_id"]
+        try:
+            point = Address.objects.get(pk=address_id).geocoded
+        except (Address.DoesNotExist, ValueError):
+            messages.error(
+                request,
+                "Parcel lookup: '%s' is not a valid address ID." % address_id)
+            return json_response({"success": False})
+        if point is None:
+            messages.error(
+                request,
+                "Parcel lookup: address '%s' is not geocoded." % address_id)
+            return json_response({"success": False})
+    else:
+        try:
+            point = Point(
+                float(request.GET["lng"]), float(request.GET["lat"]),
+                srid=4326)
+        except (KeyError, ValueError):
+            messages.error(
+                request,
+                "Parcel lookup requires 'lng' and 'lat' "
+                "or 'address_id' parameters.")
+            return json_response({"success": False})
+
+    # evaluated once, for both the check and the response
+    parcels = list(
+        Parcel.objects.filter(
+            geom__contains=point).with_mapping_summary().extra(
+            select={"distance": "0"}))
+    contained = bool(parcels)
+    if not contained:
+        num = min(
+            max(
+                paging.get_integer(
+                    request.GET, "num", conf.MLT_PARCEL_LOOKUP_NUM),
+                1),
+            conf.MLT_PARCEL_LOOKUP_MAX_NUM)
+        parcels = Parcel.objects.all().nearest(
+            point, conf.MLT_PARCEL_LOOKUP_RADIUS).with_mapping_summary()[:num]
+
+    return json_response({
+            "success": True,
+            "contained": contained,
+            "parcels": UIParcelSerializer(extra=["distance"]).many(parcels),
+            })
 
 
 
@@ -452,7 +800,7 @@ def address_actions(request):
     addresses = AddressFilter().apply(
         Address.objects.all(),
         request.POST)
-    if not addresses:
+    if not addresses.exists():
         messages.error(
             request, "No addresses selected.")
         return json_response({"success": False})
@@ -463,69 +811,86 @@ def address_actions(request):
 
     if action == "delete":
         count = addresses.count()
+        message = "%s address%s deleted." % (
+            count, "es" if (count != 1) else "")
+        if bulk_action_as_job(count):
+            return bulk_action_job(request, addresses, None, message)
         addresses.delete(user=request.user)
-        messages.success(
-            request, "%s address%s deleted."
-            % (count, "es" if (count != 1) else ""))
+        messages.success(request, message)
         return json_response({"success": True})
 
     if action == "approve":
         addresses = addresses.filter(needs_review=True).exclude(pl="")
         count = addresses.count()
-        visible_updated_ids = visible_selected_ids.intersection(
-            set([unicode(i) for i in addresses.values_list("id", flat=True)]))
         if not request.user.has_perm("map.mappings_trusted"):
             messages.error(
                 request,
                 "You don't have permission to approve %s."
                 % ("this mapping" if count == 1 else "these mappings"))
             return json_response({"success": False})
+        message = "%s mapping%s approved." % (
+            count, "s" if (count != 1) else "")
+        if bulk_action_as_job(count):
+            return bulk_action_job(
+                request, addresses, {"needs_review": False}, message)
+        visible_updated_ids = visible_selected_ids.intersection(
+            set([unicode(i) for i in addresses.values_list("id", flat=True)]))
         addresses.update(user=request.user, needs_review=False)
-        messages.success(
-            request, "%s mapping%s approved."
-            % (count, "s" if (count != 1) else ""))
+        messages.success(request, message)
         return json_response({
                 "success": True,
                 "addresses": UIAddressSerializer().many(
-                    Address.objects.prefetch().filter(
+                    Address.objects.prefetch(
+                        "parcel_centroids", "batches").filter(
                         id__in=visible_updated_ids)),
                 })
 
     if action == "flag":
         addresses = addresses.filter(needs_review=False).exclude(pl="")
         count = addresses.count()
+        message = "%s mapping%s flagged." % (
+            count, "s" if (count != 1) else "")
+        if bulk_action_as_job(count):
+            return bulk_action_job(
+                request, addresses, {"needs_review": True}, message)
         visible_updated_ids = visible_selected_ids.intersection(
             set([unicode(i) for i in addresses.values_list("id", flat=True)]))
         addresses.update(user=request.user, needs_review=True)
-        messages.success(
-            request, "%s mapping%s flagged."
-            % (count, "s" if (count != 1) else ""))
+        messages.success(request, message)
         return json_response({
                 "success": True,
                 "addresses": UIAddressSerializer().many(
-                    Address.objects.prefetch().filter(
+                    Address.objects.prefetch(
+                        "parcel_centroids", "batches").filter(
                         id__in=visible_updated_ids)),
                 })
 
     if action == "reject":
         addresses = addresses.exclude(pl="")
         count = addresses.count()
+        message = "%s mapping%s rejected." % (
+            count, "s" if (count != 1) else "")
+        updates = {"pl": "", "mapped_by": None, "mapped_timestamp": None}
+        if bulk_action_as_job(count):
+            return bulk_action_job(request, addresses, updates, message)
         visible_updated_ids = visible_selected_ids.intersection(
             set([unicode(i) for i in addresses.values_list("id", flat=True)]))
-        addresses.update(
-            user=request.user, pl="", mapped_by=None, mapped_timestamp=None)
-        messages.success(
-            request, "%s mapping%s rejected."
-            % (count, "s" if (count != 1) else ""))
+        addresses.update(user=request.user, **updates)
+        messages.success(request, message)
         return json_response({
                 "success": True,
                 "addresses": UIAddressSerializer().many(
-                    Address.objects.prefetch().filter(
+                    Address.objects.prefetch(
+                        "parcel_centroids", "batches").filter(
                         id__in=visible_updated_ids)),
                 })
 
     if action == "multi":
         addresses = addresses.filter(multi_units=False)
+        if bulk_action_as_job(addresses.count()):
+            return bulk_action_job(
+                request, addresses, {"multi_units": True},
+                "Addresses set as multi-unit.")
         visible_updated_ids = visible_selected_ids.intersection(
             set([unicode(i) for i in addresses.values_list("id", flat=True)]))
         addresses.update(user=request.user, multi_units=True)
@@ -533,12 +898,17 @@ def address_actions(request):
         return json_response({
                 "success": True,
                 "addresses": UIAddressSerializer().many(
-                    Address.objects.prefetch().filter(
+                    Address.objects.prefetch(
+                        "parcel_centroids", "batches").filter(
                         id__in=visible_updated_ids)),
                 })
 
     if action == "single":
         addresses = addresses.filter(multi_units=True)
+        if bulk_action_as_job(addresses.count()):
+            return bulk_action_job(
+                request, addresses, {"multi_units": False},
+                "Addresses set as single unit.")
         visible_updated_ids = visible_selected_ids.intersection(
             set([unicode(i) for i in addresses.values_list("id", flat=True)]))
         addresses.update(user=request.user, multi_units=False)
@@ -546,7 +916,8 @@ def address_actions(request):
         return json_response({
                 "success": True,
                 "addresses": UIAddressSerializer().many(
-                    Address.objects.prefetch().filter(
+                    Address.objects.prefetch(
+                        "parcel_centroids", "batches").filter(
                         id__in=visible_updated_ids)),
                 })
 
@@ -555,6 +926,86 @@ def address_actions(request):
 
 
 
+def bulk_action_as_job(count):
+    """
+    Return True if a bulk action on ``count`` addresses is to run as a
+    background job (see ``bulk_action_job``): if there are more than
+    ``MLT_BULK_ACTION_JOB_THRESHOLD``, unless tasks run eagerly. The job
+    would then run within this request and its transaction, which the job's
+    per-chunk commits would commit early.
+
+    """
+    return (count > conf.MLT_BULK_ACTION_JOB_THRESHOLD and
+            not getattr(settings, "CELERY_ALWAYS_EAGER", False))
+
+
+
+def bulk_action_job(request, addresses, updates, message):
+    """
+    Start a background job applying ``updates`` (a dictionary of field
+    values, or ``None`` to delete) to ``addresses``, and return a JSON
+    response with the URL of its status (see ``bulk_action_status``), which
+    reports ``message`` when it's done.
+
+    """
+    ids = list(addresses.values_list("id", flat=True))
+    result = tasks.bulk_action_task.delay(
+        ids, request.user.id, updates, message)
+    cache.set(
+        _bulk_action_key("owner", result.task_id),
+        request.user.id,
+        conf.MLT_BULK_ACTION_STATUS_TIMEOUT)
+    messages.info(
+        request, "Updating %s address%s in the background."
+        % (len(ids), "es" if (len(ids) != 1) else ""))
+    return json_response(
+        {
+            "success": True,
+            "job_url": reverse(
+                "map_bulk_action_status", kwargs={"task_id": result.task_id}),
+            }
+        )
+
+
+
+@login_required
+def bulk_action_status(request, task_id):
+    """
+    Report the progress of a bulk action job started by the requesting user,
+    and (to the first request once it's done) its outcome.
+
+    """
+    if cache.get(_bulk_action_key("owner", task_id)) != request.user.id:
+        raise Http404
+
+    result = tasks.bulk_action_task.AsyncResult(task_id)
+    data = {
+        "ready": result.ready(),
+        "success": result.successful(),
+        "in_progress": result.status == "PROGRESS",
+        "status": result.status,
+        "done": None,
+        "total": None,
+        }
+    if data["in_progress"]:
+        data["done"] = result.info["done"]
+        data["total"] = result.info["total"]
+    elif data["ready"] and cache.add(
+            _bulk_action_key("reported", task_id), True,
+            conf.MLT_BULK_ACTION_STATUS_TIMEOUT):
+        if result.successful():
+            messages.success(request, result.info)
+        elif result.failed():
+            messages.error(request, "Bulk action failed: %s" % result.info)
+    return json_response(data)
+
+
+
+def _bulk_action_key(kind, task_id):
+    return "bulkaction:%s:%s" % (kind, task_id)
+
+
+
 @login_required
 @require_POST
 def revert_change(request, change_id):
@@ -582,6 +1033,44 @@ def revert_change(request, change_id):
     return json_response({"success": success})
 
 
+
+@login_required
+@require_POST
+def revert_changes(request):
+    """
+    Revert all changes matching the history filters in the request (e.g. a
+    user's changes in a time window) at once.
+
+    """
+    change_filter = AddressChangeFilter()
+    if not change_filter.active(request.POST):
+        messages.error(request, "No changes selected.")
+        return json_response({"success": False})
+
+    report = change_filter.apply(
+        AddressChange.objects.all(), request.POST).revert(request.user)
+
+    reverted = report["reverted"]
+    noop = len(report["no-op"])
+    conflict = len(report["conflict"])
+
+    if reverted:
+        messages.success(
+            request, "%s change%s reverted."
+            % (reverted, "s" if (reverted != 1) else ""))
+    if noop:
+        messages.warning(
+            request, "%s change%s already reverted."
+            % (noop, "s were" if (noop != 1) else " was"))
+    if conflict:
+        messages.warning(
+            request, "Reverting %s change%s overwrote more recent changes."
+            % (conflict, "s" if (conflict != 1) else ""))
+
+    report["success"] = bool(reverted)
+    return json_response(report)
+
+
 @user_passes_test(lambda u: u.is_authenticated() and u.is_staff and u.is_active)
 def load_parcels(request):
     if request.method == "POST":
@@ -17,6 +17,9 @@ class BaseWriter(object):
     mimetype = "text/plain"
     extension = "txt"
 
+    # whether the writer needs full parcel geometries, or only centroids
+    parcel_geometry = False
+
 
     serializer = serializers.Serializer()
 
@@ -71,6 +71,7 @@ class ShapefileAddressSerializer(AddressSerializer):
 class SHPWriter(AddressWriter):
     mimetype = "application/zip"
     extension = "zip"
+    parcel_geometry = True
 
     serializer = ShapefileAddressSerializer(
         fields=AddressWriter.serializer.fields)
@@ -80,9 +80,10 @@ TEMPLATE_CONTEXT_PROCESSORS = [
 ]
 
 MIDDLEWARE_CLASSES = [
-    "django.middleware.gzip.GZipMiddleware",
+    "mlt.core.middleware.GZipMiddleware",
     "django.middleware.http.ConditionalGetMiddleware",
     "django.middleware.common.CommonMiddleware",
+    "mlt.core.middleware.AfterCommitMiddleware",
     "django.middleware.transaction.TransactionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -180,7 +181,7 @@ MIDDLEWARE_CLASSES.insert(
     MIDDLEWARE_CLASSES.index(
         "django.contrib.messages.middleware.MessageMiddleware"
         ) + 1,
-    "messages_ui.middleware.AjaxMessagesMiddleware")
+    "mlt.core.middleware.AjaxMessagesMiddleware")
 
 INSTALLED_APPS += ["ajax_loading_overlay"]
 
@@ -15,7 +15,9 @@ var MLT = (function (MLT, $) {
         currentlyLoading,
         moreChanges,
         scroll,
+        nextCursor,
         newChanges = function (data) {
+            nextCursor = data.next_cursor || null;
             if (data.changes && data.changes.length) {
                 var changesHTML = ich.revision(data);
 
@@ -41,7 +43,8 @@ var MLT = (function (MLT, $) {
                 moreChanges = false;
             }
             if (data.count || data.count === 0) {
-                $('#filter .filtercontrols .listlength').html(data.count);
+                // large unfiltered counts are estimates
+                $('#filter .filtercontrols .listlength').html((data.count_exact === false ? '~' : '') + data.count);
             }
             currentlyLoading = false;
             scroll = false;
@@ -65,6 +68,7 @@ var MLT = (function (MLT, $) {
         }
         loadingMessage.css('opacity', 1).find('p').html('loading changes...');
         changesList.find('.revision').remove();
+        nextCursor = null;
         if (loadingURL && MLT.history.sortData) {
             currentlyLoading = true;
             $.get(loadingURL, options, newChanges);
@@ -78,6 +82,10 @@ var MLT = (function (MLT, $) {
                 start: count
             },
             options = $.extend({}, defaults, MLT.history.filters, opts);
+        // continue after the last loaded change, rather than at an offset
+        if (nextCursor) {
+            options.cursor = nextCursor;
+        }
         if (loadingURL && MLT.history.sortData) {
             loadingMessage.animate({opacity: 1}, 'fast');
             currentlyLoading = true;
@@ -8,10 +8,13 @@ var MLT = (function (MLT, $) {
     'use strict';
 
     var MIN_PARCEL_ZOOM = 17,
+        // below MLT_PARCEL_POLYGON_ZOOM, tiles contain clusters of parcels
+        MIN_CLUSTER_ZOOM = 12,
         mapinfoHover = false,
         mapinfo = $('#mapinfo'),
         mapinfoTimeout = null,
         geojson_url = $('#mapping').data('parcel-geojson-url'),
+        tile_url = $('#mapping').data('parcel-tile-url'),
         geojson = new L.GeoJSON(),
         selectedLayer = null,
         selectedId = null,
@@ -30,6 +33,11 @@ var MLT = (function (MLT, $) {
         listCounter = 0,
         parcelXHR = null,
         parcelCounter = 0,
+        tileURL,
+        tileFor,
+        topoFeatures,
+        clusterMarker,
+        drawParcels,
         autocompleteXHR = null,
         autocompleteCounter = 0;
 
@@ -53,7 +61,9 @@ var MLT = (function (MLT, $) {
         moreAddresses: true,
         currentlyLoading: false,
         scroll: false,
+        nextCursor: null,
         newAddresses: function (data) {
+            MLT.addressLoading.nextCursor = data.next_cursor || null;
             if (data.addresses && data.addresses.length) {
                 $.each(data.addresses, function (i, address) {
                     var addressHTML = ich.address(address);
@@ -76,7 +86,8 @@ var MLT = (function (MLT, $) {
                 MLT.addressLoading.moreAddresses = false;
             }
             if (data.count || data.count === 0) {
-                $('#addresstable .actions .listlength').html(data.count);
+                // large unfiltered counts are estimates
+                $('#addresstable .actions .listlength').html((data.count_exact === false ? '~' : '') + data.count);
             }
             if (addressContainer.data('trusted') !== 'trusted') {
                 addressContainer.find('.address input[name="flag_for_review"]:checked').attr('disabled', 'disabled');
@@ -180,6 +191,7 @@ var MLT = (function (MLT, $) {
             loadingMessage.css('opacity', 1).find('p').html('loading addresses...');
             addressContainer.find('.address').remove();
             refreshButton.removeClass('expired');
+            MLT.addressLoading.nextCursor = null;
             if (loadingURL && sortData) {
                 MLT.addressLoading.currentlyLoading = true;
                 // @@@ if this returns with errors, subsequent ajax calls will be prevented unless currentlyLoading is set to `false`
@@ -200,6 +212,10 @@ var MLT = (function (MLT, $) {
                 options = $.extend({}, defaults, filters, opts),
                 counter;
 
+            // continue after the last loaded address, rather than at an offset
+            if (MLT.addressLoading.nextCursor) {
+                options.cursor = MLT.addressLoading.nextCursor;
+            }
             if (listXHR) { listXHR.abort(); }
             listCounter = listCounter + 1;
             counter = listCounter;
@@ -295,89 +311,217 @@ var MLT = (function (MLT, $) {
         }
     };
 
+    tileURL = function (zoom, x, y) {
+        return tile_url.replace(/0\/0\/0\/$/, zoom + '/' + x + '/' + y + '/') + '?format=topojson';
+    };
+
+    tileFor = function (zoom, lng, lat) {
+        var n = Math.pow(2, zoom),
+            latRad = lat * Math.PI / 180;
+        return {
+            x: Math.floor((lng + 180) / 360 * n),
+            y: Math.floor((1 - Math.log(Math.tan(latRad) + 1 / Math.cos(latRad)) / Math.PI) / 2 * n)
+        };
+    };
+
+    // Decode a TopoJSON topology of parcels (see mlt/map/topology.py) into an
+    // array of GeoJSON features.
+    topoFeatures = function (topology) {
+        var scale = topology.transform.scale,
+            translate = topology.transform.translate,
+            arcs = [],
+            features = [],
+            ring = function (indexes) {
+                var coords = [];
+                $.each(indexes, function (i, index) {
+                    // negative indexes refer to reversed arcs (one's complement)
+                    var arc = index < 0 ? arcs[-index - 1].slice().reverse() : arcs[index];
+                    // consecutive arcs share their end and start points
+                    coords = coords.concat(i ? arc.slice(1) : arc);
+                });
+                return coords;
+            };
+
+        $.each(topology.arcs, function (i, arc) {
+            var x = 0,
+                y = 0,
+                coords = [];
+            $.each(arc, function (j, delta) {
+                x = x + delta[0];
+                y = y + delta[1];
+                coords.push([x * scale[0] + translate[0], y * scale[1] + translate[1]]);
+            });
+            arcs.push(coords);
+        });
+
+        $.each(topology.objects.parcels.geometries, function (i, geometry) {
+            var polygons = [];
+            $.each(geometry.arcs, function (j, polygon) {
+                var rings = [];
+                $.each(polygon, function (k, indexes) {
+                    rings.push(ring(indexes));
+                });
+                polygons.push(rings);
+            });
+            features.push({
+                type: 'Feature',
+                id: geometry.id,
+                properties: geometry.properties,
+                geometry: {type: 'MultiPolygon', coordinates: polygons}
+            });
+        });
+
+        return features;
+    };
+
+    clusterMarker = function (latlng) {
+        return new L.CircleMarker(latlng, {weight: 1, fillOpacity: 0.5});
+    };
+
+    drawParcels = function (data) {
+        var clusters = [];
+
+        MLT.map.removeLayer(geojson);
+        selectedLayer = null;
+        parcelMap = {};
+        geojson = new L.GeoJSON(null, {pointToLayer: clusterMarker});
+
+        geojson.on('featureparse', function (e) {
+            var id = e.id,
+                pl = e.properties.pl;
+
+            if (e.properties.cluster) {
+                clusters.push(e);
+                e.layer.info = ich.clusterinfo(e.properties);
+                e.layer.setStyle({
+                    color: e.properties.flagged ? 'orange' : (e.properties.unmapped ? 'blue' : 'green')
+                });
+                e.layer.on('mouseover', function (ev) {
+                    if (!selectedInfo) {
+                        MLT.showInfo(e.layer.info, false);
+                    }
+                });
+                e.layer.on('mouseout', function (ev) {
+                    MLT.hideInfo();
+                });
+                e.layer.on('click', function (ev) {
+                    MLT.map.setView(ev.latlng, MLT.map.getZoom() + 2);
+                });
+                return;
+            }
+
+            e.layer.info = ich.parcelinfo(e.properties);
+            parcelMap[pl] = e;
+
+            e.layer.select = function () {
+                if (selectedLayer) {
+                    selectedLayer.unselect();
+                }
+                selectedParcelInfo = e.properties;
+                selectedId = id;
+                selectedInfo = this.info;
+                selectedLayer = this;
+                this.selected = true;
+                this.setStyle({
+                    color: "red",
+                    weight: 5
+                });
+            };
+            e.layer.unselect = function () {
+                if (this.selected) {
+                    selectedId = null;
+                    selectedInfo = null;
+                    selectedLayer = null;
+                }
+                this.selected = false;
+                this.setStyle({
+                    color: "blue",
+                    weight: 2
+                });
+            };
+            if (id === selectedId) {
+                e.layer.select();
+            } else {
+                e.layer.unselect();
+            }
+            e.layer.on('mouseover', function (ev) {
+                if (!selectedInfo) {
+                    MLT.showInfo(e.layer.info, false);
+                }
+            });
+            e.layer.on('mouseout', function (ev) {
+                MLT.hideInfo();
+            });
+            e.layer.on('click', function (ev) {
+                if (ev.target.selected) {
+                    ev.target.unselect();
+                    MLT.showInfo(e.layer.info, false);
+                } else {
+                    ev.target.select();
+                    MLT.showInfo(e.layer.info, true);
+                }
+            });
+        });
+
+        geojson.addGeoJSON(data);
+        MLT.map.addLayer(geojson);
+
+        // markers can only be resized once on the map
+        $.each(clusters, function (i, e) {
+            e.layer.setRadius(Math.min(30, 5 + Math.sqrt(e.properties.count)));
+        });
+    };
+
     MLT.refreshParcels = function () {
         var bounds = MLT.map.getBounds(),
             ne = bounds.getNorthEast(),
             sw = bounds.getSouthWest(),
-            counter;
-
-        if (parcelXHR) { parcelXHR.abort(); }
+            zoom = MLT.map.getZoom(),
+            counter,
+            requests,
+            min,
+            max,
+            x,
+            y;
+
+        if (parcelXHR) {
+            $.each(parcelXHR, function (i, xhr) { xhr.abort(); });
+            parcelXHR = null;
+        }
         parcelCounter = parcelCounter + 1;
         counter = parcelCounter;
 
-        if (MLT.map.getZoom() >= MIN_PARCEL_ZOOM) {
-            parcelXHR = $.getJSON(
-                geojson_url + "?southlat=" + sw.lat + "&northlat=" + ne.lat + "&westlng=" + sw.lng + "&eastlng=" + ne.lng,
-                function (data) {
-                    if (counter === parcelCounter) {
-                        parcelXHR = null;
-                        MLT.map.removeLayer(geojson);
-                        selectedLayer = null;
-                        parcelMap = {};
-                        geojson = new L.GeoJSON();
-
-                        geojson.on('featureparse', function (e) {
-                            var id = e.id,
-                                pl = e.properties.pl;
-
-                            e.layer.info = ich.parcelinfo(e.properties);
-                            parcelMap[pl] = e;
-
-                            e.layer.select = function () {
-                                if (selectedLayer) {
-                                    selectedLayer.unselect();
-                                }
-                                selectedParcelInfo = e.properties;
-                                selectedId = id;
-                                selectedInfo = this.info;
-                                selectedLayer = this;
-                                this.selected = true;
-                                this.setStyle({
-                                    color: "red",
-                                    weight: 5
-                                });
-                            };
-                            e.layer.unselect = function () {
-                                if (this.selected) {
-                                    selectedId = null;
-                                    selectedInfo = null;
-                                    selectedLayer = null;
-                                }
-                                this.selected = false;
-                                this.setStyle({
-                                    color: "blue",
-                                    weight: 2
-                                });
-                            };
-                            if (id === selectedId) {
-                                e.layer.select();
-                            } else {
-                                e.layer.unselect();
+        if (zoom >= MIN_CLUSTER_ZOOM) {
+            min = tileFor(zoom, sw.lng, ne.lat);
+            max = tileFor(zoom, ne.lng, sw.lat);
+            requests = [];
+            for (x = min.x; x <= max.x; x = x + 1) {
+                for (y = min.y; y <= max.y; y = y + 1) {
+                    requests.push($.getJSON(tileURL(zoom, x, y)));
+                }
+            }
+            parcelXHR = requests;
+            $.when.apply($, requests).done(function () {
+                var results = requests.length === 1 ? [arguments] : arguments,
+                    data = {type: 'FeatureCollection', features: []},
+                    seen = {};
+                if (counter === parcelCounter) {
+                    parcelXHR = null;
+                    // parcels straddling tile edges appear in several tiles
+                    $.each(results, function (i, result) {
+                        var features = result[0].type === 'Topology' ? topoFeatures(result[0]) : result[0].features;
+                        $.each(features, function (j, feature) {
+                            if (feature.properties.cluster) {
+                                data.features.push(feature);
+                            } else if (!seen[feature.id]) {
+                                seen[feature.id] = true;
+                                data.features.push(feature);
                             }
-                            e.layer.on('mouseover', function (ev) {
-                                if (!selectedInfo) {
-                                    MLT.showInfo(e.layer.info, false);
-                                }
-                            });
-                            e.layer.on('mouseout', function (ev) {
-                                MLT.hideInfo();
-                            });
-                            e.layer.on('click', function (ev) {
-                                if (ev.target.selected) {
-                                    ev.target.unselect();
-                                    MLT.showInfo(e.layer.info, false);
-                                } else {
-                                    ev.target.select();
-                                    MLT.showInfo(e.layer.info, true);
-                                }
-                            });
                         });
-
-                        geojson.addGeoJSON(data);
-                        MLT.map.addLayer(geojson);
-                    }
+                    });
+                    drawParcels(data);
                 }
-            );
+            });
         } else {
             MLT.map.removeLayer(geojson);
         }
@@ -617,7 +761,23 @@ var MLT = (function (MLT, $) {
                     }).get();
                     $.extend(options, { notid: notID });
                 }
-                $.post(url, options, success);
+                $.post(url, options, function (data) {
+                    if (!data.job_url) {
+                        success(data);
+                        return;
+                    }
+                    // mapped in the background; reload once it's done
+                    MLT.whenJobDone(data, function () {
+                        selectedAddressInput.each(function () { $(this).closest('.address').loadingOverlay('remove'); });
+                        bulkSelect.data('selectall', false).find('#select_all_none').prop('checked', false);
+                        if (selectedLayer) {
+                            selectedLayer.unselect();
+                        }
+                        mapinfo.empty().hide();
+                        MLT.addressLoading.reloadList({}, true);
+                        MLT.refreshParcels();
+                    });
+                });
             } else {
                 $.post(url, { maptopl: pl, aid: selectedAddressID }, success);
             }
@@ -959,6 +1119,37 @@ var MLT = (function (MLT, $) {
         });
     };
 
+    // Calls ``callback`` with the response ``data`` of a bulk action once the
+    // action is done: right away, or, if it was started as a background job,
+    // with the job's status once it's ready.
+    MLT.whenJobDone = function (data, callback) {
+        var ready = false,
+            jqxhr = null,
+            checkStatus = function () {
+                jqxhr = $.get(data.job_url, function (status) {
+                    jqxhr = null;
+                    if (status.ready) {
+                        ready = true;
+                        callback(status);
+                    }
+                });
+            };
+        if (!data.job_url) {
+            callback(data);
+            return;
+        }
+        checkStatus();
+        $.doTimeout(1000, function () {
+            if (ready) {
+                return false;
+            }
+            if (!jqxhr) {
+                checkStatus();
+            }
+            return true;
+        });
+    };
+
     MLT.addressActions = function () {
         var url = addressContainer.data('actions-url');
 
@@ -984,15 +1175,17 @@ var MLT = (function (MLT, $) {
                     $.extend(options, { notid: notID });
                 }
                 $.post(url, options, function (data) {
-                    selectedAddressInput.each(function () { $(this).closest('.address').loadingOverlay('remove'); });
-                    if (data.success) {
-                        MLT.addressLoading.reloadList({num: number}, true);
-                        if (selectedLayer) {
-                            selectedLayer.unselect();
+                    MLT.whenJobDone(data, function (data) {
+                        selectedAddressInput.each(function () { $(this).closest('.address').loadingOverlay('remove'); });
+                        if (data.success) {
+                            MLT.addressLoading.reloadList({num: number}, true);
+                            if (selectedLayer) {
+                                selectedLayer.unselect();
+                            }
+                            mapinfo.empty().hide();
+                            MLT.refreshParcels();
                         }
-                        mapinfo.empty().hide();
-                        MLT.refreshParcels();
-                    }
+                    });
                 });
             } else {
                 $.post(url, { aid: selectedAddressID, action: "delete" }, function (data) {
@@ -1064,15 +1257,21 @@ var MLT = (function (MLT, $) {
                     $.extend(options, { notid: notID });
                 }
                 $.post(url, options, function (data) {
-                    selectedAddressInput.each(function () { $(this).closest('.address').loadingOverlay('remove'); });
-                    if (data.success) {
-                        MLT.addressLoading.replaceAddresses(data, removePopup);
-                        if (selectedLayer) {
-                            selectedLayer.unselect();
+                    MLT.whenJobDone(data, function (data) {
+                        selectedAddressInput.each(function () { $(this).closest('.address').loadingOverlay('remove'); });
+                        if (data.success) {
+                            if (data.addresses) {
+                                MLT.addressLoading.replaceAddresses(data, removePopup);
+                            } else {
+                                MLT.addressLoading.reloadList({num: number}, true);
+                            }
+                            if (selectedLayer) {
+                                selectedLayer.unselect();
+                            }
+                            mapinfo.empty().hide();
+                            MLT.refreshParcels();
                         }
-                        mapinfo.empty().hide();
-                        MLT.refreshParcels();
-                    }
+                    });
                 });
             } else {
                 $.post(url, { aid: selectedAddressID, action: action }, function (data) {